@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Estimador del impacto de un commit en la documentación (hook pre-commit)
+Archivos en staging + manifiesto del último escaneo → documentos y páginas a regenerar, tokens, coste y lint
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Solo biblioteca estándar y nada del generador: el hook debe responder en menos de un segundo.
+# expat, fnmatch y sqlite3 se importan bajo demanda.
+
+SCAN_MANIFEST_FILE = 'scan-manifest.json'
+SCAN_MANIFEST_VERSION = 1
+DOC_INDEX_FILE = 'doc-index.sqlite'
+
+# Cabecera y bloque de código que el prompt añade por archivo (aproximado)
+FILE_OVERHEAD_CHARS = 120
+
+# Problemas del código fuente que rompen la conversión o la publicación del documento
+LINT_RULES = {
+    'not_utf8': 'no es UTF-8 válido: el escáner lo omite',
+    'invalid_char': 'carácter de control no válido en XML: Confluence rechaza la página',
+    'code_fence': 'línea que empieza por ``` : cierra el bloque de código del documento',
+    'invalid_xml': 'metadata XML mal formada',
+}
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+CODE_FENCE_PATTERN = re.compile(r'^```', re.MULTILINE)
+
+
+def load_manifest(cache_dir: Path) -> Optional[Dict]:
+    """Manifiesto del último escaneo del generador (None si no existe o es de otra versión)"""
+    path = cache_dir / SCAN_MANIFEST_FILE
+    try:
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == SCAN_MANIFEST_VERSION else None
+
+
+def staged_changes(repo_root: Path) -> List[Tuple[str, str]]:
+    """(estado, ruta) de los archivos en staging; los renombrados cuentan como baja + alta"""
+    result = subprocess.run(
+        ['git', '-C', str(repo_root), 'diff', '--cached', '--name-status', '--no-renames', '-z'],
+        capture_output=True, timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip())
+    fields = result.stdout.decode('utf-8', 'surrogateescape').split('\0')
+    return [(fields[i][:1], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+
+def read_staged_blobs(repo_root: Path, paths: List[str]) -> Dict[str, bytes]:
+    """Contenido en staging de varios archivos con un único git cat-file --batch"""
+    if not paths:
+        return {}
+    result = subprocess.run(
+        ['git', '-C', str(repo_root), 'cat-file', '--batch'],
+        input=''.join(f":{path}\n" for path in paths).encode('utf-8', 'surrogateescape'),
+        capture_output=True, timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip())
+    blobs = {}
+    output = result.stdout
+    offset = 0
+    for path in paths:
+        header_end = output.find(b'\n', offset)
+        if header_end < 0:
+            raise RuntimeError(f"salida de git cat-file truncada en {path}")
+        header = output[offset:header_end].split()
+        offset = header_end + 1
+        if len(header) == 3 and header[1] == b'blob':
+            size = int(header[2])
+            if header_end + 1 + size > len(output):
+                raise RuntimeError(f"salida de git cat-file truncada en {path}")
+            blobs[path] = output[offset:offset + size]
+            offset += size + 1
+    return blobs
+
+
+def match_component_type(path: str, patterns: Dict) -> Optional[str]:
+    """Tipo de componente del escáner para una ruta (mismos patrones glob que el generador)"""
+    from fnmatch import fnmatchcase
+
+    parts = path.split('/')
+    for component_type, pattern_config in patterns.items():
+        for pattern in (pattern_config.values() if isinstance(pattern_config, dict) else pattern_config):
+            segments = pattern.split('/')
+            if (fnmatchcase(parts[-1], segments[-1]) and
+                    all(segment in parts[:-1] for segment in segments[:-1] if segment != '**')):
+                return component_type
+    return None
+
+
+def unit_title(path: str, component_type: str, manifest: Dict) -> str:
+    """Documento al que pertenece un archivo nuevo (misma agrupación que build_work_units)"""
+
+    if manifest['scope'] != 'component' and len(manifest['units']) == 1:
+        return next(iter(manifest['units']))
+
+    parts = path.split('/')
+    folder = {'lwc_components': 'lwc', 'aura_components': 'aura'}.get(component_type)
+    if folder and folder in parts and parts.index(folder) + 1 < len(parts) - 1:
+        name = parts[parts.index(folder) + 1]
+    elif 'objects' in parts and parts.index('objects') + 1 < len(parts) - 1:
+        component_type, name = 'objects', parts[parts.index('objects') + 1]
+    else:
+        name = parts[-1].split('.')[0]
+    return f"{manifest['type_labels'].get(component_type, component_type)} {name}"
+
+
+def lint_source(path: str, blob: bytes) -> List[Dict]:
+    """Problemas del contenido en staging que romperían la conversión a formato de almacenamiento"""
+
+    def line_of(position: int) -> int:
+        return content.count('\n', 0, position) + 1
+
+    try:
+        content = blob.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return [{'path': path, 'rule': 'not_utf8', 'line': blob.count(b'\n', 0, e.start) + 1}]
+
+    problems = []
+    match = XML_INVALID_CHARS.search(content)
+    if match:
+        problems.append({'path': path, 'rule': 'invalid_char', 'line': line_of(match.start())})
+    match = CODE_FENCE_PATTERN.search(content)
+    if match:
+        problems.append({'path': path, 'rule': 'code_fence', 'line': line_of(match.start())})
+
+    if path.endswith('.xml'):
+        import xml.parsers.expat
+        parser = xml.parsers.expat.ParserCreate()
+        try:
+            parser.Parse(blob, True)
+        except xml.parsers.expat.ExpatError as e:
+            problems.append({'path': path, 'rule': 'invalid_xml', 'line': e.lineno})
+    return problems
+
+
+def route_tier(tiers: List[Dict], lines: int, chars: int, priority: int) -> Dict:
+    """Mismo criterio que route_model: primer tier cuyas condiciones cumple el documento"""
+    for tier in tiers:
+        if 'max_lines' in tier and lines > tier['max_lines']:
+            continue
+        if 'max_chars' in tier and chars > tier['max_chars']:
+            continue
+        if 'min_priority' in tier and priority < tier['min_priority']:
+            continue
+        return tier
+    return tiers[-1]
+
+
+def estimate_cost(manifest: Dict, model: str, input_tokens: int, output_tokens: int) -> float:
+    """Coste en USD con la tabla de precios del generador"""
+    pricing = manifest['pricing'].get(model, manifest['pricing'][manifest['default_model']])
+    return (input_tokens * pricing['input'] + output_tokens * pricing['output']) / 1_000_000
+
+
+def lookup_pages(cache_dir: Path, titles: List[str]) -> Dict[str, Dict]:
+    """Páginas ya publicadas según el índice local (solo lectura; vacío si no existe)"""
+    index_path = cache_dir / DOC_INDEX_FILE
+    if not titles or not index_path.exists():
+        return {}
+
+    import sqlite3
+    try:
+        connection = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True, timeout=1)
+        try:
+            rows = connection.execute(
+                f"SELECT title, final_title, page_id, url FROM pages WHERE title IN ({','.join('?' * len(titles))})",
+                titles
+            ).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return {}
+    return {title: {'final_title': final_title, 'page_id': page_id, 'url': url}
+            for title, final_title, page_id, url in rows if page_id}
+
+
+def estimate_impact(repo_root: Path, cache_dir: Path, manifest: Dict) -> Dict:
+    """Documentos afectados por el staging con su tier, tokens y coste estimados, más los problemas de lint"""
+
+    changes = [(status, path) for status, path in staged_changes(repo_root)
+               if path in manifest['files'] or match_component_type(path, manifest['patterns'])]
+    blobs = read_staged_blobs(repo_root, [path for status, path in changes if status != 'D'])
+
+    units = {}
+    lint = []
+    for status, path in changes:
+        known = manifest['files'].get(path)
+        component_type = None if known else match_component_type(path, manifest['patterns'])
+        title = known[0] if known else unit_title(path, component_type, manifest)
+
+        base = manifest['units'].get(title, {'priority': manifest['low_priority'], 'files': 0, 'lines': 0, 'chars': 0})
+        unit = units.setdefault(title, dict(base, paths=[], new=title not in manifest['units']))
+        if component_type:
+            unit['priority'] = min(unit['priority'], manifest['priorities'].get(component_type, manifest['low_priority']))
+        unit['paths'].append(path)
+
+        # Ajustar el tamaño del documento con el contenido en staging
+        if known:
+            unit['files'] -= 1
+            unit['chars'] -= known[1]
+            unit['lines'] -= known[2]
+        if status != 'D' and path in blobs:
+            text = blobs[path].decode('utf-8', 'replace')
+            unit['files'] += 1
+            unit['chars'] += len(text)
+            unit['lines'] += len(text.splitlines())
+            lint.extend(lint_source(path, blobs[path]))
+
+    languages = manifest['translation']['languages']
+    pages = lookup_pages(cache_dir, list(units))
+    documents = []
+    for title, unit in sorted(units.items(), key=lambda item: (item[1]['priority'], item[0])):
+        if unit['files'] <= 0:
+            documents.append({'title': title, 'paths': unit['paths'], 'removed': True})
+            continue
+
+        tier = route_tier(manifest['tiers'], unit['lines'], unit['chars'], unit['priority'])
+        input_tokens = int((manifest['prompt_chars'] + unit['chars'] + unit['files'] * FILE_OVERHEAD_CHARS)
+                           / manifest['chars_per_token'])
+        # Peor caso: se consumen todos los max_tokens del tier (y la traducción reescribe esa salida)
+        output_tokens = tier['max_tokens']
+        cost = estimate_cost(manifest, tier['model'], input_tokens, output_tokens)
+        cost += len(languages) * estimate_cost(manifest, manifest['translation']['model'], output_tokens, output_tokens)
+
+        documents.append({
+            'title': title,
+            'paths': unit['paths'],
+            'new': unit['new'],
+            'tier': tier['name'],
+            'model': tier['model'],
+            'input_tokens': input_tokens + len(languages) * output_tokens,
+            'output_tokens': output_tokens * (1 + len(languages)),
+            'cost_usd': round(cost, 4),
+            'page': pages.get(title),
+            'pages': 1 + len(languages),
+        })
+
+    generated = [document for document in documents if not document.get('removed')]
+    return {
+        'manifest_commit': manifest.get('commit'),
+        'manifest_generated_at': manifest.get('generated_at'),
+        'staged_files': len(changes),
+        'documents': documents,
+        'pages': sum(document['pages'] for document in generated),
+        'input_tokens': sum(document['input_tokens'] for document in generated),
+        'output_tokens': sum(document['output_tokens'] for document in generated),
+        'cost_usd': round(sum(document['cost_usd'] for document in generated), 4),
+        'lint': lint,
+    }
+
+
+def print_report(impact: Dict):
+    """Resumen legible para la salida del hook"""
+
+    if not impact['documents']:
+        print("📝 Documentación: el commit no cambia metadata Salesforce documentada")
+    else:
+        print(f"📝 Documentación: {impact['staged_files']} archivo(s) → {len(impact['documents'])} documento(s), "
+              f"{impact['pages']} página(s)")
+        for document in impact['documents']:
+            if document.get('removed'):
+                print(f"   🗑️ {document['title']}: sin archivos tras el commit (no se regenera)")
+                continue
+            page = document['page']
+            target = (f"actualiza página {page['page_id']}" if page else
+                      'página nueva' if document['new'] else 'página sin publicar')
+            print(f"   • {document['title']} [{document['tier']}] {document['input_tokens']:,} in / "
+                  f"{document['output_tokens']:,} out ≈ ${document['cost_usd']:.4f} ({target})")
+        print(f"💰 Estimación (peor caso): {impact['input_tokens']:,} in / {impact['output_tokens']:,} out "
+              f"≈ ${impact['cost_usd']:.4f}")
+
+    for problem in impact['lint']:
+        print(f"⚠️ {problem['path']}:{problem['line']}: {LINT_RULES[problem['rule']]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Impacto del commit en staging sobre la documentación generada')
+    parser.add_argument('--repo', default='.', help='Ruta del repositorio')
+    parser.add_argument('--json', action='store_true', help='Salida JSON en lugar del resumen')
+    parser.add_argument('--fail-on-lint', action='store_true',
+                        default=os.getenv('DOC_IMPACT_FAIL_ON_LINT', 'false').lower() == 'true',
+                        help='Termina con error si hay problemas que romperían la conversión')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    repo_root = Path(args.repo)
+    cache_dir = repo_root / os.getenv('DOC_CACHE_DIR', '.doc-cache')
+    manifest = load_manifest(cache_dir)
+    if manifest is None:
+        # Sin escaneo previo no se bloquea el commit
+        print(f"ℹ️ Documentación: sin manifiesto de escaneo en {cache_dir} "
+              "(ejecuta el generador una vez o restaura la caché para estimar el impacto)")
+        return True
+
+    # El hook es informativo: cualquier fallo de la estimación (git, manifiesto incompleto, salida
+    # inesperada) se avisa sin bloquear el commit; solo --fail-on-lint puede hacerlo fallar
+    try:
+        impact = estimate_impact(repo_root, cache_dir, manifest)
+    except Exception as e:
+        print(f"⚠️ Documentación: no se pudo estimar el impacto: {e}")
+        return True
+    impact['elapsed_s'] = round(time.perf_counter() - start, 3)
+
+    if args.json:
+        print(json.dumps(impact, indent=2, ensure_ascii=False))
+    else:
+        print_report(impact)
+        print(f"⏱️ {impact['elapsed_s'] * 1000:.0f} ms (manifiesto de {impact['manifest_generated_at']})")
+
+    return not (args.fail_on_lint and impact['lint'])
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -8,12 +8,351 @@ Version 3.0 - Super Complete Documentation + Consistent Naming
 import os
 import sys
 import json
+import argparse
 import requests
 import base64
 from pathlib import Path
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import hashlib
+import shutil
+import contextlib
+import tracemalloc
+import html
+import subprocess
+import threading
+import time
+import math
+import pickle
+import random
+import sqlite3
+import unicodedata
+import xml.etree.ElementTree as ET
+import xml.parsers.expat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+# Modelos y precios (USD por millón de tokens) para contabilidad de costes
+DEFAULT_MODEL = 'claude-sonnet-4-20250514'
+DEFAULT_CHEAP_MODEL = 'claude-3-5-haiku-20241022'
+DEFAULT_MAX_TOKENS = 4000
+MODEL_PRICING = {
+    'claude-sonnet-4-20250514': {'input': 3.00, 'output': 15.00, 'cache_write': 3.75, 'cache_read': 0.30},
+    'claude-3-5-haiku-20241022': {'input': 0.80, 'output': 4.00, 'cache_write': 1.00, 'cache_read': 0.08},
+}
+# Máximo de tokens de salida que acepta cada modelo (max_tokens mayores devuelven 400)
+MODEL_MAX_OUTPUT_TOKENS = {
+    'claude-sonnet-4-20250514': 64000,
+    'claude-3-5-haiku-20241022': 8192,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+# Tamaño del pool de conexiones HTTP (reutilizadas entre peticiones y trabajos)
+HTTP_POOL_SIZE = 16
+
+# Extensiones de los adjuntos según el lenguaje del bloque de código
+ATTACHMENT_EXTENSIONS = {
+    'apex': 'cls',
+    'javascript': 'js',
+    'html': 'html',
+    'css': 'css',
+    'xml': 'xml',
+    'mermaid': 'mmd',
+}
+
+# Secciones (## del super prompt) informadas por cada tipo de componente
+SECTION_SOURCE_KEYWORDS = {
+    'Código Apex': ['apex_classes', 'apex_triggers'],
+    'Integraciones': ['apex_classes'],
+    'Lightning Web Components': ['lwc_components', 'aura_components'],
+    'Flujos y Procesos': ['flows', 'workflow_rules'],
+    'Seguridad y Permisos': ['permission_sets', 'profiles', 'fields', 'objects'],
+}
+# Secciones que dependen de la estructura (archivos añadidos o eliminados)
+STRUCTURAL_SECTION_KEYWORDS = ['Inventario', 'Arquitectura', 'Información del Documento']
+
+# Diagramas mermaid generados localmente a partir del grafo de dependencias del código escaneado
+LOCAL_DIAGRAM_PLACEHOLDER = '[DIAGRAMAS_LOCALES]'
+LOCAL_DIAGRAM_HEADINGS = ['### 🗺️ Diagrama de Arquitectura', '### 🔗 Grafo de Dependencias', '### 🌐 Secuencia de Integraciones']
+LOCAL_DIAGRAM_INSTRUCTIONS = (
+    "\n\n**📐 DIAGRAMAS:** Los diagramas mermaid de arquitectura, dependencias y secuencia de integraciones se "
+    f"generan automáticamente a partir del código. En '## 🏗️ Arquitectura General' escribe únicamente la línea "
+    f"{LOCAL_DIAGRAM_PLACEHOLDER} seguida de una breve descripción textual de la arquitectura. NO dibujes esos "
+    "diagramas (sí los diagramas de flujo de los Flows)."
+)
+# Inventario, métricas y tablas de archivos generados localmente a partir del escaneo
+LOCAL_INVENTORY_HEADING = '## 📊 Inventario de Componentes'
+LOCAL_TABLES_INSTRUCTIONS = (
+    "\n\n**📊 INVENTARIO Y MÉTRICAS:** La sección de inventario de componentes, los recuentos de archivos y las "
+    "métricas de líneas/tamaño se generan automáticamente a partir del código. NO los incluyas: dedica toda la "
+    "respuesta a las secciones narrativas."
+)
+# Tipo de nodo del grafo de dependencias para cada tipo de componente
+GRAPH_NODE_KINDS = {
+    'lwc_components': 'LWC',
+    'aura_components': 'Aura',
+    'visualforce': 'Visualforce',
+    'apex_classes': 'Apex',
+    'apex_triggers': 'Trigger',
+    'flows': 'Flow',
+    'objects': 'Object',
+}
+
+# Capas del diagrama de arquitectura: (id, etiqueta, tipos de nodo)
+DIAGRAM_LAYERS = [
+    ('ui', 'Interfaz de Usuario', ['LWC', 'Aura', 'Visualforce']),
+    ('logic', 'Lógica de Negocio', ['Apex', 'Trigger', 'Flow']),
+    ('data', 'Datos', ['Object']),
+    ('external', 'Sistemas Externos', ['External']),
+]
+
+# Idiomas de las variantes traducidas (DOC_TRANSLATE_LANGUAGES); códigos desconocidos se usan tal cual
+TRANSLATION_LANGUAGES = {
+    'en': 'inglés',
+    'pt': 'portugués',
+    'fr': 'francés',
+    'de': 'alemán',
+    'it': 'italiano',
+}
+# Tamaño máximo de cada petición de traducción: las secciones mayores se parten por líneas
+TRANSLATION_CHUNK_CHARS = 12000
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|(?:\s*:?-+:?\s*\|)+\s*$')
+
+# Patrones de archivos Salesforce por tipo de componente (LWC/Aura: por subtipo dentro del bundle)
+SCAN_PATTERNS = {
+    'apex_classes': ['**/*.cls'],
+    'apex_triggers': ['**/*.trigger'],
+    'flows': ['**/*.flow-meta.xml'],
+    'lwc_components': {
+        'html': '**/lwc/**/*.html',
+        'js': '**/lwc/**/*.js', 
+        'css': '**/lwc/**/*.css',
+        'xml': '**/lwc/**/*.js-meta.xml'
+    },
+    'aura_components': {
+        'cmp': '**/aura/**/*.cmp',
+        'js_controller': '**/aura/**/*Controller.js',
+        'js_helper': '**/aura/**/*Helper.js',
+        'css': '**/aura/**/*.css'
+    },
+    'visualforce': ['**/*.page', '**/*.component'],
+    'objects': ['**/*.object-meta.xml'],
+    'fields': ['**/*.field-meta.xml'],
+    'permission_sets': ['**/*.permissionset-meta.xml'],
+    'profiles': ['**/*.profile-meta.xml'],
+    'custom_metadata': ['**/*.md-meta.xml'],
+    'custom_labels': ['**/*.labels-meta.xml'],
+    'static_resources': ['**/*.resource-meta.xml'],
+    'email_templates': ['**/*.email-meta.xml'],
+    'reports': ['**/*.report-meta.xml'],
+    'dashboards': ['**/*.dashboard-meta.xml'],
+    'workflow_rules': ['**/*.workflow-meta.xml'],
+    'validation_rules': ['**/*.validation-meta.xml']
+}
+
+# Manifiesto del último escaneo (ruta → documento) para estimar el impacto de un commit sin escanear
+SCAN_MANIFEST_FILE = 'scan-manifest.json'
+SCAN_MANIFEST_VERSION = 1
+
+# Muestreo de ejemplares: metadata homogénea agrupada por estructura → ejemplares + tabla de miembros
+EXEMPLAR_COMPONENT_TYPES = {'fields', 'validation_rules', 'workflow_rules', 'custom_metadata', 'custom_labels',
+                            'reports', 'dashboards', 'email_templates', 'static_resources'}
+# Columnas de la tabla de miembros (elementos hijos directos del XML) por tipo
+EXEMPLAR_KEY_ATTRIBUTES = {
+    'fields': ['type', 'label', 'length', 'required', 'referenceTo', 'formula'],
+    'validation_rules': ['active', 'errorConditionFormula', 'errorMessage'],
+    'workflow_rules': ['active', 'triggerType', 'formula'],
+    'custom_metadata': ['label', 'values'],
+    'reports': ['reportType', 'format'],
+}
+EXEMPLAR_DEFAULT_ATTRIBUTES = ['label', 'description']
+EXEMPLAR_VALUE_CHARS = 80
+
+# Modo watch: archivos vigilados y directorios ignorados al sondear el repositorio
+WATCH_EXTENSIONS = ('.cls', '.trigger', '.html', '.js', '.css', '.cmp', '.page', '.component', '-meta.xml')
+WATCH_IGNORED_DIRS = {'node_modules', '.git', '.sfdx', '.sf', '.doc-cache'}
+
+# Plantilla de la vista previa local (storage format renderizado en el navegador)
+PREVIEW_HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: -apple-system, 'Segoe UI', sans-serif; max-width: 1100px; margin: 2rem auto; padding: 0 1rem; line-height: 1.5; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 4px 8px; }}
+pre {{ background: #f4f5f7; padding: 1rem; overflow: auto; }}
+</style>
+</head>
+<body>
+<p><em>Vista previa local ({generated_at}) - no publicada en Confluence</em></p>
+{body}
+<script type="module">
+import mermaid from 'https://cdn.jsdelivr.net/npm/mermaid@10/dist/mermaid.esm.min.mjs';
+mermaid.initialize({{ startOnLoad: true }});
+</script>
+</body>
+</html>
+"""
+
+# Análisis estático local de Apex (riesgos de governor limits): regla → (severidad, descripción)
+APEX_ANALYZER_VERSION = 1
+APEX_RULES = {
+    'soql_in_loop': ('🔴', 'SOQL dentro de un bucle'),
+    'dml_in_loop': ('🔴', 'DML dentro de un bucle'),
+    'trigger_not_bulkified': ('🔴', 'Trigger no bulkificado'),
+    'non_selective_query': ('🟡', 'Consulta no selectiva'),
+    'nested_loop': ('🟡', 'Bucles anidados'),
+}
+APEX_DML_KEYWORDS = {'insert', 'update', 'upsert', 'delete', 'undelete', 'merge'}
+APEX_ANALYSIS_HEADING = '## ⚡ Análisis de Governor Limits'
+APEX_ANALYSIS_INSTRUCTIONS = (
+    "\n\n**⚡ GOVERNOR LIMITS:** Los riesgos de governor limits del código Apex ya se han analizado localmente "
+    "(HALLAZGOS APEX al inicio) y se añaden como tabla al documento. No repitas ese análisis: limítate a "
+    "mencionar los hallazgos relevantes al describir cada clase o trigger."
+)
+
+# Índice local (SQLite FTS5) de documentos generados, símbolos y páginas publicadas
+DOC_INDEX_FILE = 'doc-index.sqlite'
+DOC_INDEX_SCHEMA_VERSION = 1
+DOC_INDEX_KINDS = ('any', 'component', 'method', 'field', 'text')
+APEX_METHOD_PATTERN = re.compile(
+    r'^\s*(?:@\w+(?:\([^)]*\))?\s+)*(?:(?:public|private|protected|global|static|override|virtual|abstract|'
+    r'webservice|testmethod)\s+)+[\w<>,.\[\]\s]+?\s+(\w+)\s*\(', re.MULTILINE | re.IGNORECASE
+)
+LWC_METHOD_PATTERN = re.compile(r'^\s+(?:async\s+)?(?!if\b|for\b|while\b|switch\b|catch\b)(\w+)\s*\([^)]*\)\s*\{',
+                                re.MULTILINE)
+
+# Validación del storage format antes de publicar (XHTML bien formado + esquema básico de macros)
+STORAGE_HTML_TAGS = {
+    'p', 'br', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'em', 'b', 'i', 'u', 's', 'del', 'code',
+    'pre', 'blockquote', 'sub', 'sup', 'span', 'div', 'a', 'img', 'ul', 'ol', 'li', 'table', 'thead', 'tbody',
+    'tr', 'th', 'td', 'colgroup', 'col',
+}
+STORAGE_VOID_TAGS = {'br', 'hr', 'img', 'col'}
+STORAGE_INLINE_TAGS = {'strong', 'em', 'b', 'i', 'u', 's', 'del', 'code', 'sub', 'sup', 'span', 'a'}
+STORAGE_BLOCK_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'div', 'ul', 'ol', 'li',
+                      'table', 'thead', 'tbody', 'tr', 'th', 'td', 'ac:structured-macro'}
+# Problema → (descripción, Confluence rechaza el PUT con 400)
+STORAGE_ISSUES = {
+    'unescaped_text': ('caracteres < o & sin escapar', True),
+    'unknown_tag': ('etiquetas desconocidas escapadas', True),
+    'stray_close': ('cierres sin apertura eliminados', True),
+    'unclosed': ('etiquetas sin cerrar', True),
+    'invalid_char': ('caracteres no válidos en XML', True),
+    'macro_schema': ('macros sin nombre o cuerpo no CDATA', True),
+    'block_in_inline': ('bloques dentro de elementos en línea', False),
+    'tag_case': ('etiquetas HTML normalizadas a minúsculas', False),
+    'code_markup': ('etiquetas dentro de <code> escapadas como texto', True),
+    'not_well_formed': ('storage aún mal formado tras reparar', True),
+}
+STORAGE_TOKEN_PATTERN = re.compile(
+    r'<!\[CDATA\[(.*?)\]\]>|<!--.*?-->|'
+    r'<(/?)([A-Za-z][\w:.-]*)((?:\s+[\w:.-]+\s*=\s*(?:"[^"<]*"|\'[^\'<]*\'))*)\s*(/?)>',
+    re.DOTALL
+)
+STORAGE_ENTITY_PATTERN = re.compile(r'&(?![A-Za-z][A-Za-z0-9]*;|#\d+;|#x[0-9A-Fa-f]+;)')
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+# Errores de arranque del pool de procesos o de serialización de sus tareas: se reintenta en el proceso principal
+# (cualquier otro error es un fallo real de la tarea y se propaga)
+POOL_UNAVAILABLE_ERRORS = (OSError, NotImplementedError, BrokenProcessPool, pickle.PicklingError)
+
+# Longitud máxima de un título de página en Confluence
+CONFLUENCE_TITLE_MAX_CHARS = 255
+
+# Tiers del router de modelos: se usa el primero cuyas condiciones cumple el componente
+# (max_lines/max_chars: tamaño del contenido enviado; min_priority: solo componentes menos críticos)
+def default_model_tiers(model: str, cheap_model: str, max_tokens: int) -> List[Dict]:
+    """Tiers por defecto a partir de DOC_MODEL, DOC_CHEAP_MODEL y DOC_MAX_TOKENS"""
+    return [
+        {'name': 'trivial', 'model': cheap_model, 'max_tokens': min(1500, max_tokens), 'max_lines': 80, 'max_chars': 4000},
+        {'name': 'small', 'model': cheap_model, 'max_tokens': min(3000, max_tokens), 'max_lines': 400,
+         'max_chars': 20000, 'min_priority': 2},
+        {'name': 'standard', 'model': model, 'max_tokens': max_tokens, 'max_lines': 3000},
+        {'name': 'large', 'model': model, 'max_tokens': max_tokens * 2},
+    ]
+
+
+DEFAULT_MODEL_TIERS = default_model_tiers(DEFAULT_MODEL, DEFAULT_CHEAP_MODEL, DEFAULT_MAX_TOKENS)
+
+
+def validate_model_tiers(tiers) -> List[Dict]:
+    """Comprueba DOC_MODEL_TIERS: lista no vacía de tiers con name, model y max_tokens (ValueError si no)"""
+    if not isinstance(tiers, list) or not tiers:
+        raise ValueError('debe ser una lista JSON no vacía de tiers')
+    for index, tier in enumerate(tiers):
+        if not isinstance(tier, dict):
+            raise ValueError(f"el tier {index} no es un objeto")
+        missing = [key for key in ('name', 'model', 'max_tokens') if key not in tier]
+        if missing:
+            raise ValueError(f"al tier {index} ({tier.get('name', '?')}) le falta: {', '.join(missing)}")
+        if not isinstance(tier['max_tokens'], int) or tier['max_tokens'] <= 0:
+            raise ValueError(f"max_tokens del tier {index} ({tier['name']}) debe ser un entero positivo")
+    return tiers
+
+
+# Aproximación conservadora para estimar tokens antes de llamar a la API
+CHARS_PER_TOKEN = 3.5
+
+# Prioridad por tipo de componente (menor = más crítico)
+COMPONENT_PRIORITY = {
+    'apex_triggers': 0,
+    'apex_classes': 1,
+    'flows': 1,
+    'lwc_components': 2,
+    'aura_components': 2,
+    'objects': 2,
+    'fields': 3,
+    'validation_rules': 3,
+    'workflow_rules': 3,
+    'permission_sets': 3,
+    'visualforce': 3,
+    'custom_metadata': 4,
+    'custom_labels': 4,
+    'profiles': 5,
+    'static_resources': 5,
+    'email_templates': 5,
+    'reports': 5,
+    'dashboards': 5,
+}
+LOW_PRIORITY_THRESHOLD = 4
+
+# Planificador con fecha límite: peso de cada criterio (normalizado 0-1) en la puntuación de un documento
+SCHEDULER_WEIGHTS = {
+    'criticality': 0.5,  # 🔴/🟡/🟢 según el tipo de componente más crítico
+    'change': 0.3,       # Líneas añadidas + eliminadas del commit range (git diff --numstat, escala logarítmica)
+    'staleness': 0.2,    # Días desde la última generación (nunca generado = máximo)
+}
+SCHEDULER_STALE_DAYS = 30
+SCHEDULER_CHANGE_LINES = 2000  # Cambios de este tamaño o mayores puntúan el máximo
+# Los documentos aplazados por la fecha límite en la ejecución anterior van siempre primero
+SCHEDULER_BACKLOG_BONUS = 1.0
+
+# Etiquetas de título para componentes sin prefijo en generate_consistent_title
+COMPONENT_TYPE_LABELS = {
+    'apex_classes': 'Apex',
+    'apex_triggers': 'Trigger',
+    'flows': 'Flow',
+    'lwc_components': 'LWC',
+    'aura_components': 'Aura',
+    'visualforce': 'Visualforce',
+    'objects': 'Object',
+    'fields': 'Field',
+    'permission_sets': 'PermissionSet',
+    'profiles': 'Profile',
+    'custom_metadata': 'CustomMetadata',
+    'custom_labels': 'CustomLabels',
+    'static_resources': 'StaticResource',
+    'email_templates': 'EmailTemplate',
+    'reports': 'Report',
+    'dashboards': 'Dashboard',
+    'workflow_rules': 'Workflow',
+    'validation_rules': 'ValidationRule',
+}
 
 # SUPER PROMPT COMPLETO - Basado en el original pero sin interacción
 SUPER_DOCUMENTATION_PROMPT = """Eres un Consultor Salesforce Senior especializado en crear documentación técnica integral, visual y completa que cualquier desarrollador o administrador pueda entender inmediatamente.
@@ -347,110 +686,1200 @@ console.error('Error occurred:', error);
 **⚠️ IMPORTANTE PARA EL ANÁLISIS:**
 Documenta CADA archivo encontrado, no omitas ningún componente. Si un archivo parece incompleto o tiene errores, documenta los issues encontrados y sugiere correcciones. Aplica tu conocimiento de Salesforce para inferir contexto cuando falte información específica."""
 
+# Salida estructurada (DOC_STRUCTURED_OUTPUT): el modelo llama a una herramienta con un campo por sección
+STRUCTURED_TOOL_NAME = 'write_documentation'
+STRUCTURED_SECTION_HEADINGS = re.findall(r'^## .+$', SUPER_DOCUMENTATION_PROMPT, re.MULTILINE)
+STRUCTURED_OUTPUT_INSTRUCTIONS = (
+    f"\n\n**🧱 FORMATO DE SALIDA:** Responde ÚNICAMENTE llamando a la herramienta {STRUCTURED_TOOL_NAME}. "
+    "Cada sección va en su propio campo: el texto narrativo en Markdown sin el encabezado '## ', las tablas como "
+    "columnas + filas (no tablas Markdown), los diagramas Mermaid y los fragmentos de código en sus campos. "
+    "El título es 'Tipo Nombre' sin emojis ni corchetes."
+)
+
+
+def section_key(heading: str) -> str:
+    """Nombre de campo de la herramienta para un encabezado '## 🎯 Presentación Ejecutiva' → presentacion_ejecutiva"""
+    text = unicodedata.normalize('NFKD', heading).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')[:64]
+
+
+def build_documentation_tool(headings: List[str], with_title: bool = True) -> Dict:
+    """Herramienta (JSON Schema) con un campo por sección; tablas como filas y diagramas/código aparte"""
+    
+    section_schema = {
+        'type': 'object',
+        'properties': {
+            'text': {'type': 'string', 'description': 'Contenido narrativo en Markdown (sin el encabezado ##)'},
+            'tables': {'type': 'array', 'items': {
+                'type': 'object',
+                'properties': {
+                    'title': {'type': 'string'},
+                    'columns': {'type': 'array', 'items': {'type': 'string'}},
+                    'rows': {'type': 'array', 'items': {'type': 'array', 'items': {'type': 'string'}}},
+                },
+                'required': ['columns', 'rows'],
+            }},
+            'diagrams': {'type': 'array', 'items': {
+                'type': 'object',
+                'properties': {'title': {'type': 'string'}, 'mermaid': {'type': 'string'}},
+                'required': ['mermaid'],
+            }},
+            'code': {'type': 'array', 'items': {
+                'type': 'object',
+                'properties': {'title': {'type': 'string'}, 'language': {'type': 'string'},
+                               'code': {'type': 'string'}},
+                'required': ['code'],
+            }},
+        },
+        'required': ['text'],
+    }
+    
+    properties = {}
+    if with_title:
+        properties['title'] = {'type': 'string', 'description': "Título del documento: 'Tipo Nombre', sin emojis"}
+    for heading in headings:
+        properties[section_key(heading)] = dict(section_schema, description=heading)
+    
+    return {
+        'name': STRUCTURED_TOOL_NAME,
+        'description': 'Guarda la documentación técnica, una propiedad por sección del documento.',
+        'input_schema': {'type': 'object', 'properties': properties, 'required': list(properties)},
+    }
+
+
+def render_structured_section(heading: str, section: Dict) -> str:
+    """Markdown determinista de una sección estructurada (texto, tablas, diagramas y código)"""
+    
+    def cell(value) -> str:
+        return ' '.join(str(value).split()).replace('|', '\\|')
+    
+    text = (section.get('text') or '').strip()
+    if text.startswith(heading):
+        text = text[len(heading):].strip()
+    # Un '## ' dentro del texto partiría la sección en dos
+    parts = [heading, '', re.sub(r'^## ', '### ', text, flags=re.MULTILINE)] if text else [heading]
+    
+    for table in section.get('tables') or []:
+        columns = [cell(column) for column in table.get('columns') or []]
+        if not columns:
+            continue
+        if table.get('title'):
+            parts += ['', f"**{cell(table['title'])}**"]
+        parts += ['', '| ' + ' | '.join(columns) + ' |', '|' + '|'.join('---' for _ in columns) + '|']
+        for row in table.get('rows') or []:
+            row = [cell(value) for value in row][:len(columns)]
+            parts.append('| ' + ' | '.join(row + [''] * (len(columns) - len(row))) + ' |')
+    
+    for diagram in section.get('diagrams') or []:
+        if diagram.get('title'):
+            parts += ['', f"**{cell(diagram['title'])}**"]
+        parts += ['', '```mermaid', diagram.get('mermaid', '').strip().replace('```', ''), '```']
+    
+    for snippet in section.get('code') or []:
+        if snippet.get('title'):
+            parts += ['', f"**{cell(snippet['title'])}**"]
+        language = re.sub(r'\W', '', snippet.get('language') or '') or 'text'
+        parts += ['', f"```{language}", snippet.get('code', '').rstrip().replace('```', ''), '```']
+    
+    return '\n'.join(parts) + '\n\n'
+
+
+def render_structured_document(title: str, headings: List[str], data: Dict) -> str:
+    """Documento Markdown completo a partir de la salida estructurada, en el orden de las secciones del prompt"""
+    return f"# {title}\n\n" + ''.join(
+        render_structured_section(heading, data[section_key(heading)])
+        for heading in headings if isinstance(data.get(section_key(heading)), dict)
+    )
+
+
+def create_http_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """Crea una sesión HTTP con pool de conexiones keep-alive"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def load_source_file(file_path: Path, repo_root: Path) -> Tuple[Tuple[int, int], Dict]:
+    """Lee, decodifica, cuenta líneas y hashea un archivo; devuelve (clave mtime/tamaño, info)"""
+    stat = file_path.stat()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    file_info = {
+        'path': str(file_path.relative_to(repo_root)),
+        'content': content,
+        'size': len(content),
+        'lines': len(content.splitlines()),
+        'hash': hashlib.sha256(content.encode('utf-8')).hexdigest()
+    }
+    return (stat.st_mtime_ns, stat.st_size), file_info
+
+def read_source_shard(repo_root: Path, paths: List[Path]) -> List[Tuple]:
+    """Lee un bloque de archivos en un hilo o proceso del pool de escaneo: (clave, info, error) por archivo"""
+    results = []
+    for file_path in paths:
+        try:
+            results.append(load_source_file(file_path, repo_root) + (None,))
+        except Exception as e:
+            results.append((None, None, str(e)))
+    return results
+
+def mask_apex_source(code: str) -> Tuple[str, str]:
+    """(sin comentarios, sin comentarios ni literales); misma longitud y saltos de línea que el original"""
+    def blank(match):
+        return re.sub(r'[^\n]', ' ', match.group(0))
+    
+    def blank_comment(match):
+        return blank(match) if match.group(0).startswith('/') else match.group(0)
+    
+    token_pattern = r"//[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\\n])*'"
+    without_comments = re.sub(token_pattern, blank_comment, code, flags=re.DOTALL)
+    masked = re.sub(token_pattern, lambda match: match.group(0)[0] + blank(match)[1:-1] + match.group(0)[-1]
+                    if match.group(0).startswith("'") else blank(match), code, flags=re.DOTALL)
+    return without_comments, masked
+
+def check_query_selectivity(query: str) -> Optional[str]:
+    """Motivo por el que una consulta SOQL es probablemente no selectiva (None si parece selectiva)"""
+    normalized = ' '.join(query.upper().split())
+    if ' WHERE ' not in normalized:
+        return None if ' LIMIT ' in normalized else 'sin WHERE ni LIMIT'
+    
+    where = re.split(r'\b(?:ORDER BY|GROUP BY|LIMIT|OFFSET|FOR UPDATE)\b', normalized.split(' WHERE ', 1)[1])[0]
+    if re.search(r"LIKE\s+'%", where):
+        return "LIKE con comodín inicial"
+    positive = re.search(r'(?<![!<>])=(?!\s*NULL\b)|[<>](?!=?\s*NULL)|(?<!NOT )\bIN\b|\bINCLUDES\b', where)
+    if not positive:
+        return 'solo filtros negativos o nulos'
+    return None
+
+def analyze_apex_source(code: str, is_trigger: bool = False) -> List[Dict]:
+    """Analizador léxico de Apex: SOQL/DML en bucles, consultas no selectivas, bucles anidados y triggers no bulkificados"""
+    
+    without_comments, masked = mask_apex_source(code)
+    line_starts = [0] + [match.end() for match in re.finditer(r'\n', masked)]
+    findings = []
+    
+    def line_of(position: int) -> int:
+        low, high = 0, len(line_starts)
+        while low + 1 < high:
+            middle = (low + high) // 2
+            if line_starts[middle] <= position:
+                low = middle
+            else:
+                high = middle
+        return low + 1
+    
+    def add(rule: str, position: int, detail: str):
+        findings.append({'rule': rule, 'line': line_of(position), 'detail': detail})
+    
+    tokens = [(match.group(0), match.start()) for match in re.finditer(r'[A-Za-z_]\w*|[{}()\[\];:.]', masked)]
+    # Pila de bloques: 'loop'/'do' (cuerpo de bucle con llaves), 'block' o 'stmt' (bucle sin llaves hasta el ';')
+    # Un bucle solo se apila al empezar su cuerpo: su cabecera (for (Account a : [SELECT ...])) no cuenta como bucle
+    stack = []
+    last_closed = None
+    header_depth = None     # profundidad de paréntesis dentro de la cabecera de un for/while
+    paren_depth = 0
+    pending_loop = False    # cabecera cerrada, falta saber si el cuerpo lleva llaves
+    previous = ';'
+    
+    for index, (token, position) in enumerate(tokens):
+        lower = token.lower()
+        loop_depth = sum(1 for block in stack if block != 'block')
+        
+        if pending_loop and token != '{':
+            stack.append('stmt')
+            pending_loop = False
+            loop_depth += 1
+        
+        if lower == 'while' and previous == '}' and last_closed == 'do':
+            pass    # condición final de un do { } while (...)
+        elif lower in ('for', 'while', 'do'):
+            if loop_depth:
+                add('nested_loop', position, f"'{lower}' dentro de otro bucle")
+            if lower == 'do':
+                pending_loop = 'do'
+            else:
+                header_depth = paren_depth
+        elif token == '(':
+            paren_depth += 1
+        elif token == ')':
+            paren_depth -= 1
+            if header_depth is not None and paren_depth == header_depth:
+                header_depth = None
+                pending_loop = 'loop'
+                previous = token
+                continue
+        elif token == '{':
+            stack.append(pending_loop or 'block')
+            pending_loop = False
+        elif token == '}':
+            while stack and stack[-1] == 'stmt':
+                stack.pop()
+            last_closed = stack.pop() if stack else None
+        elif token == ';':
+            while stack and stack[-1] == 'stmt':
+                stack.pop()
+        
+        in_loop = loop_depth > 0
+        
+        if token == '[' and index + 1 < len(tokens) and tokens[index + 1][0].lower() == 'select':
+            end = masked.find(']', position)
+            query = without_comments[position + 1:end if end != -1 else len(masked)]
+            if in_loop:
+                add('soql_in_loop', position, ' '.join(query.split())[:80])
+            reason = check_query_selectivity(query)
+            if reason:
+                add('non_selective_query', position, reason)
+        elif lower in APEX_DML_KEYWORDS and previous in (';', '{', '}', ')') and in_loop \
+                and index + 1 < len(tokens) and tokens[index + 1][0] not in ('(', ';', '.', ':'):
+            add('dml_in_loop', position, f"{lower} {tokens[index + 1][0]}")
+        elif lower == 'database' and index + 2 < len(tokens) and tokens[index + 1][0] == '.' and in_loop:
+            method = tokens[index + 2][0].lower()
+            if method in APEX_DML_KEYWORDS:
+                add('dml_in_loop', position, f"Database.{method}")
+            elif method in ('query', 'countquery'):
+                add('soql_in_loop', position, f"Database.{method}")
+        
+        previous = token
+    
+    if is_trigger:
+        for match in re.finditer(r'\bTrigger\s*\.\s*(new|old)\s*(?:\[\s*0\s*\]|\.\s*get\s*\(\s*0\s*\))', masked, re.IGNORECASE):
+            add('trigger_not_bulkified', match.start(), f"solo procesa Trigger.{match.group(1)}[0]")
+    
+    return sorted(findings, key=lambda finding: (finding['line'], finding['rule']))
+
+def repair_storage_format(storage: str) -> Tuple[str, Dict[str, int]]:
+    """Valida y repara en una sola pasada el storage format; devuelve (storage, problemas por tipo)"""
+    
+    issues = {}
+    output = []
+    stack = []
+    
+    def found(kind: str, count: int = 1):
+        issues[kind] = issues.get(kind, 0) + count
+    
+    def clean_text(text: str) -> str:
+        if XML_INVALID_CHARS.search(text):
+            found('invalid_char', len(XML_INVALID_CHARS.findall(text)))
+            text = XML_INVALID_CHARS.sub('', text)
+        unescaped = text.count('<') + len(STORAGE_ENTITY_PATTERN.findall(text))
+        if unescaped:
+            found('unescaped_text', unescaped)
+            text = STORAGE_ENTITY_PATTERN.sub('&amp;', text).replace('<', '&lt;')
+        return text
+    
+    def cdata(content: str) -> str:
+        if XML_INVALID_CHARS.search(content):
+            found('invalid_char', len(XML_INVALID_CHARS.findall(content)))
+            content = XML_INVALID_CHARS.sub('', content)
+        return '<![CDATA[' + content.replace(']]>', ']]]]><![CDATA[>') + ']]>'
+    
+    position = 0
+    while position < len(storage):
+        match = STORAGE_TOKEN_PATTERN.search(storage, position)
+        if not match:
+            output.append(clean_text(storage[position:]))
+            break
+        output.append(clean_text(storage[position:match.start()]))
+        position = match.end()
+        token = match.group(0)
+        
+        if token.startswith('<!--'):
+            output.append(token)
+            continue
+        if token.startswith('<![CDATA['):
+            output.append(cdata(match.group(1)))
+            continue
+        
+        closing, name, attributes, self_closing = match.group(2), match.group(3), match.group(4), match.group(5)
+        tag = name.lower() if ':' not in name else name
+        if stack and stack[-1] == 'code' and not (closing and tag == 'code'):
+            # Dentro de <code> todo es texto: List<S> no abre un <s>
+            found('code_markup')
+            output.append('&lt;' + clean_text(token[1:]))
+            continue
+        if (':' not in name and name != tag and not closing and match.start() > 0 and
+                (storage[match.start() - 1].isalnum() or storage[match.start() - 1] == '_')):
+            # Genérico pegado a un identificador con mayúsculas (List<S>, Map<String, List<B>>)
+            found('unknown_tag')
+            output.append('&lt;' + clean_text(token[1:]))
+            continue
+        if ':' not in name and name != tag:
+            found('tag_case')
+        if tag not in STORAGE_HTML_TAGS and not tag.startswith(('ac:', 'ri:')):
+            # Genéricos de código (List<Account>) o HTML no admitido: se publican como texto
+            found('unknown_tag')
+            output.append('&lt;' + clean_text(token[1:]))
+            continue
+        
+        if closing:
+            if tag in STORAGE_VOID_TAGS:
+                continue
+            if tag not in stack:
+                found('stray_close')
+                continue
+            while stack[-1] != tag:
+                found('unclosed')
+                output.append(f"</{stack.pop()}>")
+            output.append(f"</{stack.pop()}>")
+            continue
+        
+        if XML_INVALID_CHARS.search(attributes) or STORAGE_ENTITY_PATTERN.search(attributes):
+            found('unescaped_text')
+            attributes = STORAGE_ENTITY_PATTERN.sub('&amp;', XML_INVALID_CHARS.sub('', attributes))
+        
+        if tag in ('ac:structured-macro', 'ac:parameter') and 'ac:name=' not in attributes:
+            # Sin nombre Confluence rechaza la macro: se conserva solo su contenido
+            found('macro_schema')
+            if not self_closing:
+                close = storage.find(f"</{name}>", position)
+                if close != -1:
+                    storage = storage[:close] + storage[close + len(name) + 3:]
+            continue
+        
+        if tag in STORAGE_BLOCK_TAGS:
+            while stack and stack[-1] in STORAGE_INLINE_TAGS:
+                found('block_in_inline')
+                output.append(f"</{stack.pop()}>")
+        
+        if tag == 'ac:plain-text-body' and not self_closing:
+            # El cuerpo de texto plano solo admite un CDATA
+            close = storage.find('</ac:plain-text-body>', position)
+            end = close if close != -1 else len(storage)
+            body = storage[position:end]
+            body_match = re.fullmatch(r'\s*<!\[CDATA\[(.*)\]\]>\s*', body, re.DOTALL)
+            if body_match:
+                content = body_match.group(1)
+            else:
+                found('macro_schema')
+                content = html.unescape(body)
+            if close == -1:
+                found('unclosed')
+            output.append(f"<{tag}{attributes}>{cdata(content)}</{tag}>")
+            position = end + len('</ac:plain-text-body>') if close != -1 else end
+            continue
+        
+        # Etiquetas HTML siempre en minúsculas: apertura y cierre deben coincidir para el parser XML
+        if self_closing or tag in STORAGE_VOID_TAGS:
+            output.append(f"<{tag}{attributes}/>")
+        else:
+            stack.append(tag)
+            output.append(f"<{tag}{attributes}>")
+    
+    if stack:
+        found('unclosed', len(stack))
+        output.extend(f"</{tag}>" for tag in reversed(stack))
+    
+    repaired = ''.join(output)
+    if storage_parse_error(repaired):
+        found('not_well_formed')
+    return repaired, issues
+
+
+def storage_parse_error(storage: str) -> Optional[str]:
+    """Error del parser XML sobre el storage como lo valida Confluence (None si está bien formado)"""
+    parser = xml.parsers.expat.ParserCreate()
+    parser.UseForeignDTD(True)  # Entidades HTML (&nbsp;...) permitidas, como en Confluence
+    try:
+        parser.Parse(f'<root xmlns:ac="ac" xmlns:ri="ri">{storage}</root>', True)
+        return None
+    except xml.parsers.expat.ExpatError as e:
+        return str(e)
+
+
+def markdown_to_confluence_storage(markdown_content: str) -> str:
+    """Convierte markdown a Confluence Storage Format con mejor soporte"""
+    
+    # Bloques de código fuera primero: ni el formato en línea ni los <br/> deben tocar su contenido
+    code_blocks = []
+    
+    def protect_block(match):
+        code_blocks.append(
+            f'<ac:structured-macro ac:name="code"><ac:parameter ac:name="language">{match.group(1) or "text"}'
+            f'</ac:parameter><ac:plain-text-body><![CDATA[{match.group(2)}]]></ac:plain-text-body></ac:structured-macro>'
+        )
+        return f"§§CODE{len(code_blocks) - 1}§§"
+    
+    content = re.sub(r'```(\w+)?\n(.*?)\n```', protect_block, markdown_content, flags=re.DOTALL)
+    
+    # Headers con mejor manejo
+    content = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', content, flags=re.MULTILINE)
+    content = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', content, flags=re.MULTILINE)
+    content = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', content, flags=re.MULTILINE)
+    content = re.sub(r'^#### (.*?)$', r'<h4>\1</h4>', content, flags=re.MULTILINE)
+    
+    # Bold and italic
+    content = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
+    content = re.sub(r'\*(.*?)\*', r'<em>\1</em>', content)
+    
+    # Tables - mejor conversión
+    content = convert_markdown_tables(content)
+    
+    # Inline code (genéricos como List<Account> escapados)
+    content = re.sub(r'`(.*?)`', lambda m: f"<code>{html.escape(m.group(1), quote=False)}</code>", content)
+    
+    # Lists con mejor estructura
+    content = convert_markdown_lists(content)
+    
+    # Links
+    content = re.sub(r'\[([^\]]+)\]\(([^\)]+)\)', r'<a href="\2">\1</a>', content)
+    
+    # Line breaks
+    content = content.replace('\n', '<br/>')
+    
+    return re.sub(r'§§CODE(\d+)§§', lambda m: code_blocks[int(m.group(1))], content)
+
+def convert_markdown_tables(content: str) -> str:
+    """Convierte tablas markdown a formato Confluence"""
+    
+    def table_replacer(match):
+        lines = match.group(0).strip().split('\n')
+        if len(lines) < 2:
+            return match.group(0)
+    
+        # Header
+        headers = [cell.strip() for cell in lines[0].split('|')[1:-1]]
+    
+        # Skip separator line
+        data_lines = lines[2:]
+    
+        table_html = '<table><thead><tr>'
+        for header in headers:
+            table_html += f'<th>{header}</th>'
+        table_html += '</tr></thead><tbody>'
+    
+        for line in data_lines:
+            if line.strip():
+                cells = [cell.strip() for cell in line.split('|')[1:-1]]
+                table_html += '<tr>'
+                for cell in cells:
+                    table_html += f'<td>{cell}</td>'
+                table_html += '</tr>'
+    
+        table_html += '</tbody></table>'
+        return table_html
+    
+    # Pattern para detectar tablas markdown
+    table_pattern = r'\|.*?\|\n\|[-\s|:]+\|\n(?:\|.*?\|\n)+'
+    content = re.sub(table_pattern, table_replacer, content, flags=re.MULTILINE)
+    
+    return content
+
+def convert_markdown_lists(content: str) -> str:
+    """Convierte listas markdown a formato Confluence"""
+    
+    # Listas con bullets
+    content = re.sub(r'^- (.*?)$', r'<ul><li>\1</li></ul>', content, flags=re.MULTILINE)
+    
+    # Listas numeradas  
+    content = re.sub(r'^\d+\. (.*?)$', r'<ol><li>\1</li></ol>', content, flags=re.MULTILINE)
+    
+    # Consolidar listas consecutivas
+    content = re.sub(r'</ul><br/><ul>', '', content)
+    content = re.sub(r'</ol><br/><ol>', '', content)
+    
+    return content
+
+def prepare_storage_content(markdown_content: str, attachment_threshold: int = 0) -> Tuple[str, List[Dict]]:
+    """Convierte a storage format moviendo los bloques grandes a adjuntos referenciados"""
+    
+    if attachment_threshold <= 0:
+        return markdown_to_confluence_storage(markdown_content), []
+    
+    attachments = []
+    
+    def extract_block(match):
+        language = match.group(1) or 'text'
+        code = match.group(2)
+        if len(code) < attachment_threshold:
+            return match.group(0)
+    
+        kind = 'diagram' if language == 'mermaid' else 'listing'
+        filename = f"{kind}-{len(attachments) + 1:02d}.{ATTACHMENT_EXTENSIONS.get(language, 'txt')}"
+        attachments.append({
+            'filename': filename,
+            'content': code,
+            'language': language,
+            'lines': len(code.splitlines()),
+            'hash': hashlib.sha256(code.encode('utf-8')).hexdigest(),
+            'token': f"§§ATTACHMENT{len(attachments)}§§",
+        })
+        return attachments[-1]['token']
+    
+    content = re.sub(r'```(\w+)?\n(.*?)\n```', extract_block, markdown_content, flags=re.DOTALL)
+    storage = markdown_to_confluence_storage(content)
+    
+    for attachment in attachments:
+        label = 'Diagrama' if attachment['language'] == 'mermaid' else 'Código'
+        reference = (
+            f'<p><ac:link><ri:attachment ri:filename="{attachment["filename"]}"/>'
+            f'<ac:plain-text-link-body><![CDATA[📎 {label} {attachment["language"]}: '
+            f'{attachment["filename"]} ({attachment["lines"]} líneas)]]></ac:plain-text-link-body></ac:link></p>'
+        )
+        storage = storage.replace(attachment['token'], reference)
+    
+    if attachments:
+        print(f"📎 {len(attachments)} bloque(s) grandes movidos a adjuntos")
+    return storage, attachments
+
+def convert_storage_chunk(documents: List[str], attachment_threshold: int = 0) -> List[Tuple[str, List[Dict]]]:
+    """Convierte un bloque de documentos en orden (en el pool de conversión solo viajan los documentos y el umbral)"""
+    return [prepare_storage_content(document, attachment_threshold) for document in documents]
+
+
+def metadata_signature(content: str, attributes: List[str]) -> Tuple[str, Dict[str, str]]:
+    """Firma estructural de un XML de metadata (raíz, hijos, tipo, campos de los registros) y sus atributos clave"""
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return '', {}
+    
+    def local(tag: str) -> str:
+        return tag.rsplit('}', 1)[-1]
+    
+    def text(element) -> str:
+        return ' '.join(''.join(element.itertext()).split())
+    
+    children = [(local(child.tag), child) for child in root]
+    # Registros de custom metadata: los campos informados definen la estructura
+    record_fields = sorted(text(child.find('{*}field')) for tag, child in children
+                           if tag == 'values' and child.find('{*}field') is not None)
+    signature = '|'.join([local(root.tag), ','.join(sorted({tag for tag, _ in children})),
+                          next((text(child) for tag, child in children if tag == 'type'), ''),
+                          ','.join(record_fields)])
+    
+    values = {}
+    for attribute in attributes:
+        if attribute == 'values':
+            pairs = [f"{text(child.find('{*}field'))}={text(child.find('{*}value'))}" for tag, child in children
+                     if tag == 'values' and child.find('{*}field') is not None and child.find('{*}value') is not None]
+            values[attribute] = ', '.join(pairs)
+        else:
+            values[attribute] = next((text(child) for tag, child in children if tag == attribute), '')
+    return signature, values
+
+
+def split_text_chunks(text: str, limit: int) -> List[str]:
+    """Parte un texto por líneas en trozos de como mucho limit caracteres (una línea mayor va sola)"""
+    chunks = []
+    current = ''
+    for line in text.splitlines(keepends=True):
+        if current and len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ''
+        current += line
+    return chunks + [current] if current else chunks
+
+
+def criticality_level(priority: int) -> str:
+    """Clasificación 🔴/🟡/🟢 de una prioridad de COMPONENT_PRIORITY"""
+    return '🔴' if priority <= 1 else '🟡' if priority <= 3 else '🟢'
+
+
+def read_rss_bytes() -> Optional[int]:
+    """RSS actual del proceso (Linux: /proc/self/statm); None si no está disponible"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+# Fases de run() medidas por --profile-memory (claves válidas del presupuesto JSON)
+MEMORY_PROFILE_PHASES = ('scan', 'plan', 'generate', 'convert', 'publish', 'ledger')
+
+def parse_memory_budget(budget: str) -> Tuple[Dict[str, float], float]:
+    """--memory-budget-mb: MB para todas las fases o JSON {"fase": MB} → (por fase, por defecto); ValueError si no"""
+    if not budget:
+        return {}, 0.0
+    try:
+        default_budget = float(budget)
+    except ValueError:
+        pass
+    else:
+        if default_budget < 0:
+            raise ValueError('los MB no pueden ser negativos')
+        return {}, default_budget
+    
+    try:
+        budgets = json.loads(budget)
+    except json.JSONDecodeError:
+        raise ValueError(f"'{budget}' no es un número de MB ni un objeto JSON {{\"fase\": MB}}") from None
+    if not isinstance(budgets, dict):
+        raise ValueError('el JSON debe ser un objeto {"fase": MB}')
+    unknown = sorted(set(budgets) - set(MEMORY_PROFILE_PHASES))
+    if unknown:
+        raise ValueError(f"fases desconocidas: {', '.join(unknown)} (válidas: {', '.join(MEMORY_PROFILE_PHASES)})")
+    for phase, mb in budgets.items():
+        if isinstance(mb, bool) or not isinstance(mb, (int, float)) or mb < 0:
+            raise ValueError(f"el presupuesto de '{phase}' debe ser un número de MB no negativo")
+    return {phase: float(mb) for phase, mb in budgets.items()}, 0.0
+
+class MemoryBudgetExceeded(Exception):
+    """Una fase del pipeline superó su pico de memoria permitido (--profile-memory)"""
+
+class MemoryProfiler:
+    """Perfil de memoria por fase: snapshots de tracemalloc + muestreo de RSS con presupuesto de pico"""
+    
+    def __init__(self, budgets: Dict[str, float], default_budget_mb: float = 0.0, top: int = 10,
+                 interval: float = 0.05, report_path: Optional[Path] = None):
+        self.budgets = budgets
+        self.default_budget_mb = default_budget_mb
+        self.top = top
+        self.interval = interval
+        self.report_path = report_path
+        self.phases = []
+        self.active = None  # Estado de la fase en curso (lo comparte el hilo de muestreo)
+        tracemalloc.start()
+
+    def filtered_snapshot(self) -> tracemalloc.Snapshot:
+        """Snapshot sin las asignaciones del propio tracemalloc ni de importlib"""
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Mide una fase; con presupuesto, la corta en el siguiente check() tras superarlo el RSS"""
+        budget_mb = self.budgets.get(name, self.default_budget_mb)
+        tracemalloc.reset_peak()
+        before = self.filtered_snapshot()
+        rss_start = read_rss_bytes()
+        state = {'name': name, 'budget_mb': budget_mb, 'rss_peak': rss_start or 0, 'exceeded': False}
+        stop = threading.Event()
+        
+        def sample_rss():
+            while not stop.wait(self.interval):
+                rss = read_rss_bytes()
+                if rss is None:
+                    return
+                state['rss_peak'] = max(state['rss_peak'], rss)
+                if budget_mb and rss > budget_mb * 1024 * 1024:
+                    # Solo se marca: el hilo principal lo comprueba entre unidades (check) y al cerrar la fase
+                    state['exceeded'] = True
+                    return
+        
+        sampler = threading.Thread(target=sample_rss, daemon=True)
+        sampler.start()
+        self.active = state
+        start = time.perf_counter()
+        try:
+            yield
+        except MemoryBudgetExceeded:
+            if not state['exceeded']:
+                raise
+        finally:
+            stop.set()
+            sampler.join()
+            self.active = None
+        
+        rss_end = read_rss_bytes()
+        state['rss_peak'] = max(state['rss_peak'], rss_end or 0)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        top_sites = self.filtered_snapshot().compare_to(before, 'lineno')[:self.top]
+        
+        record = {
+            'phase': name,
+            'duration_s': round(time.perf_counter() - start, 3),
+            'traced_peak_mb': round(traced_peak / 1024 / 1024, 2),
+            'rss_start_mb': round((rss_start or 0) / 1024 / 1024, 2),
+            'rss_peak_mb': round(state['rss_peak'] / 1024 / 1024, 2),
+            'budget_mb': budget_mb or None,
+            'interrupted': state['exceeded'],
+            'top_allocations': [
+                {'site': str(stat.traceback[0]), 'size_diff_kb': round(stat.size_diff / 1024, 1), 'count_diff': stat.count_diff}
+                for stat in top_sites
+            ],
+        }
+        self.phases.append(record)
+        self.print_phase(record)
+        self.save()
+        
+        # Sin RSS (no Linux) el presupuesto se aplica al pico de tracemalloc
+        peak_mb = record['rss_peak_mb'] if rss_start is not None else record['traced_peak_mb']
+        if state['exceeded'] or (budget_mb and peak_mb > budget_mb):
+            raise MemoryBudgetExceeded(f"Fase '{name}': pico de memoria {peak_mb:.1f} MB > presupuesto {budget_mb:.1f} MB")
+
+    def check(self):
+        """Punto de corte cooperativo entre unidades de trabajo: lanza MemoryBudgetExceeded si la fase lo superó"""
+        state = self.active
+        if state and state['exceeded']:
+            raise MemoryBudgetExceeded(f"Fase '{state['name']}': RSS {state['rss_peak'] / 1024 / 1024:.1f} MB > "
+                                       f"presupuesto {state['budget_mb']:.1f} MB")
+
+    def print_phase(self, record: Dict):
+        """Resumen de la fase y sus principales sitios de asignación"""
+        print(f"🧠 Memoria [{record['phase']}]: pico RSS {record['rss_peak_mb']:.1f} MB "
+              f"(inicio {record['rss_start_mb']:.1f} MB), pico tracemalloc {record['traced_peak_mb']:.1f} MB, "
+              f"{record['duration_s']:.2f}s" + (" ⛔ INTERRUMPIDA" if record['interrupted'] else ""))
+        for allocation in record['top_allocations'][:5]:
+            print(f"   {allocation['size_diff_kb']:>10,.1f} KB  {allocation['site']}")
+
+    def save(self):
+        """Informe JSON con todas las fases medidas hasta ahora"""
+        if not self.report_path:
+            return
+        try:
+            self.report_path.parent.mkdir(parents=True, exist_ok=True)
+            self.report_path.write_text(json.dumps({'phases': self.phases}, indent=2, ensure_ascii=False),
+                                        encoding='utf-8')
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el perfil de memoria: {e}")
+
+class DocumentationIndex:
+    """Índice local SQLite FTS5: documentos generados, símbolos (métodos/campos) y páginas publicadas"""
+    
+    def __init__(self, path: Path, read_only: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        if read_only:
+            # Consultas (--search): sin migración ni escrituras; un índice de otra versión no se toca
+            self.connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True,
+                                              check_same_thread=False, timeout=30)
+            version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != DOC_INDEX_SCHEMA_VERSION:
+                self.connection.close()
+                raise sqlite3.DatabaseError(f"esquema v{version}, se esperaba v{DOC_INDEX_SCHEMA_VERSION} "
+                                            f"(se reconstruye en la próxima generación)")
+            return
+        
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] != DOC_INDEX_SCHEMA_VERSION:
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS pages;
+                DROP TABLE IF EXISTS symbols;
+                DROP TABLE IF EXISTS documents;
+            """)
+        self.connection.executescript(f"""
+            CREATE TABLE IF NOT EXISTS pages (
+                title TEXT PRIMARY KEY, final_title TEXT, page_id TEXT, space_key TEXT, url TEXT,
+                commit_key TEXT, generated_at TEXT, published_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS pages_final_title ON pages(final_title);
+            CREATE TABLE IF NOT EXISTS symbols (title TEXT, kind TEXT, name TEXT COLLATE NOCASE, path TEXT);
+            CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+            CREATE INDEX IF NOT EXISTS symbols_title ON symbols(title);
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+                title, content, tokenize = 'unicode61 remove_diacritics 2'
+            );
+            PRAGMA user_version = {DOC_INDEX_SCHEMA_VERSION};
+        """)
+    
+    def index_document(self, title: str, markdown: str, symbols: List[Tuple[str, str, str]], commit_key: str):
+        """Sustituye el documento y los símbolos de un título"""
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM documents WHERE title = ?', (title,))
+            self.connection.execute('INSERT INTO documents (title, content) VALUES (?, ?)', (title, markdown))
+            self.connection.execute('DELETE FROM symbols WHERE title = ?', (title,))
+            self.connection.executemany('INSERT INTO symbols (title, kind, name, path) VALUES (?, ?, ?, ?)',
+                                        [(title, kind, name, path) for kind, name, path in symbols])
+            self.connection.execute(
+                'INSERT INTO pages (title, commit_key, generated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(title) DO UPDATE SET commit_key = excluded.commit_key, generated_at = excluded.generated_at',
+                (title, commit_key, datetime.now().isoformat())
+            )
+    
+    def record_page(self, title: str, final_title: str, page_id: str, space_key: str, url: str):
+        """Guarda la página publicada de un documento"""
+        with self.lock, self.connection:
+            self.connection.execute(
+                'INSERT INTO pages (title, final_title, page_id, space_key, url, published_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(title) DO UPDATE SET final_title = excluded.final_title, page_id = excluded.page_id, '
+                'space_key = excluded.space_key, url = excluded.url, published_at = excluded.published_at',
+                (title, final_title, page_id, space_key, url, datetime.now().isoformat())
+            )
+    
+    def find_page(self, title: str, space_key: str) -> Optional[str]:
+        """ID de la página publicada para un título de documento o de página (None si no está indexada)"""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT page_id FROM pages WHERE (title = ? OR final_title = ?) AND space_key = ? AND page_id IS NOT NULL',
+                (title, title, space_key)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def forget_page(self, page_id: str) -> bool:
+        """Olvida una página que ya no existe en Confluence; True si estaba indexada"""
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                'UPDATE pages SET page_id = NULL, url = NULL, published_at = NULL WHERE page_id = ?', (page_id,)
+            )
+        return cursor.rowcount > 0
+    
+    def search(self, query: str, kind: str = 'any', limit: int = 20) -> List[Dict]:
+        """Busca componentes (título), métodos, campos o texto libre; resultados con su página"""
+        
+        results = []
+        # Los nombres Salesforce llevan '_' (Account_Number__c): comodines de LIKE escapados
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', query) + '%'
+        with self.lock:
+            if kind in ('any', 'component'):
+                rows = self.connection.execute(
+                    'SELECT title, final_title, page_id, url, generated_at FROM pages '
+                    "WHERE title LIKE ? ESCAPE '\\' OR final_title LIKE ? ESCAPE '\\' "
+                    'ORDER BY length(title), title LIMIT ?',
+                    (pattern, pattern, limit)
+                ).fetchall()
+                results += [{'kind': 'component', 'name': title, 'title': title, 'page_title': final_title,
+                             'page_id': page_id, 'url': url, 'detail': f"generado {generated_at or '-'}"}
+                            for title, final_title, page_id, url, generated_at in rows]
+            
+            if kind in ('any', 'method', 'field'):
+                kinds = ('method', 'field') if kind == 'any' else (kind,)
+                rows = self.connection.execute(
+                    f"SELECT s.kind, s.name, s.title, s.path, p.final_title, p.page_id, p.url FROM symbols s "
+                    f"LEFT JOIN pages p ON p.title = s.title WHERE s.kind IN ({','.join('?' * len(kinds))}) "
+                    f"AND s.name LIKE ? ESCAPE '\\' ORDER BY s.name = ? DESC, length(s.name), s.name LIMIT ?",
+                    (*kinds, pattern, query, limit)
+                ).fetchall()
+                results += [{'kind': symbol_kind, 'name': name, 'title': title, 'page_title': final_title,
+                             'page_id': page_id, 'url': url, 'detail': path}
+                            for symbol_kind, name, title, path, final_title, page_id, url in rows]
+            
+            if kind in ('any', 'text'):
+                # Cada palabra como término entre comillas (sin sintaxis FTS5) con búsqueda por prefijo
+                match = ' '.join('"' + term.replace('"', '""') + '"*' for term in query.split())
+                rows = self.connection.execute(
+                    "SELECT d.title, snippet(documents, 1, '[', ']', '…', 12), p.final_title, p.page_id, p.url "
+                    "FROM documents d LEFT JOIN pages p ON p.title = d.title "
+                    "WHERE documents MATCH ? ORDER BY bm25(documents) LIMIT ?",
+                    (match, limit)
+                ).fetchall() if match else []
+                results += [{'kind': 'text', 'name': title, 'title': title, 'page_title': final_title,
+                             'page_id': page_id, 'url': url, 'detail': ' '.join(snippet.split())}
+                            for title, snippet, final_title, page_id, url in rows]
+        
+        return results
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def extract_document_symbols(repository_data: Dict) -> List[Tuple[str, str, str]]:
+    """Métodos (Apex, LWC) y campos (metadata de objetos) de un documento: (tipo, nombre, ruta)"""
+    
+    symbols = []
+    for comp_type, data in repository_data.items():
+        if isinstance(data, dict):
+            for bundle in data.values():
+                for file_info in bundle.values():
+                    if file_info['path'].endswith('.js'):
+                        symbols += [('method', name, file_info['path'])
+                                    for name in dict.fromkeys(LWC_METHOD_PATTERN.findall(file_info['content']))]
+            continue
+        
+        for file_info in data:
+            path = file_info['path']
+            if comp_type in ('apex_classes', 'apex_triggers'):
+                code = mask_apex_source(file_info['content'])[1]
+                class_name = Path(path).name.split('.')[0]
+                symbols += [('method', f"{class_name}.{name}", path)
+                            for name in dict.fromkeys(APEX_METHOD_PATTERN.findall(code))]
+            elif path.endswith('.field-meta.xml'):
+                parts = Path(path).parts
+                object_name = parts[parts.index('objects') + 1] if 'objects' in parts else ''
+                field_name = Path(path).name.split('.')[0]
+                symbols.append(('field', f"{object_name}.{field_name}" if object_name else field_name, path))
+    
+    return symbols
+
+
+def search_documentation_index(cache_dir: Path, query: str, kind: str = 'any', limit: int = 20) -> bool:
+    """CLI de consulta del índice local (sin credenciales ni red); False si no hay resultados"""
+    
+    index_path = cache_dir / DOC_INDEX_FILE
+    if not index_path.exists():
+        print(f"⚠️ No existe el índice local {index_path} (se crea al generar documentación)")
+        return False
+    
+    start = time.perf_counter()
+    try:
+        index = DocumentationIndex(index_path, read_only=True)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se puede consultar el índice local {index_path}: {e}")
+        return False
+    try:
+        results = index.search(query, kind, limit)
+    finally:
+        index.close()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    print(f"🔎 '{query}' ({kind}): {len(results)} resultado(s) en {elapsed_ms:.1f} ms")
+    for result in results:
+        page = f"{result['page_title']} (ID: {result['page_id']})" if result['page_id'] else 'sin publicar'
+        print(f"   [{result['kind']}] {result['name']} → {result['title']} | {page}")
+        if result['detail']:
+            print(f"      {result['detail']}")
+        if result['url']:
+            print(f"      🔗 {result['url']}")
+    return bool(results)
+
+
 class SuperSalesforceDocumentationGenerator:
-    def __init__(self):
+    def __init__(self, repo_root: str = '.', session: Optional[requests.Session] = None,
+                 require_confluence: bool = True):
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
         self.atlassian_email = os.getenv('ATLASSIAN_EMAIL')
         self.atlassian_api_token = os.getenv('ATLASSIAN_API_TOKEN')
         self.atlassian_base_url = os.getenv('ATLASSIAN_BASE_URL')
         self.confluence_space_key = os.getenv('CONFLUENCE_SPACE_KEY')
+        # Permite apuntar a un servidor simulado (scripts/mock-servers.py)
+        self.anthropic_base_url = os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com').rstrip('/')
         
-        if not all([self.anthropic_api_key, self.atlassian_email, 
-                   self.atlassian_api_token, self.atlassian_base_url, 
-                   self.confluence_space_key]):
-            print("❌ ERROR: Variables de entorno faltantes")
+        # Las credenciales de Confluence solo hacen falta para publicar (no en vista previa)
+        required = {'ANTHROPIC_API_KEY': self.anthropic_api_key}
+        if require_confluence:
+            required.update({'ATLASSIAN_EMAIL': self.atlassian_email,
+                             'ATLASSIAN_API_TOKEN': self.atlassian_api_token,
+                             'ATLASSIAN_BASE_URL': self.atlassian_base_url,
+                             'CONFLUENCE_SPACE_KEY': self.confluence_space_key})
+        missing = [name for name, value in required.items() if not value]
+        if missing:
+            print(f"❌ ERROR: Variables de entorno faltantes: {', '.join(missing)}")
             sys.exit(1)
 
+        # Alcance: 'repository' (una página para todo el repo) o 'component' (una página por componente)
+        self.doc_scope = os.getenv('DOC_SCOPE', 'repository')
+        self.repo_root = Path(repo_root)
+        self.cache_dir = self.repo_root / os.getenv('DOC_CACHE_DIR', '.doc-cache')
+        
+        # Sesión HTTP compartida (conexiones TLS reutilizadas) y cachés en memoria
+        self.session = session or create_http_session()
+        self.file_cache = {}
+        
+        # Escaneo en bloques (shards) leídos en paralelo: DOC_SCAN_EXECUTOR = 'thread' | 'process'
+        self.scan_executor = os.getenv('DOC_SCAN_EXECUTOR', 'thread')
+        self.scan_workers = int(os.getenv('DOC_SCAN_WORKERS', str(min(32, (os.cpu_count() or 1) + 4))))
+        self.scan_shard_size = int(os.getenv('DOC_SCAN_SHARD_SIZE', '256'))
+        self.page_id_cache = {}
+        
+        # Archivos cambiados (commit range); None = documentar todo. changed_lines: líneas añadidas + eliminadas
+        # por archivo según git diff (sin diff, p.ej. en modo watch, cuenta el archivo completo)
+        self.changed_files = None
+        self.changed_lines = {}
+
+        # Modelos y presupuestos (0 = sin límite)
+        self.model = os.getenv('DOC_MODEL', DEFAULT_MODEL)
+        self.cheap_model = os.getenv('DOC_CHEAP_MODEL', DEFAULT_CHEAP_MODEL)
+        self.max_tokens = int(os.getenv('DOC_MAX_TOKENS', DEFAULT_MAX_TOKENS))
+        self.budget_run_usd = float(os.getenv('DOC_BUDGET_RUN_USD', '0') or 0)
+        self.budget_component_usd = float(os.getenv('DOC_BUDGET_COMPONENT_USD', '0') or 0)
+        
+        # Fecha límite global en minutos desde el inicio de run() (0 = sin límite); los documentos que no
+        # caben se aplazan a .doc-cache/deferred-backlog.json y la siguiente ejecución los genera primero
+        self.deadline_minutes = float(os.getenv('DOC_DEADLINE_MINUTES', '0') or 0)
+        self.deadline_reserve_s = float(os.getenv('DOC_DEADLINE_RESERVE_SECONDS', '180') or 0)
+        
+        # Router de modelos por tamaño/criticidad (DOC_MODEL_TIERS: lista JSON con el formato de DEFAULT_MODEL_TIERS);
+        # sin DOC_MODEL_TIERS los tiers usan DOC_MODEL, DOC_CHEAP_MODEL y DOC_MAX_TOKENS
+        self.model_router = os.getenv('DOC_MODEL_ROUTER', 'true').lower() == 'true'
+        if os.getenv('DOC_MODEL_TIERS'):
+            try:
+                self.model_tiers = validate_model_tiers(json.loads(os.getenv('DOC_MODEL_TIERS')))
+            except ValueError as e:
+                print(f"❌ ERROR: DOC_MODEL_TIERS inválido: {e}")
+                sys.exit(1)
+        else:
+            self.model_tiers = default_model_tiers(self.model, self.cheap_model, self.max_tokens)
+        
+        # Bloques de código/mermaid mayores que este tamaño (caracteres) se publican como adjuntos (0 = nunca)
+        self.attachment_threshold = int(os.getenv('DOC_ATTACHMENT_THRESHOLD', '0') or 0)
+        
+        # Regeneración incremental por secciones (DOC_FORCE_REGENERATE la desactiva)
+        self.incremental = (os.getenv('DOC_INCREMENTAL', 'true').lower() == 'true' and
+                            os.getenv('DOC_FORCE_REGENERATE', 'false').lower() != 'true')
+        self.incremental_max_ratio = float(os.getenv('DOC_INCREMENTAL_MAX_RATIO', '0.6'))
+        
+        # Muestreo de ejemplares: grupos de metadata del mismo tipo con al menos N archivos
+        self.exemplar_sampling = os.getenv('DOC_EXEMPLAR_SAMPLING', 'true').lower() == 'true'
+        self.exemplar_min_group = int(os.getenv('DOC_EXEMPLAR_MIN_GROUP', '8'))
+        self.exemplars_per_group = max(1, int(os.getenv('DOC_EXEMPLARS_PER_GROUP', '2')))
+        
+        # Salida estructurada por herramienta (un campo por sección) renderizada localmente a Markdown
+        self.structured_output = os.getenv('DOC_STRUCTURED_OUTPUT', 'false').lower() == 'true'
+        self.structured_titles = {}
+        
+        # Publicación dividida: página padre con índice + una página hija por sección <h2>
+        self.split_pages = os.getenv('DOC_SPLIT_PAGES', 'false').lower() == 'true'
+        self.publish_concurrency = int(os.getenv('DOC_PUBLISH_CONCURRENCY', '4'))
+        
+        # Publicación con concurrencia optimista: reintentos ante 409 (versión cambiada por otro worker/rama)
+        # y un lock por título para no competir consigo mismo dentro del proceso
+        self.publish_conflict_retries = int(os.getenv('DOC_PUBLISH_CONFLICT_RETRIES', '5'))
+        self.publish_conflict_backoff_s = float(os.getenv('DOC_PUBLISH_CONFLICT_BACKOFF_SECONDS', '0.5'))
+        self.page_locks = {}
+        self.page_locks_guard = threading.Lock()
+        
+        # Índice local de documentos y páginas (.doc-cache/doc-index.sqlite): resolución de páginas sin CQL
+        self.doc_index_enabled = os.getenv('DOC_INDEX', 'true').lower() == 'true'
+        self.doc_index = None
+        
+        # Validación y reparación del storage format antes de publicar (evita PUT rechazados con 400)
+        self.validate_storage = os.getenv('DOC_VALIDATE_STORAGE', 'true').lower() == 'true'
+        
+        # Conversión a storage format en pool de procesos (solo con suficientes documentos)
+        self.convert_workers = int(os.getenv('DOC_CONVERT_WORKERS', str(os.cpu_count() or 1)))
+        self.convert_pool_min_docs = int(os.getenv('DOC_CONVERT_POOL_MIN_DOCS', '8'))
+        
+        # Diagramas de arquitectura/dependencias generados localmente (no los dibuja el modelo)
+        self.local_diagrams = os.getenv('DOC_LOCAL_DIAGRAMS', 'true').lower() == 'true'
+        self.diagram_max_nodes = int(os.getenv('DOC_DIAGRAM_MAX_NODES', '40'))
+        
+        # Inventario, métricas y tabla de archivos generados localmente (el modelo solo escribe la narrativa)
+        self.local_tables = os.getenv('DOC_LOCAL_TABLES', 'true').lower() == 'true'
+        self.inventory_max_rows = int(os.getenv('DOC_INVENTORY_MAX_ROWS', '200'))
+        
+        # Análisis estático local de Apex (cacheado por hash de archivo en .doc-cache/apex-analysis.json)
+        self.apex_analysis = os.getenv('DOC_APEX_ANALYSIS', 'true').lower() == 'true'
+        self.apex_analysis_cache = None
+        
+        # Variantes traducidas publicadas como páginas hermanas (p.ej. DOC_TRANSLATE_LANGUAGES=en,pt)
+        self.translate_languages = [code.strip().lower() for code in os.getenv('DOC_TRANSLATE_LANGUAGES', '').split(',')
+                                    if code.strip()]
+        self.translation_concurrency = int(os.getenv('DOC_TRANSLATION_CONCURRENCY', '4'))
+        self.usage_lock = threading.Lock()
+        
+        # Vista previa local: si se define, se escribe HTML en lugar de publicar en Confluence (modo watch)
+        self.preview_dir = None
+        
+        # Artefactos por commit y componente (escaneo, prompt, Markdown, storage, publicación) para --resume
+        self.artifacts = os.getenv('DOC_ARTIFACTS', 'true').lower() == 'true'
+        self.artifact_keep = int(os.getenv('DOC_ARTIFACT_KEEP', '10'))
+        self.resume = False
+        self.artifact_commit = None
+        self.commit_key = None
+        
+        # Perfil de memoria por fase (--profile-memory); None = desactivado
+        self.memory_profiler = None
+
+        self.reset_run_state()
+
+    def enable_memory_profiling(self, budgets: Optional[Dict[str, float]] = None, default_budget: float = 0.0):
+        """Activa el perfil de memoria con presupuestos en MB por fase (ver parse_memory_budget)"""
+        self.memory_profiler = MemoryProfiler(
+            budgets or {}, default_budget, top=int(os.getenv('DOC_PROFILE_TOP', '10')),
+            report_path=self.cache_dir / 'memory-profile.json'
+        )
+
+    def profile_phase(self, name: str):
+        """Contexto de medición de una fase de run() (no hace nada sin --profile-memory)"""
+        return self.memory_profiler.phase(name) if self.memory_profiler else contextlib.nullcontext()
+
+    def check_memory_budget(self):
+        """Corta la fase en curso entre unidades de trabajo si superó su presupuesto de memoria"""
+        if self.memory_profiler:
+            self.memory_profiler.check()
+
+    def reset_run_state(self):
+        """Reinicia la contabilidad de uso de la ejecución actual"""
+        self.usage_records = []
+        self.budget_skipped = []
+        self.run_cost_usd = 0.0
+        self.reserved_cost_usd = 0.0
+        # Gasto y reservas por componente (todas sus peticiones: generación, secciones y traducciones)
+        self.component_cost_usd = {}
+        self.component_reserved_usd = {}
+        self.apex_findings = {}
+        self.run_started = time.monotonic()
+        self.generation_times = []
+        self.deferred_units = []
+        self.backlog = {}
+        # Grafo de dependencias del escaneo completo (alcance 'component': vecindario de cada documento)
+        self.dependency_graph = None
+        self.storage_repairs = {'documents': 0, 'repaired': 0, 'prevented': 0, 'invalid': 0, 'issues': {},
+                                'elapsed_s': 0.0}
+        self.exemplar_stats = {'files': 0, 'groups': 0, 'exemplars': 0, 'original_chars': 0, 'sent_chars': 0}
+
+    def read_source_file(self, file_path: Path) -> Dict:
+        """Lee un archivo del repositorio reutilizando la caché si no cambió (mtime/tamaño)"""
+        stat = file_path.stat()
+        cache_key = str(file_path)
+        cached = self.file_cache.get(cache_key)
+        if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        
+        stat_key, file_info = load_source_file(file_path, self.repo_root)
+        self.file_cache[cache_key] = (stat_key, file_info)
+        return file_info
+
+    def read_source_files(self, paths: List[Path]) -> List[Optional[Dict]]:
+        """Lee muchos archivos en bloques paralelos; resultados en el mismo orden (None si falla)"""
+        
+        results = [None] * len(paths)
+        pending = []
+        for index, file_path in enumerate(paths):
+            cached = self.file_cache.get(str(file_path))
+            try:
+                stat = file_path.stat()
+            except OSError as e:
+                print(f"⚠️ Error leyendo {file_path}: {e}")
+                continue
+            if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+                results[index] = cached[1]
+            else:
+                pending.append(index)
+        
+        shard_size = max(1, self.scan_shard_size)
+        shards = [pending[i:i + shard_size] for i in range(0, len(pending), shard_size)]
+        shard_paths = [[paths[index] for index in shard] for shard in shards]
+        
+        if len(shards) <= 1 or self.scan_workers <= 1:
+            loaded = [read_source_shard(self.repo_root, shard) for shard in shard_paths]
+        else:
+            executor_class = ProcessPoolExecutor if self.scan_executor == 'process' else ThreadPoolExecutor
+            try:
+                with executor_class(max_workers=self.scan_workers) as executor:
+                    loaded = list(executor.map(read_source_shard, [self.repo_root] * len(shards), shard_paths))
+            except POOL_UNAVAILABLE_ERRORS as e:
+                print(f"⚠️ Pool de escaneo no disponible ({e}), leyendo en el proceso principal")
+                loaded = [read_source_shard(self.repo_root, shard) for shard in shard_paths]
+            print(f"⚙️ {len(pending)} archivos leídos en {len(shards)} bloques ({self.scan_executor}, {self.scan_workers} workers)")
+        
+        # Fusión determinista: cada resultado vuelve a su posición original
+        for shard, shard_results in zip(shards, loaded):
+            for index, (stat_key, file_info, error) in zip(shard, shard_results):
+                if error:
+                    print(f"⚠️ Error leyendo {paths[index]}: {error}")
+                    continue
+                self.file_cache[str(paths[index])] = (stat_key, file_info)
+                results[index] = file_info
+        return results
+
     def analyze_salesforce_repository(self) -> Dict:
         """Analiza el repositorio y extrae información COMPLETA de componentes Salesforce"""
         repo_structure = {}
         
-        # Patrones más completos de archivos Salesforce
-        patterns = {
-            'apex_classes': ['**/*.cls'],
-            'apex_triggers': ['**/*.trigger'],
-            'flows': ['**/*.flow-meta.xml'],
-            'lwc_components': {
-                'html': '**/lwc/**/*.html',
-                'js': '**/lwc/**/*.js', 
-                'css': '**/lwc/**/*.css',
-                'xml': '**/lwc/**/*.js-meta.xml'
-            },
-            'aura_components': {
-                'cmp': '**/aura/**/*.cmp',
-                'js_controller': '**/aura/**/*Controller.js',
-                'js_helper': '**/aura/**/*Helper.js',
-                'css': '**/aura/**/*.css'
-            },
-            'visualforce': ['**/*.page', '**/*.component'],
-            'objects': ['**/*.object-meta.xml'],
-            'fields': ['**/*.field-meta.xml'],
-            'permission_sets': ['**/*.permissionset-meta.xml'],
-            'profiles': ['**/*.profile-meta.xml'],
-            'custom_metadata': ['**/*.md-meta.xml'],
-            'custom_labels': ['**/*.labels-meta.xml'],
-            'static_resources': ['**/*.resource-meta.xml'],
-            'email_templates': ['**/*.email-meta.xml'],
-            'reports': ['**/*.report-meta.xml'],
-            'dashboards': ['**/*.dashboard-meta.xml'],
-            'workflow_rules': ['**/*.workflow-meta.xml'],
-            'validation_rules': ['**/*.validation-meta.xml']
-        }
-        
-        # Función para procesar archivos normales
-        def process_files(pattern_list, component_type):
-            files_found = []
-            for pattern in pattern_list:
-                for file_path in Path('.').glob(pattern):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        files_found.append({
-                            'path': str(file_path),
-                            'content': content,
-                            'size': len(content),
-                            'lines': len(content.splitlines())
-                        })
-                    except Exception as e:
-                        print(f"⚠️ Error leyendo {file_path}: {e}")
-            return files_found
-
-        # Función para procesar componentes con subtipos (LWC, Aura)
-        def process_component_files(component_patterns, component_type):
-            components = {}
-            for subtype, pattern in component_patterns.items():
-                for file_path in Path('.').glob(pattern):
-                    # Extraer nombre del componente del path
-                    component_name = self.extract_component_name(file_path, component_type)
-                    
-                    if component_name not in components:
-                        components[component_name] = {}
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        components[component_name][subtype] = {
-                            'path': str(file_path),
-                            'content': content,
-                            'size': len(content),
-                            'lines': len(content.splitlines())
-                        }
-                    except Exception as e:
-                        print(f"⚠️ Error leyendo {file_path}: {e}")
-            return components
-
-        # Procesar cada tipo de componente
-        for component_type, pattern_config in patterns.items():
+        # 1. Enumerar archivos en el orden de los patrones: (tipo, subtipo, componente, ruta)
+        entries = []
+        for component_type, pattern_config in SCAN_PATTERNS.items():
             if isinstance(pattern_config, dict):
                 # Componentes con subtipos (LWC, Aura)
-                components = process_component_files(pattern_config, component_type)
-                if components:
-                    repo_structure[component_type] = components
+                for subtype, pattern in pattern_config.items():
+                    for file_path in self.repo_root.glob(pattern):
+                        component_name = self.extract_component_name(file_path, component_type)
+                        entries.append((component_type, subtype, component_name, file_path))
             else:
                 # Archivos simples
-                files = process_files(pattern_config, component_type)
-                if files:
-                    repo_structure[component_type] = files
+                for pattern in pattern_config:
+                    for file_path in self.repo_root.glob(pattern):
+                        entries.append((component_type, None, None, file_path))
+        
+        # 2. Leer, decodificar y hashear en bloques paralelos
+        file_infos = self.read_source_files([entry[3] for entry in entries])
+        
+        # 3. Fusionar en el modelo del repositorio respetando el orden de enumeración
+        for (component_type, subtype, component_name, _), file_info in zip(entries, file_infos):
+            if subtype is not None:
+                components = repo_structure.setdefault(component_type, {})
+                components.setdefault(component_name, {})
+                if file_info:
+                    components[component_name][subtype] = file_info
+            elif file_info:
+                repo_structure.setdefault(component_type, []).append(file_info)
         
         return repo_structure
 
@@ -507,6 +1936,18 @@ class SuperSalesforceDocumentationGenerator:
     def search_existing_documentation(self, title: str) -> Optional[str]:
         """Busca documentación existente con múltiples variaciones del título"""
         
+        # Página ya resuelta en esta sesión (modo daemon)
+        if title in self.page_id_cache:
+            print(f"✅ Página existente (caché): {title} (ID: {self.page_id_cache[title]})")
+            return self.page_id_cache[title]
+        
+        # Página publicada por una ejecución anterior (índice local, sin petición a Confluence)
+        page_id = self.find_indexed_page(title)
+        if page_id:
+            print(f"✅ Página existente (índice local): {title} (ID: {page_id})")
+            self.page_id_cache[title] = page_id
+            return page_id
+        
         search_url = f"{self.atlassian_base_url}/rest/api/content/search"
         auth = (self.atlassian_email, self.atlassian_api_token)
         
@@ -523,7 +1964,7 @@ class SuperSalesforceDocumentationGenerator:
             }
             
             try:
-                response = requests.get(search_url, auth=auth, params=params)
+                response = self.session.get(search_url, auth=auth, params=params)
                 if response.status_code == 200:
                     results = response.json()
                     
@@ -531,6 +1972,7 @@ class SuperSalesforceDocumentationGenerator:
                     for page in results.get('results', []):
                         if page['title'] == variation:
                             print(f"✅ Página existente encontrada (exacta): {page['title']} (ID: {page['id']})")
+                            self.page_id_cache[title] = page['id']
                             return page['id']
                     
                     # Si no hay exacta, buscar similar
@@ -540,6 +1982,7 @@ class SuperSalesforceDocumentationGenerator:
                         
                         if page_title_clean == variation_clean:
                             print(f"✅ Página existente encontrada (similar): {page['title']} (ID: {page['id']})")
+                            self.page_id_cache[title] = page['id']
                             return page['id']
                             
             except Exception as e:
@@ -578,8 +2021,8 @@ class SuperSalesforceDocumentationGenerator:
         normalized = re.sub(r'\s+', ' ', normalized)  # Espacios únicos
         return normalized
 
-    def call_claude_api(self, repository_data: Dict, main_component: str) -> str:
-        """Llama a Claude API para generar documentación SUPER completa"""
+    def build_documentation_prompt(self, repository_data: Dict, main_component: str) -> Tuple[str, int, int]:
+        """Construye el prompt completo (contexto del repositorio + super prompt)"""
         
         # Construir contexto del repositorio con TODOS los datos
         repo_context = f"REPOSITORIO SALESFORCE COMPLETO - COMPONENTE PRINCIPAL: {main_component}\n"
@@ -603,6 +2046,14 @@ class SuperSalesforceDocumentationGenerator:
                         total_files += 1
                         total_size += file_info['size']
             else:
+                # Metadata homogénea: ejemplares por estructura + tabla de todos los miembros
+                sampled = self.render_exemplar_groups(component_type, data)
+                if sampled:
+                    repo_context += sampled
+                    total_files += len(data)
+                    total_size += sum(file_info['size'] for file_info in data)
+                    continue
+                
                 # Archivos simples
                 for file_info in data:
                     repo_context += f"\n### ARCHIVO: {file_info['path']} ({file_info['size']} chars, {file_info['lines']} lines)\n"
@@ -619,7 +2070,6 @@ class SuperSalesforceDocumentationGenerator:
         repo_context += f"{'=' * 100}\n\n"
         
         # Agregar contexto temporal
-        from datetime import datetime
         current_date = datetime.now().strftime("%d/%m/%Y")
         
         # Personalizar el super prompt
@@ -634,8 +2084,213 @@ class SuperSalesforceDocumentationGenerator:
         
         contextualized_prompt = contextualized_prompt.replace('[LISTA_COMPONENTES_DETALLADA]', ', '.join(componentes_lista))
         
+        if self.local_diagrams:
+            # Los diagramas de arquitectura y secuencia se inyectan después: no pedirlos al modelo
+            contextualized_prompt = re.sub(r'```mermaid\ngraph TB\n.*?```', LOCAL_DIAGRAM_PLACEHOLDER,
+                                           contextualized_prompt, count=1, flags=re.DOTALL)
+            contextualized_prompt = re.sub(r'\*\*📊 Diagrama de Secuencia:\*\*\n```mermaid\n.*?```\n\n', '',
+                                           contextualized_prompt, count=1, flags=re.DOTALL)
+            contextualized_prompt += LOCAL_DIAGRAM_INSTRUCTIONS
+        
+        if self.local_tables:
+            contextualized_prompt = re.sub(rf'{LOCAL_INVENTORY_HEADING}\n.*?(?=\n## )', '',
+                                           contextualized_prompt, count=1, flags=re.DOTALL)
+            contextualized_prompt = contextualized_prompt.replace('**📊 Tamaño:** [Líneas de código/tamaño del archivo]\n', '')
+            contextualized_prompt += LOCAL_TABLES_INSTRUCTIONS
+        
+        if self.apex_analysis:
+            findings = self.get_apex_findings(repository_data)
+            if findings:
+                repo_context = ("HALLAZGOS APEX (análisis estático local, JSON por archivo):\n"
+                                + json.dumps(findings, ensure_ascii=False, separators=(',', ':')) + "\n\n" + repo_context)
+                contextualized_prompt += APEX_ANALYSIS_INSTRUCTIONS
+        
         # Prompt completo
         full_prompt = f"{repo_context}\n\n{contextualized_prompt}"
+        return full_prompt, total_files, total_size
+
+    def render_exemplar_groups(self, component_type: str, file_infos: List[Dict]) -> Optional[str]:
+        """Contexto de un grupo de metadata agrupado por firma estructural (None si se envía completo)"""
+        
+        if (not self.exemplar_sampling or component_type not in EXEMPLAR_COMPONENT_TYPES or
+                len(file_infos) < self.exemplar_min_group):
+            return None
+        
+        def cell(value: str) -> str:
+            value = value.replace('|', '\\|')
+            return value if len(value) <= EXEMPLAR_VALUE_CHARS else value[:EXEMPLAR_VALUE_CHARS - 1] + '…'
+        
+        def file_block(file_info: Dict) -> str:
+            return (f"\n### ARCHIVO: {file_info['path']} ({file_info['size']} chars, {file_info['lines']} lines)\n"
+                    f"```{self.get_file_extension(file_info['path'])}\n{file_info['content']}\n```\n")
+        
+        attributes = EXEMPLAR_KEY_ATTRIBUTES.get(component_type, EXEMPLAR_DEFAULT_ATTRIBUTES)
+        clusters = {}
+        unparsed = []
+        for file_info in sorted(file_infos, key=lambda info: info['path']):
+            signature, values = metadata_signature(file_info['content'], attributes)
+            if signature:
+                clusters.setdefault(signature, []).append((file_info, values))
+            else:
+                unparsed.append(file_info)
+        
+        context = ""
+        exemplars = 0
+        for index, members in enumerate(sorted(clusters.values(), key=len, reverse=True), 1):
+            if len(members) <= self.exemplars_per_group:
+                # Grupos pequeños: la tabla no ahorra nada, se envían completos
+                context += ''.join(file_block(file_info) for file_info, _ in members)
+                exemplars += len(members)
+                continue
+            
+            # Ejemplares repartidos por tamaño: del más simple al más completo del grupo
+            by_size = sorted(members, key=lambda member: member[0]['size'])
+            count = min(self.exemplars_per_group, len(by_size))
+            picks = sorted({round(i * (len(by_size) - 1) / max(1, count - 1)) for i in range(count)}
+                           if count > 1 else {len(by_size) // 2})
+            
+            context += f"\n### GRUPO {index}: {len(members)} archivos con la misma estructura ({len(picks)} ejemplar(es))\n"
+            context += ''.join(file_block(by_size[pick][0]) for pick in picks)
+            # Solo las columnas que algún miembro del grupo informa
+            columns = [attribute for attribute in attributes if any(values[attribute] for _, values in members)]
+            context += f"\n| Nombre | {' | '.join(columns)} |\n|{'---|' * (len(columns) + 1)}\n"
+            for file_info, values in members:
+                # 'Campo__c.field-meta.xml' → 'Objeto.Campo__c'; 'Tipo.Registro.md-meta.xml' → 'Tipo.Registro'
+                parts = Path(file_info['path']).parts
+                name = parts[-1].replace('-meta.xml', '').rsplit('.', 1)[0]
+                if 'objects' in parts and parts.index('objects') + 1 < len(parts) - 1:
+                    name = f"{parts[parts.index('objects') + 1]}.{name}"
+                context += f"| {' | '.join(cell(value) for value in [name] + [values[column] for column in columns])} |\n"
+            exemplars += len(picks)
+        
+        # XML ilegible: sin estructura comparable, se envía completo
+        context += ''.join(file_block(file_info) for file_info in unparsed)
+        
+        original = sum(len(file_block(file_info)) for file_info in file_infos)
+        if len(context) >= original:
+            return None
+        
+        stats = self.exemplar_stats
+        stats['files'] += len(file_infos)
+        stats['groups'] += len(clusters)
+        stats['exemplars'] += exemplars + len(unparsed)
+        stats['original_chars'] += original
+        stats['sent_chars'] += len(context)
+        print(f"🧬 {component_type}: {len(file_infos)} archivos → {len(clusters)} grupo(s), "
+              f"{exemplars + len(unparsed)} enviados completos ({original:,} → {len(context):,} caracteres, "
+              f"ratio {original / len(context):.1f}x)")
+        return context
+
+    def report_exemplar_sampling(self):
+        """Resumen del muestreo de ejemplares (consola y GITHUB_OUTPUT)"""
+        stats = self.exemplar_stats
+        if not stats['files']:
+            return
+        
+        ratio = stats['original_chars'] / stats['sent_chars']
+        print(f"🧬 Muestreo de ejemplares: {stats['files']} archivos en {stats['groups']} grupo(s), "
+              f"{stats['exemplars']} enviados completos; {stats['original_chars']:,} → {stats['sent_chars']:,} "
+              f"caracteres (ratio {ratio:.1f}x)")
+        
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"exemplar-sampled-files={stats['files']}\n")
+                f.write(f"exemplar-compression-ratio={ratio:.2f}\n")
+
+    def call_claude_api(self, repository_data: Dict, main_component: str) -> str:
+        """Llama a Claude API para generar documentación SUPER completa"""
+        
+        full_prompt, total_files, total_size = self.build_documentation_prompt(repository_data, main_component)
+        self.save_artifact(main_component, 'prompt.txt', full_prompt)
+        
+        print("🤖 Generando SUPER documentación con Claude API...")
+        print(f"📊 Contexto enviado: {len(full_prompt):,} caracteres")
+        print(f"📁 Archivos analizados: {total_files}")
+        print(f"💾 Tamaño total código: {total_size:,} caracteres")
+        
+        priority = self.get_component_priority(repository_data)
+        tier = self.route_model(repository_data, priority)
+        if self.structured_output:
+            documentation = self.request_structured_document(main_component, full_prompt, priority, tier)
+        else:
+            documentation = self.request_completion(main_component, full_prompt, priority, tier=tier)
+        if documentation:
+            print(f"✅ SUPER documentación generada: {len(documentation):,} caracteres")
+        return documentation
+
+    def request_structured_document(self, main_component: str, prompt: str, priority: int, tier: Dict) -> Optional[str]:
+        """Documento completo vía herramienta: título y tablas sin post-procesado por regex"""
+        
+        # Las secciones calculadas localmente no se piden al modelo
+        headings = [heading for heading in STRUCTURED_SECTION_HEADINGS if not self.is_local_section(heading)]
+        data = self.request_completion(main_component, prompt + STRUCTURED_OUTPUT_INSTRUCTIONS, priority,
+                                       tier=tier, tool=build_documentation_tool(headings))
+        if not data:
+            return None
+        
+        self.save_artifact(main_component, 'structured.json', data)
+        # El título del modelo pasa por la misma limpieza que el H1 del Markdown libre (fallback: título consistente)
+        title = self.sanitize_page_title(str(data.get('title') or ''), main_component)
+        self.structured_titles[main_component] = title
+        return render_structured_document(title, headings, data)
+
+    def route_model(self, repository_data: Dict, priority: int) -> Dict:
+        """Elige tier (modelo y presupuesto de salida) según tamaño, líneas y criticidad del contenido"""
+        
+        if not self.model_router:
+            return {'name': 'fixed', 'model': self.model, 'max_tokens': self.max_tokens}
+        
+        total_lines = 0
+        total_chars = 0
+        for data in repository_data.values():
+            file_infos = [f for files in data.values() for f in files.values()] if isinstance(data, dict) else data
+            for file_info in file_infos:
+                total_lines += file_info['lines']
+                total_chars += file_info['size']
+        
+        for tier in self.model_tiers:
+            if 'max_lines' in tier and total_lines > tier['max_lines']:
+                continue
+            if 'max_chars' in tier and total_chars > tier['max_chars']:
+                continue
+            if 'min_priority' in tier and priority < tier['min_priority']:
+                continue
+            break
+        else:
+            tier = self.model_tiers[-1]
+        
+        print(f"📶 Tier '{tier['name']}': {tier['model']} (max_tokens {tier['max_tokens']}) "
+              f"para {total_lines:,} líneas / {total_chars:,} caracteres")
+        return tier
+
+    def request_completion(self, component: str, prompt: str, priority: int,
+                           max_tokens: Optional[int] = None, tier: Optional[Dict] = None,
+                           tool: Optional[Dict] = None) -> Optional[Union[str, Dict]]:
+        """Envía un prompt a Claude API aplicando presupuestos y registrando el uso
+        
+        Con tool se fuerza la llamada a esa herramienta y se devuelve su entrada (dict) en lugar del texto.
+        """
+        
+        tier = tier or {'name': 'fixed', 'model': self.model, 'max_tokens': self.max_tokens}
+        
+        # Aplicar presupuestos: modelo completo, modo económico u omitir
+        plan = self.plan_generation_budget(component, prompt, priority, max_tokens or tier['max_tokens'], tier['model'])
+        if not plan:
+            return None
+        model, max_tokens, reserved = plan
+        try:
+            return self.send_completion(component, prompt, model, max_tokens, tier, tool)
+        finally:
+            # El coste real ya está en run_cost_usd: liberar la reserva del peor caso
+            key = self.budget_component_key(component)
+            with self.usage_lock:
+                self.reserved_cost_usd -= reserved
+                self.component_reserved_usd[key] -= reserved
+
+    def send_completion(self, component: str, prompt: str, model: str, max_tokens: int, tier: Dict,
+                        tool: Optional[Dict]) -> Optional[Union[str, Dict]]:
+        """Petición a /v1/messages ya autorizada por el presupuesto"""
         
         headers = {
             'Content-Type': 'application/json',
@@ -644,24 +2299,23 @@ class SuperSalesforceDocumentationGenerator:
         }
         
         payload = {
-            'model': 'claude-sonnet-4-20250514',
-            'max_tokens': 4000,
+            'model': model,
+            'max_tokens': max_tokens,
             'messages': [
                 {
                     'role': 'user',
-                    'content': full_prompt
+                    'content': prompt
                 }
             ]
         }
+        if tool:
+            payload['tools'] = [tool]
+            payload['tool_choice'] = {'type': 'tool', 'name': tool['name']}
         
         try:
-            print("🤖 Generando SUPER documentación con Claude API...")
-            print(f"📊 Contexto enviado: {len(full_prompt):,} caracteres")
-            print(f"📁 Archivos analizados: {total_files}")
-            print(f"💾 Tamaño total código: {total_size:,} caracteres")
-            
-            response = requests.post(
-                'https://api.anthropic.com/v1/messages',
+            start = time.perf_counter()
+            response = self.session.post(
+                f"{self.anthropic_base_url}/v1/messages",
                 headers=headers,
                 json=payload,
                 timeout=180  # Más tiempo para documentación completa
@@ -669,9 +2323,15 @@ class SuperSalesforceDocumentationGenerator:
             
             if response.status_code == 200:
                 result = response.json()
-                documentation = result['content'][0]['text']
-                print(f"✅ SUPER documentación generada: {len(documentation):,} caracteres")
-                return documentation
+                self.record_usage(component, result.get('model', model), result.get('usage', {}),
+                                  tier=tier['name'], latency_s=time.perf_counter() - start)
+                if tool:
+                    tool_use = next((block for block in result['content'] if block.get('type') == 'tool_use'), None)
+                    if tool_use is None:
+                        print(f"❌ Claude API no devolvió la llamada a {tool['name']} (stop_reason: {result.get('stop_reason')})")
+                        return None
+                    return tool_use['input']
+                return result['content'][0]['text']
             else:
                 print(f"❌ Error en Claude API: {response.status_code}")
                 print(response.text)
@@ -681,6 +2341,201 @@ class SuperSalesforceDocumentationGenerator:
             print(f"❌ Error llamando Claude API: {e}")
             return None
 
+    def get_component_priority(self, repository_data: Dict) -> int:
+        """Prioridad del componente (la del tipo más crítico que contiene)"""
+        priorities = [COMPONENT_PRIORITY.get(comp_type, LOW_PRIORITY_THRESHOLD) for comp_type in repository_data]
+        return min(priorities) if priorities else LOW_PRIORITY_THRESHOLD
+
+    def estimate_cost(self, model: str, input_tokens: int, output_tokens: int,
+                      cache_write_tokens: int = 0, cache_read_tokens: int = 0) -> float:
+        """Calcula el coste estimado en USD según la tabla de precios del modelo"""
+        pricing = MODEL_PRICING.get(model, MODEL_PRICING[DEFAULT_MODEL])
+        return (input_tokens * pricing['input'] +
+                output_tokens * pricing['output'] +
+                cache_write_tokens * pricing['cache_write'] +
+                cache_read_tokens * pricing['cache_read']) / 1_000_000
+
+    def plan_generation_budget(self, component: str, prompt: str, priority: int,
+                               max_tokens: Optional[int] = None,
+                               model: Optional[str] = None) -> Optional[Tuple[str, int, float]]:
+        """Decide modelo y max_tokens respetando los presupuestos y reserva el coste del peor caso
+        
+        Devuelve (modelo, max_tokens, coste reservado) o None si se omite el componente. La comprobación y la
+        reserva se hacen bajo usage_lock: las llamadas concurrentes (traducciones, publicación) no superan el
+        presupuesto de la ejecución.
+        """
+        
+        max_tokens = max_tokens or self.max_tokens
+        model = model or self.model
+        input_tokens = int(len(prompt) / CHARS_PER_TOKEN)
+        
+        key = self.budget_component_key(component)
+        with self.usage_lock:
+            plan = self.choose_budget_plan(component, priority, model, max_tokens, input_tokens)
+            if plan:
+                self.reserved_cost_usd += plan[2]
+                self.component_reserved_usd[key] = self.component_reserved_usd.get(key, 0.0) + plan[2]
+        return plan
+
+    def budget_component_key(self, component: str) -> str:
+        """Componente al que se imputa una petición: las traducciones ('Título [EN]') cuentan para el original"""
+        return re.sub(r' \[[A-Z-]+\]$', '', component)
+
+    def choose_budget_plan(self, component: str, priority: int, model: str, max_tokens: int,
+                           input_tokens: int) -> Optional[Tuple[str, int, float]]:
+        """Modelo, max_tokens (limitado a la salida máxima del modelo) y coste del peor caso que caben en el presupuesto"""
+        
+        def output_limit(model_name: str) -> int:
+            return min(max_tokens, MODEL_MAX_OUTPUT_TOKENS.get(model_name, DEFAULT_MAX_OUTPUT_TOKENS))
+        
+        limits = []
+        if self.budget_run_usd > 0:
+            limits.append(self.budget_run_usd - self.run_cost_usd - self.reserved_cost_usd)
+        if self.budget_component_usd > 0:
+            key = self.budget_component_key(component)
+            limits.append(self.budget_component_usd - self.component_cost_usd.get(key, 0.0)
+                          - self.component_reserved_usd.get(key, 0.0))
+        
+        # Peor caso: se consumen todos los max_tokens de salida
+        full_cost = self.estimate_cost(model, input_tokens, output_limit(model))
+        if not limits:
+            return model, output_limit(model), full_cost
+        
+        available = min(limits)
+        if full_cost <= available:
+            return model, output_limit(model), full_cost
+        
+        if priority >= LOW_PRIORITY_THRESHOLD:
+            print(f"⏭️ Presupuesto: omitiendo componente de baja prioridad '{component}' "
+                  f"(estimado ${full_cost:.4f}, disponible ${available:.4f})")
+            self.budget_skipped.append(component)
+            return None
+        
+        cheap_cost = self.estimate_cost(self.cheap_model, input_tokens, output_limit(self.cheap_model))
+        if cheap_cost <= available:
+            print(f"💸 Presupuesto: usando modo económico ({self.cheap_model}) para '{component}' "
+                  f"(estimado ${cheap_cost:.4f} vs ${full_cost:.4f})")
+            return self.cheap_model, output_limit(self.cheap_model), cheap_cost
+        
+        print(f"⏭️ Presupuesto agotado: omitiendo '{component}' "
+              f"(estimado mínimo ${cheap_cost:.4f}, disponible ${available:.4f})")
+        self.budget_skipped.append(component)
+        return None
+
+    def record_usage(self, component: str, model: str, usage: Dict,
+                     tier: str = 'fixed', latency_s: float = 0.0):
+        """Registra tokens, coste y latencia de una llamada a partir del bloque usage de la respuesta"""
+        
+        record = {
+            'component': component,
+            'model': model,
+            'tier': tier,
+            'latency_s': round(latency_s, 3),
+            'input_tokens': usage.get('input_tokens', 0),
+            'output_tokens': usage.get('output_tokens', 0),
+            'cache_creation_input_tokens': usage.get('cache_creation_input_tokens') or 0,
+            'cache_read_input_tokens': usage.get('cache_read_input_tokens') or 0,
+        }
+        record['cost_usd'] = round(self.estimate_cost(
+            model, record['input_tokens'], record['output_tokens'],
+            record['cache_creation_input_tokens'], record['cache_read_input_tokens']), 6)
+        
+        key = self.budget_component_key(component)
+        with self.usage_lock:
+            self.usage_records.append(record)
+            self.run_cost_usd += record['cost_usd']
+            self.component_cost_usd[key] = component_cost = self.component_cost_usd.get(key, 0.0) + record['cost_usd']
+        
+        print(f"💰 Uso: {record['input_tokens']:,} in / {record['output_tokens']:,} out / "
+              f"{record['cache_read_input_tokens']:,} cache → ${record['cost_usd']:.4f} "
+              f"(acumulado ${self.run_cost_usd:.4f})")
+        
+        if self.budget_component_usd > 0 and component_cost > self.budget_component_usd:
+            print(f"⚠️ '{key}' superó el presupuesto por componente (${component_cost:.4f} > "
+                  f"${self.budget_component_usd:.4f})")
+
+    def summarize_usage(self) -> Dict:
+        """Totales de tokens y coste de la ejecución actual"""
+        totals = {
+            'requests': len(self.usage_records),
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0,
+        }
+        for record in self.usage_records:
+            for key in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'):
+                totals[key] += record[key]
+        totals['cost_usd'] = round(self.run_cost_usd, 6)
+        
+        # Latencia y coste por tier del router
+        by_tier = {}
+        for record in self.usage_records:
+            entry = by_tier.setdefault(record.get('tier', 'fixed'), {'requests': 0, 'cost_usd': 0.0, 'latencies': []})
+            entry['requests'] += 1
+            entry['cost_usd'] += record['cost_usd']
+            entry['latencies'].append(record.get('latency_s', 0.0))
+        for entry in by_tier.values():
+            latencies = sorted(entry.pop('latencies'))
+            entry['cost_usd'] = round(entry['cost_usd'], 6)
+            entry['latency_p50_s'] = latencies[len(latencies) // 2]
+            entry['latency_max_s'] = latencies[-1]
+        totals['by_tier'] = by_tier
+        return totals
+
+    def save_usage_ledger(self):
+        """Persiste el uso de la ejecución en el ledger acumulado y lo expone al workflow"""
+        
+        totals = self.summarize_usage()
+        ledger_path = self.cache_dir / 'usage-ledger.json'
+        
+        try:
+            ledger = json.loads(ledger_path.read_text(encoding='utf-8')) if ledger_path.exists() else {}
+        except Exception as e:
+            print(f"⚠️ Ledger de uso ilegible, se reinicia: {e}")
+            ledger = {}
+        
+        runs = ledger.get('runs', [])
+        runs.append({
+            'timestamp': datetime.now().isoformat(),
+            'commit': os.getenv('GITHUB_SHA', ''),
+            'ref': os.getenv('GITHUB_REF', ''),
+            'requests': self.usage_records,
+            'skipped_components': self.budget_skipped,
+            'deferred_components': [unit['title'] for unit in self.deferred_units],
+            'totals': totals,
+        })
+        runs = runs[-500:]  # Acotar el histórico
+        
+        ledger = {
+            'runs': runs,
+            'lifetime_cost_usd': round(sum(run['totals']['cost_usd'] for run in runs), 6),
+        }
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            ledger_path.write_text(json.dumps(ledger, indent=2, ensure_ascii=False), encoding='utf-8')
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el ledger de uso: {e}")
+        
+        print(f"💰 Coste de la ejecución: ${totals['cost_usd']:.4f} "
+              f"({totals['requests']} llamadas, {totals['input_tokens']:,} in / {totals['output_tokens']:,} out)")
+        print(f"💰 Coste acumulado (histórico): ${ledger['lifetime_cost_usd']:.4f}")
+        for tier_name, entry in totals['by_tier'].items():
+            print(f"   📶 {tier_name}: {entry['requests']} llamadas, ${entry['cost_usd']:.4f}, "
+                  f"latencia p50 {entry['latency_p50_s']:.2f}s / máx {entry['latency_max_s']:.2f}s")
+        
+        # Exponer resultados como outputs del step de GitHub Actions
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"run-cost-usd={totals['cost_usd']:.4f}\n")
+                f.write(f"requests={totals['requests']}\n")
+                f.write(f"input-tokens={totals['input_tokens']}\n")
+                f.write(f"output-tokens={totals['output_tokens']}\n")
+                f.write(f"cache-read-tokens={totals['cache_read_input_tokens']}\n")
+                f.write(f"skipped-components={len(self.budget_skipped)}\n")
+
     def get_file_extension(self, file_path: str) -> str:
         """Obtiene la extensión del archivo para syntax highlighting"""
         extension_map = {
@@ -698,25 +2553,140 @@ class SuperSalesforceDocumentationGenerator:
         suffix = Path(file_path).suffix
         return extension_map.get(suffix, 'text')
 
-    def run(self):
+    def build_work_units(self, repository_data: Dict) -> List[Dict]:
+        """Divide el repositorio en documentos a generar según DOC_SCOPE, ordenados por prioridad"""
+        
+        if self.doc_scope != 'component':
+            return [{
+                'title': self.generate_consistent_title(repository_data),
+                'data': repository_data,
+                'priority': self.get_component_priority(repository_data)
+            }]
+        
+        grouped = {}
+        for comp_type, data in repository_data.items():
+            if isinstance(data, dict):
+                # Componentes con subtipos (LWC, Aura): un documento por bundle
+                for component_name, files in data.items():
+                    grouped[(comp_type, component_name)] = {comp_type: {component_name: files}}
+            else:
+                for file_info in data:
+                    path_parts = Path(file_info['path']).parts
+                    if 'objects' in path_parts and path_parts.index('objects') + 1 < len(path_parts) - 1:
+                        # Campos, reglas y demás metadata de un objeto se documentan con el objeto
+                        key = ('objects', path_parts[path_parts.index('objects') + 1])
+                    else:
+                        key = (comp_type, Path(file_info['path']).name.split('.')[0])
+                    grouped.setdefault(key, {}).setdefault(comp_type, []).append(file_info)
+        
+        work_units = []
+        for (comp_type, component_name), data in grouped.items():
+            work_units.append({
+                'title': f"{COMPONENT_TYPE_LABELS.get(comp_type, comp_type)} {component_name}",
+                'data': data,
+                'priority': self.get_component_priority(data)
+            })
+        
+        work_units.sort(key=lambda unit: (unit['priority'], unit['title']))
+        return work_units
+
+    def get_unit_paths(self, repository_data: Dict) -> set:
+        """Rutas de todos los archivos incluidos en un documento"""
+        return {file_info['path'] for file_info in self.iter_unit_files(repository_data)}
+
+    def save_scan_manifest(self, work_units: List[Dict]):
+        """Guarda ruta → documento, tamaños y tarifas del escaneo para scripts/doc-impact.py (hook pre-commit)"""
+        
+        units = {}
+        files = {}
+        for unit in work_units:
+            unit_files = list(self.iter_unit_files(unit['data']))
+            units[unit['title']] = {
+                'priority': unit['priority'],
+                'files': len(unit_files),
+                'lines': sum(file_info['lines'] for file_info in unit_files),
+                'chars': sum(file_info['size'] for file_info in unit_files),
+            }
+            for file_info in unit_files:
+                files[file_info['path']] = [unit['title'], file_info['size'], file_info['lines']]
+        
+        manifest = {
+            'version': SCAN_MANIFEST_VERSION,
+            'generated_at': datetime.now().isoformat(),
+            'commit': self.commit_key,
+            'scope': self.doc_scope,
+            'patterns': SCAN_PATTERNS,
+            'type_labels': COMPONENT_TYPE_LABELS,
+            'priorities': COMPONENT_PRIORITY,
+            'low_priority': LOW_PRIORITY_THRESHOLD,
+            'tiers': self.model_tiers if self.model_router else [
+                {'name': 'fixed', 'model': self.model, 'max_tokens': self.max_tokens}],
+            'pricing': MODEL_PRICING,
+            'default_model': DEFAULT_MODEL,
+            'chars_per_token': CHARS_PER_TOKEN,
+            'prompt_chars': len(SUPER_DOCUMENTATION_PROMPT),
+            'translation': {'languages': self.translate_languages, 'model': self.cheap_model},
+            'units': units,
+            'files': files,
+        }
+        
+        manifest_path = self.cache_dir / SCAN_MANIFEST_FILE
+        try:
+            manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: el hook puede leerlo mientras se ejecuta el generador
+            tmp_path = manifest_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(manifest, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+            os.replace(tmp_path, manifest_path)
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el manifiesto del escaneo: {e}")
+
+    def load_changed_files(self, commit_range: str) -> Optional[set]:
+        """Archivos cambiados en un commit range, relativos a repo_root (git diff); None si falla
+        
+        changed_files = None significa "todo el repositorio": quien llama debe abortar si devuelve None.
+        Guarda además en changed_lines las líneas añadidas + eliminadas de cada archivo (planificador).
+        """
+        self.changed_lines = {}
+        try:
+            # --relative: rutas relativas a repo_root (como las del escaneo) aunque sea un subdirectorio del repo git;
+            # --no-renames: un renombrado aparece como borrado + alta, con rutas simples en --numstat
+            result = subprocess.run(
+                ['git', '-C', str(self.repo_root), 'diff', '--numstat', '--no-renames', '--relative', commit_range],
+                capture_output=True, text=True, timeout=60
+            )
+        except Exception as e:
+            print(f"⚠️ No se pudo ejecutar git diff: {e}")
+            return None
+        
+        if result.returncode != 0:
+            print(f"⚠️ Commit range inválido '{commit_range}': {result.stderr.strip()}")
+            return None
+        
+        for line in result.stdout.splitlines():
+            parts = line.split('\t', 2)
+            if len(parts) == 3:
+                added, deleted, path = parts
+                # Binarios: '-' en lugar de recuentos
+                self.changed_lines[path] = sum(int(count) for count in (added, deleted) if count.isdigit())
+        return set(self.changed_lines)
+
+    def run(self):
         """Ejecuta el proceso completo de generación de SUPER documentación"""
         
         print("🚀 Iniciando generación de SUPER DOCUMENTACIÓN Salesforce v3.0")
         print("=" * 80)
+        self.reset_run_state()
+        self.commit_key = self.artifact_commit or self.get_commit_key()
         
         # 1. Análisis completo del repositorio
         print("\n📁 Paso 1: Análisis COMPLETO del repositorio Salesforce...")
-        repository_data = self.analyze_salesforce_repository()
+        with self.profile_phase('scan'):
+            repository_data = self.analyze_salesforce_repository()
         
         if not repository_data:
             print("⚠️ No se encontraron archivos Salesforce en el repositorio")
             return False
         
-        # 2. Generar título consistente
-        print("\n🎯 Paso 2: Generando título CONSISTENTE...")
-        consistent_title = self.generate_consistent_title(repository_data)
-        print(f"✅ Título consistente: '{consistent_title}'")
-        
         # Mostrar estadísticas
         total_files = 0
         for comp_type, data in repository_data.items():
@@ -731,57 +2701,1337 @@ class SuperSalesforceDocumentationGenerator:
         
         print(f"📊 TOTAL: {total_files} archivos a documentar")
         
+        with self.profile_phase('plan'):
+            if self.doc_scope == 'component':
+                self.dependency_graph = self.build_dependency_graph(repository_data)
+            work_units = self.build_work_units(repository_data)
+            self.save_scan_manifest(work_units)
+            self.backlog = self.load_deferred_backlog({unit['title'] for unit in work_units})
+            
+            # Limitar a los componentes afectados por el commit range (más los aplazados de la ejecución anterior)
+            if self.changed_files is not None:
+                work_units = [unit for unit in work_units
+                              if self.get_unit_paths(unit['data']) & self.changed_files or unit['title'] in self.backlog]
+                print(f"🔀 {len(self.changed_files)} archivos cambiados → {len(work_units)} documento(s) afectados")
+            
+            work_units = self.schedule_work_units(work_units)
+        
+        print(f"🧩 Alcance '{self.doc_scope}': {len(work_units)} documento(s) a generar")
+        
+        with self.profile_phase('generate'):
+            results, generated = self.generate_all(work_units)
+        
+        # Persistir ya el backlog: si el job muere publicando, lo no publicado se retoma en la siguiente ejecución
+        self.save_deferred_backlog(results)
+        
+        if generated:
+            results.update(self.convert_and_publish(generated))
+        
+        with self.profile_phase('ledger'):
+            self.save_usage_ledger()
+            self.report_apex_findings()
+            self.report_storage_repairs()
+            self.report_exemplar_sampling()
+            self.report_deferred_backlog(results)
+            self.prune_artifacts()
+        
+        published = [title for title, result in results.items() if result]
+        failed = [title for title, result in results.items() if result is False]
+        
+        if self.budget_skipped:
+            print(f"\n⏭️ Componentes omitidos por presupuesto: {', '.join(self.budget_skipped)}")
+        
+        if self.deferred_units:
+            print(f"⏰ Documentos aplazados por la fecha límite: {len(self.deferred_units)} (se generarán primero en la siguiente ejecución)")
+        
+        if not failed and published:
+            print("\n🎉 ¡SUPER documentación completada exitosamente!")
+            if self.preview_dir:
+                print(f"👀 Vistas previas escritas: {len(published)} en {self.preview_dir}")
+            else:
+                print(f"📊 Confluence Space: {self.confluence_space_key}")
+                print(f"📄 Páginas publicadas: {len(published)}")
+            print(f"📁 Total Archivos Documentados: {total_files}")
+            return True
+        elif not failed:
+            print("\nℹ️ No se publicó ninguna página (sin componentes afectados, omitidos por presupuesto o aplazados)")
+            return True
+        else:
+            print(f"\n❌ Error en el proceso de publicación: {', '.join(failed)}")
+            return False
+
+    def generate_all(self, work_units: List[Dict]) -> Tuple[Dict[str, Optional[bool]], List[Dict]]:
+        """Pasos 2-4 para cada documento (y sus traducciones); reanuda desde artefactos con --resume"""
+        
+        results = {}
+        generated = []
+        for index, unit in enumerate(work_units):
+            if self.deadline_reached():
+                self.deferred_units = work_units[index:]
+                print(f"⏰ Fecha límite de {self.deadline_minutes:g} min: aplazando {len(self.deferred_units)} documento(s) "
+                      f"(transcurrido {time.monotonic() - self.run_started:.0f}s)")
+                for deferred in self.deferred_units:
+                    results[deferred['title']] = None
+                break
+            
+            self.check_memory_budget()
+            unit_started = time.monotonic()
+            requests_before = len(self.usage_records)
+            file_hashes = self.get_file_hashes(unit['data'])
+            self.save_artifact(unit['title'], 'scan.json', {
+                'title': unit['title'], 'priority': unit['priority'], 'file_hashes': file_hashes
+            })
+            
+            checkpoint = self.load_checkpoint(unit['title'], file_hashes) if self.resume else None
+            if checkpoint is True:
+                results[unit['title']] = True
+                continue
+            item = checkpoint or self.generate_component(unit['title'], unit['data'])
+            if item:
+                item['file_hashes'] = file_hashes
+                self.save_document_artifact(item)
+                generated.append(item)
+                for language in self.translate_languages:
+                    title = f"{item['title']} [{language.upper()}]"
+                    checkpoint = self.load_checkpoint(title, file_hashes) if self.resume else None
+                    if checkpoint is True:
+                        results[title] = True
+                        continue
+                    translated = checkpoint or self.translate_component(item, language, unit['priority'])
+                    if translated:
+                        translated['file_hashes'] = file_hashes
+                        self.save_document_artifact(translated)
+                        generated.append(translated)
+                    else:
+                        results[title] = None if title in self.budget_skipped else False
+            else:
+                results[unit['title']] = None if unit['title'] in self.budget_skipped else False
+            # Los documentos reanudados o recortados sin llamar a la API no representan el coste de generar uno
+            if len(self.usage_records) > requests_before:
+                self.generation_times.append(time.monotonic() - unit_started)
+        
+        return results, generated
+
+    def deadline_reached(self) -> bool:
+        """True si el siguiente documento (duración media observada) ya no cabe antes de la fecha límite"""
+        if self.deadline_minutes <= 0:
+            return False
+        
+        elapsed = time.monotonic() - self.run_started
+        expected = sum(self.generation_times) / len(self.generation_times) if self.generation_times else 0.0
+        return elapsed + expected + self.deadline_reserve_s >= self.deadline_minutes * 60
+
+    def schedule_work_units(self, work_units: List[Dict]) -> List[Dict]:
+        """Ordena los documentos por puntuación: aplazados primero, luego criticidad, tamaño del cambio y antigüedad"""
+        
+        if len(work_units) < 2:
+            return work_units
+        
+        now = time.time()
+        criticality_scores = {'🔴': 1.0, '🟡': 0.5, '🟢': 0.0}
+        
+        def score(unit: Dict) -> float:
+            changed_lines = sum(
+                self.changed_lines.get(file_info['path'], file_info['lines'])
+                for file_info in self.iter_unit_files(unit['data'])
+                if self.changed_files is None or file_info['path'] in self.changed_files
+            )
+            
+            document_path = self.document_cache_path(unit['title'])
+            if document_path.exists():
+                staleness = min(1.0, (now - document_path.stat().st_mtime) / 86400 / SCHEDULER_STALE_DAYS)
+            else:
+                staleness = 1.0
+            
+            unit['score'] = round(
+                SCHEDULER_WEIGHTS['criticality'] * criticality_scores[criticality_level(unit['priority'])] +
+                SCHEDULER_WEIGHTS['change'] * min(1.0, math.log10(1 + changed_lines) / math.log10(1 + SCHEDULER_CHANGE_LINES)) +
+                SCHEDULER_WEIGHTS['staleness'] * staleness +
+                (SCHEDULER_BACKLOG_BONUS if unit['title'] in self.backlog else 0.0), 4
+            )
+            return unit['score']
+        
+        return sorted(work_units, key=lambda unit: (-score(unit), unit['priority'], unit['title']))
+
+    def iter_unit_files(self, repository_data: Dict):
+        """Recorre los file_info de un documento (bundles LWC/Aura incluidos)"""
+        for data in repository_data.values():
+            if isinstance(data, dict):
+                for files in data.values():
+                    yield from files.values()
+            else:
+                yield from data
+
+    def load_deferred_backlog(self, titles: set) -> Dict[str, Dict]:
+        """Documentos aplazados por ejecuciones anteriores que aún existen en el repositorio"""
+        backlog_path = self.cache_dir / 'deferred-backlog.json'
+        try:
+            entries = json.loads(backlog_path.read_text(encoding='utf-8')).get('items', []) if backlog_path.exists() else []
+        except Exception as e:
+            print(f"⚠️ No se pudo leer el backlog aplazado: {e}")
+            entries = []
+        
+        backlog = {entry['title']: entry for entry in entries if entry['title'] in titles}
+        if backlog:
+            print(f"⏰ {len(backlog)} documento(s) aplazados en la ejecución anterior: se programan primero")
+        return backlog
+
+    def save_deferred_backlog(self, results: Dict[str, Optional[bool]]) -> List[Dict]:
+        """Guarda los documentos aplazados en esta ejecución más los del backlog que aún no se publicaron"""
+        
+        deferred_at = datetime.now().isoformat()
+        items = {}
+        for title, entry in self.backlog.items():
+            if results.get(title) is not True:
+                items[title] = entry
+        for unit in self.deferred_units:
+            previous = items.get(unit['title'], {})
+            items[unit['title']] = {
+                'title': unit['title'],
+                'priority': unit['priority'],
+                'first_deferred_at': previous.get('first_deferred_at', deferred_at),
+                'deferrals': previous.get('deferrals', 0) + 1,
+            }
+        
+        backlog_path = self.cache_dir / 'deferred-backlog.json'
+        try:
+            if items:
+                backlog_path.parent.mkdir(parents=True, exist_ok=True)
+                backlog_path.write_text(json.dumps({
+                    'updated_at': deferred_at,
+                    'commit': self.commit_key,
+                    'items': list(items.values()),
+                }, indent=2, ensure_ascii=False), encoding='utf-8')
+            elif backlog_path.exists():
+                backlog_path.unlink()
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el backlog aplazado: {e}")
+        
+        return list(items.values())
+
+    def report_deferred_backlog(self, results: Dict[str, Optional[bool]]):
+        """Guarda el backlog definitivo tras publicar y lo expone en GITHUB_OUTPUT"""
+        items = self.save_deferred_backlog(results)
+        
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"deferred-components={len(items)}\n")
+
+    def convert_and_publish(self, items: List[Dict]) -> Dict[str, bool]:
+        """Pasos 5 y 6: convierte (salvo storage ya guardado) y publica o escribe la vista previa"""
+        
+        # 5. Conversión de todos los documentos (pool de procesos si son suficientes)
+        pending = [item for item in items if 'converted' not in item]
+        if pending:
+            print(f"\n🔄 Paso 5: Convirtiendo {len(pending)} documento(s) a Confluence Storage Format...")
+            with self.profile_phase('convert'):
+                for item, converted in zip(pending, self.convert_documents([item['documentation'] for item in pending])):
+                    self.check_memory_budget()
+                    item['converted'] = self.repair_storage(item['title'], converted)
+                    self.save_artifact(item['title'], 'storage.json',
+                                       {'storage': item['converted'][0], 'attachments': item['converted'][1]})
+        
+        # Storage ya guardado (--resume / --publish-only) de ejecuciones anteriores: también se valida
+        for item in items:
+            if item not in pending:
+                item['converted'] = self.repair_storage(item['title'], item['converted'])
+        
+        # 6. Publicación (o vista previa local sin Confluence)
+        results = {}
+        if self.preview_dir:
+            print("\n👀 Paso 6: Escribiendo vista previa local (Confluence omitido)...")
+            for item in items:
+                results[item['title']] = self.write_preview(item, item['converted'])
+            return results
+        
+        def publish_item(item: Dict) -> bool:
+            success = self.publish_component(item, item['converted'])
+            self.save_artifact(item['title'], 'publish.json', {
+                'success': success,
+                'final_title': item['final_title'],
+                'page_id': self.page_id_cache.get(item['final_title']),
+                'published_at': datetime.now().isoformat(),
+            })
+            return success
+        
+        print("\n📝 Paso 6: Publicando en Confluence...")
+        with self.profile_phase('publish'):
+            # Las páginas con el mismo título se serializan con page_lock; el resto se publica en paralelo
+            with ThreadPoolExecutor(max_workers=max(1, self.publish_concurrency)) as executor:
+                for item, success in zip(items, executor.map(publish_item, items)):
+                    results[item['title']] = success
+                    self.check_memory_budget()
+        return results
+
+    def get_commit_key(self) -> str:
+        """Commit al que pertenecen los artefactos: HEAD del repositorio, GITHUB_SHA o 'working-tree'"""
+        try:
+            result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=self.repo_root,
+                                    capture_output=True, text=True, timeout=10)
+            if result.returncode == 0 and result.stdout.strip():
+                return result.stdout.strip()
+        except Exception:
+            pass
+        return os.getenv('GITHUB_SHA') or 'working-tree'
+
+    def artifact_dir(self, title: str) -> Path:
+        """Directorio de artefactos de un componente en el commit actual"""
+        slug = re.sub(r'[^\w.-]+', '_', title)
+        return self.cache_dir / 'artifacts' / (self.commit_key or 'working-tree') / slug
+
+    def save_artifact(self, title: str, name: str, content):
+        """Guarda la salida de una etapa (texto o JSON) en el almacén de artefactos"""
+        if not self.artifacts:
+            return
+        path = self.artifact_dir(title) / name
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if name.endswith('.json'):
+                content = json.dumps(content, indent=2, ensure_ascii=False)
+            path.write_text(content, encoding='utf-8')
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el artefacto {name} de '{title}': {e}")
+
+    def load_artifact(self, title: str, name: str):
+        """Artefacto guardado de una etapa (None si no existe o es ilegible)"""
+        path = self.artifact_dir(title) / name
+        if not path.exists():
+            return None
+        try:
+            content = path.read_text(encoding='utf-8')
+            return json.loads(content) if name.endswith('.json') else content
+        except Exception as e:
+            print(f"⚠️ Artefacto ilegible ({path}): {e}")
+            return None
+
+    def save_document_artifact(self, item: Dict):
+        """Markdown generado y metadatos necesarios para publicarlo sin regenerar"""
+        self.save_artifact(item['title'], 'document.md', item['documentation'])
+        self.save_artifact(item['title'], 'document.json', {
+            'title': item['title'],
+            'final_title': item['final_title'],
+            'file_hashes': item.get('file_hashes', {}),
+        })
+
+    def load_stored_item(self, title: str) -> Optional[Dict]:
+        """Documento guardado (con su storage si ya se convirtió) listo para publicar"""
+        meta = self.load_artifact(title, 'document.json')
+        documentation = self.load_artifact(title, 'document.md')
+        if not meta or not documentation:
+            return None
+        
+        item = {
+            'title': meta['title'],
+            'final_title': meta['final_title'],
+            'file_hashes': meta.get('file_hashes', {}),
+            'existing_page_id': None,
+            'documentation': documentation,
+        }
+        storage = self.load_artifact(title, 'storage.json')
+        if storage:
+            item['converted'] = (storage['storage'], storage['attachments'])
+        return item
+
+    def load_checkpoint(self, title: str, file_hashes: Dict[str, str]):
+        """--resume: True si ya se publicó, el documento guardado si se generó, None si hay que generarlo"""
+        item = self.load_stored_item(title)
+        if not item or item['file_hashes'] != file_hashes:
+            return None
+        
+        published = self.load_artifact(title, 'publish.json')
+        if published and published.get('success'):
+            print(f"⏩ '{title}': ya publicado en este commit")
+            return True
+        
+        print(f"⏩ '{title}': documento ya generado, se reanuda desde {'la publicación' if 'converted' in item else 'la conversión'}")
+        if not self.preview_dir:
+            item['existing_page_id'] = self.search_existing_documentation(item['title'])
+        return item
+
+    def publish_stored_artifacts(self) -> bool:
+        """Modo publish-only: publica en bloque los documentos guardados del commit sin publicación correcta"""
+        
+        self.reset_run_state()
+        self.commit_key = self.artifact_commit or self.get_commit_key()
+        commit_dir = self.cache_dir / 'artifacts' / self.commit_key
+        print(f"📦 Publicando artefactos guardados del commit {self.commit_key}")
+        
+        items = []
+        for directory in sorted(commit_dir.iterdir() if commit_dir.exists() else []):
+            meta = self.load_artifact_file(directory / 'document.json')
+            if not meta:
+                continue
+            published = self.load_artifact_file(directory / 'publish.json')
+            if published and published.get('success'):
+                continue
+            item = self.load_stored_item(meta['title'])
+            if item:
+                items.append(item)
+        
+        if not items:
+            print("ℹ️ No hay artefactos pendientes de publicar")
+            return True
+        
+        print(f"📄 {len(items)} documento(s) pendientes de publicar")
+        with ThreadPoolExecutor(max_workers=max(1, self.publish_concurrency)) as executor:
+            page_ids = list(executor.map(lambda item: self.search_existing_documentation(item['title']), items))
+        for item, page_id in zip(items, page_ids):
+            item['existing_page_id'] = page_id
+        
+        results = self.convert_and_publish(items)
+        self.report_storage_repairs()
+        failed = [title for title, success in results.items() if not success]
+        if failed:
+            print(f"\n❌ Error publicando: {', '.join(failed)}")
+            return False
+        print(f"\n🎉 {len(results)} documento(s) publicados desde artefactos")
+        return True
+
+    def load_artifact_file(self, path: Path) -> Optional[Dict]:
+        """Lee un artefacto JSON por ruta (None si no existe o es ilegible)"""
+        try:
+            return json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+        except Exception:
+            return None
+
+    def prune_artifacts(self):
+        """Conserva solo los artefactos de los últimos DOC_ARTIFACT_KEEP commits"""
+        root = self.cache_dir / 'artifacts'
+        if not self.artifacts or self.artifact_keep <= 0 or not root.exists():
+            return
+        commits = sorted((path for path in root.iterdir() if path.is_dir()),
+                         key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in commits[self.artifact_keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def generate_component(self, consistent_title: str, repository_data: Dict) -> Optional[Dict]:
+        """Busca la página existente y genera el documento; None si falla o se omite por presupuesto"""
+        
+        # 2. Título consistente
+        print(f"\n🎯 Paso 2: Título CONSISTENTE: '{consistent_title}'")
+        
         # 3. Buscar documentación existente con múltiples variaciones
-        print("\n🔍 Paso 3: Buscando documentación existente...")
-        existing_page_id = self.search_existing_documentation(consistent_title)
+        existing_page_id = None
+        if not self.preview_dir:
+            print("\n🔍 Paso 3: Buscando documentación existente...")
+            existing_page_id = self.search_existing_documentation(consistent_title)
         
-        # 4. Generar SUPER documentación
+        # 4. Generar SUPER documentación (incremental si hay una versión previa)
         print("\n🤖 Paso 4: Generando SUPER documentación completa...")
-        documentation = self.call_claude_api(repository_data, consistent_title)
+        documentation = self.generate_documentation(repository_data, consistent_title)
         
         if not documentation:
-            print("❌ Error generando documentación")
-            return False
+            if consistent_title not in self.budget_skipped:
+                print("❌ Error generando documentación")
+            return None
         
-        # 5. Limpiar título de la documentación generada
-        final_title = self.clean_documentation_title(documentation, consistent_title)
+        # Título de la salida estructurada o, en Markdown libre, limpiado del primer H1
+        final_title = (self.structured_titles.pop(consistent_title, None) or
+                       self.clean_documentation_title(documentation, consistent_title))
         print(f"📋 Título final: '{final_title}'")
         
-        # 6. Crear o actualizar con título consistente
-        print("\n📝 Paso 5: Publicando en Confluence...")
+        return {
+            'title': consistent_title,
+            'final_title': final_title,
+            'existing_page_id': existing_page_id,
+            'documentation': documentation,
+        }
+
+    def publish_component(self, item: Dict, converted: Tuple[str, List[Dict]]) -> bool:
+        """Crea o actualiza la(s) página(s) de un documento ya convertido"""
+        
+        consistent_title = item['title']
+        final_title = item['final_title']
+        existing_page_id = item['existing_page_id']
+        documentation = item['documentation']
         
-        if existing_page_id:
-            success = self.update_confluence_page(existing_page_id, final_title, documentation)
+        if self.split_pages:
+            success = self.publish_split_document(existing_page_id, final_title, documentation, converted)
+        elif existing_page_id:
+            success = self.update_confluence_page(existing_page_id, final_title, documentation, converted)
             print("🔄 Documentación ACTUALIZADA")
         else:
-            success = self.create_confluence_page(final_title, documentation)
+            success = self.create_confluence_page(final_title, documentation, converted)
             print("🆕 Nueva documentación CREADA")
         
         if success:
-            print("\n🎉 ¡SUPER documentación completada exitosamente!")
-            print(f"📊 Confluence Space: {self.confluence_space_key}")
-            print(f"📄 Página: '{final_title}'")
-            print(f"🎯 Componente Principal: {consistent_title}")
-            print(f"📁 Total Archivos Documentados: {total_files}")
+            if final_title in self.page_id_cache:
+                self.page_id_cache[consistent_title] = self.page_id_cache[final_title]
+            elif existing_page_id:
+                self.page_id_cache[final_title] = self.page_id_cache[consistent_title] = existing_page_id
+            index = self.get_doc_index()
+            page_id = self.page_id_cache.get(final_title)
+            if index and page_id:
+                index.record_page(consistent_title, final_title, page_id, self.confluence_space_key,
+                                  f"{self.atlassian_base_url}/pages/viewpage.action?pageId={page_id}")
+            print(f"✅ '{final_title}' publicado (componente principal: {consistent_title})")
+        return success
+
+    def translate_component(self, item: Dict, language: str, priority: int) -> Optional[Dict]:
+        """Variante traducida de un documento generado, publicada como página hermana"""
+        
+        suffix = f" [{language.upper()}]"
+        print(f"\n🌍 Traduciendo '{item['final_title']}' a {TRANSLATION_LANGUAGES.get(language, language)}...")
+        documentation = self.translate_document(item['documentation'], language, item['title'] + suffix, priority)
+        if not documentation:
+            return None
+        
+        final_title = item['final_title'] + suffix
+        existing_page_id = None
+        if not self.preview_dir:
+            existing_page_id = (self.page_id_cache.get(final_title) or self.find_indexed_page(final_title) or
+                                self.search_confluence_page(final_title))
+        return {
+            'title': item['title'] + suffix,
+            'final_title': final_title,
+            'existing_page_id': existing_page_id,
+            'documentation': documentation,
+        }
+
+    def translate_document(self, markdown: str, language: str, component: str, priority: int) -> Optional[str]:
+        """Traduce el documento sección a sección en paralelo, cacheando cada sección por (hash, idioma)"""
+        
+        preamble, sections = self.split_markdown_sections(markdown)
+        parts = [(None, preamble)] + sections
+        cache_dir = self.cache_dir / 'translations' / language
+        language_name = TRANSLATION_LANGUAGES.get(language, language)
+        cache_hits = []
+        
+        def request_translation(instructions: str, text: str) -> Optional[str]:
+            tier = {'name': 'translation', 'model': self.cheap_model,
+                    'max_tokens': max(512, int(len(text) / CHARS_PER_TOKEN * 1.5))}
+            return self.request_completion(component, f"{instructions}\n\nSECCIÓN:\n{text}", priority, tier=tier)
+        
+        def translate_labels(text: str) -> Optional[str]:
+            # Secciones calculadas localmente (inventario, hallazgos Apex): solo encabezados y cabeceras de tabla
+            lines = text.split('\n')
+            indexes = [index for index, line in enumerate(lines)
+                       if line.startswith('#') or (index + 1 < len(lines) and TABLE_SEPARATOR_PATTERN.match(lines[index + 1]))]
+            translated = request_translation(
+                f"Traduce al {language_name} cada una de las siguientes líneas de documentación técnica Salesforce. "
+                f"Devuelve exactamente {len(indexes)} líneas en el mismo orden, conservando el formato Markdown, los "
+                "emojis y los separadores |, sin comentarios.",
+                '\n'.join(lines[index] for index in indexes)
+            )
+            if translated is None:
+                return None
+            translated_lines = translated.strip('\n').split('\n')
+            if len(translated_lines) != len(indexes):
+                print(f"⚠️ Traducción de etiquetas con {len(translated_lines)} líneas en lugar de {len(indexes)}: "
+                      "se conservan las originales")
+                return text
+            for index, line in zip(indexes, translated_lines):
+                lines[index] = line
+            return '\n'.join(lines)
+        
+        def translate_part(part: Tuple[Optional[str], str]) -> Optional[str]:
+            heading, text = part
+            if not text.strip():
+                return text
+            
+            cache_path = cache_dir / f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}.md"
+            if cache_path.exists():
+                cache_hits.append(cache_path)
+                return cache_path.read_text(encoding='utf-8')
+            
+            if heading and self.is_local_section(heading):
+                translated = translate_labels(text)
+                if translated is None:
+                    return None
+            else:
+                # Los bloques de código y diagramas no se traducen: se sustituyen por marcadores
+                blocks = []
+                def protect(match):
+                    blocks.append(match.group(0))
+                    return f"§§BLOQUE{len(blocks) - 1}§§"
+                protected = re.sub(r'```.*?\n```', protect, text, flags=re.DOTALL)
+                
+                # Secciones grandes en varias peticiones para no superar la salida máxima del modelo
+                chunks = split_text_chunks(protected, TRANSLATION_CHUNK_CHARS)
+                results = [request_translation(
+                    f"Traduce al {language_name} la siguiente sección de documentación "
+                    "técnica Salesforce en Markdown. Conserva exactamente el formato Markdown, los emojis, los marcadores "
+                    "§§BLOQUEn§§, las rutas de archivo y los nombres de componentes, campos, objetos y APIs. Devuelve "
+                    "únicamente la sección traducida, sin comentarios.", chunk) for chunk in chunks]
+                if any(result is None for result in results):
+                    return None
+                translated = '\n'.join(result.strip('\n') for result in results)
+                
+                for index, block in enumerate(blocks):
+                    translated = translated.replace(f"§§BLOQUE{index}§§", block)
+            
+            translated = translated.rstrip('\n') + '\n\n'
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                cache_path.write_text(translated, encoding='utf-8')
+            except Exception as e:
+                print(f"⚠️ No se pudo cachear la traducción: {e}")
+            return translated
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.translation_concurrency)) as executor:
+            translated_parts = list(executor.map(translate_part, parts))
+        
+        if any(part is None for part in translated_parts):
+            print(f"❌ Traducción a '{language}' incompleta")
+            return None
+        
+        print(f"✅ Traducción a '{language}': {len(sections)} secciones ({len(cache_hits)} partes desde caché)")
+        return ''.join(translated_parts)
+
+    def write_preview(self, item: Dict, converted: Tuple[str, List[Dict]]) -> bool:
+        """Escribe el documento convertido como HTML local (y sus adjuntos junto a él)"""
+        
+        storage, attachments = converted
+        slug = re.sub(r'[^\w.-]+', '_', item['final_title'])
+        files_dir = f"{slug}-files"
+        
+        try:
+            self.preview_dir.mkdir(parents=True, exist_ok=True)
+            for attachment in attachments:
+                attachment_path = self.preview_dir / files_dir / attachment['filename']
+                attachment_path.parent.mkdir(parents=True, exist_ok=True)
+                attachment_path.write_text(attachment['content'], encoding='utf-8')
+            
+            preview_path = self.preview_dir / f"{slug}.html"
+            preview_path.write_text(self.storage_to_preview_html(item['final_title'], storage, files_dir),
+                                    encoding='utf-8')
+            print(f"👀 Vista previa: {preview_path.resolve()}")
             return True
-        else:
-            print("\n❌ Error en el proceso de publicación")
+        except Exception as e:
+            print(f"❌ Error escribiendo la vista previa: {e}")
             return False
 
+    def storage_to_preview_html(self, title: str, storage: str, files_dir: str) -> str:
+        """Hace navegable el storage format: macros de código/mermaid a <pre> y adjuntos a enlaces locales"""
+        
+        def render_macro(match):
+            language = match.group(1) or 'text'
+            code = html.escape(match.group(2))
+            if language == 'mermaid':
+                return f'<pre class="mermaid">{code}</pre>'
+            return f'<pre><code class="language-{language}">{code}</code></pre>'
+        
+        body = re.sub(
+            r'<ac:structured-macro ac:name="(?:code|mermaid)">(?:<ac:parameter ac:name="language">(\w+)</ac:parameter>)?'
+            r'<ac:plain-text-body><!\[CDATA\[(.*?)\]\]></ac:plain-text-body></ac:structured-macro>',
+            render_macro, storage, flags=re.DOTALL
+        )
+        body = re.sub(
+            r'<ac:link><ri:attachment ri:filename="([^"]+)"/><ac:plain-text-link-body><!\[CDATA\[(.*?)\]\]>'
+            r'</ac:plain-text-link-body></ac:link>',
+            lambda match: f'<a href="{files_dir}/{match.group(1)}">{html.escape(match.group(2))}</a>',
+            body, flags=re.DOTALL
+        )
+        return PREVIEW_HTML_TEMPLATE.format(title=html.escape(title), body=body,
+                                            generated_at=datetime.now().strftime('%H:%M:%S'))
+
+    def generate_documentation(self, repository_data: Dict, title: str) -> Optional[str]:
+        """Regenera solo las secciones afectadas por los cambios o, si no es posible, el documento completo"""
+        
+        previous = self.load_previous_document(title) if self.incremental else None
+        
+        if previous:
+            current_hashes = self.get_file_hashes(repository_data)
+            previous_hashes = previous.get('file_hashes', {})
+            modified = {path for path, digest in current_hashes.items()
+                        if path in previous_hashes and previous_hashes[path] != digest}
+            structural = set(current_hashes) ^ set(previous_hashes)
+            
+            if not modified and not structural:
+                print("♻️ Sin cambios en los archivos fuente: se reutiliza la documentación previa")
+                return previous['markdown']
+            
+            _, sections = self.split_markdown_sections(previous['markdown'])
+            affected = self.find_affected_sections(sections, previous.get('section_sources', {}),
+                                                   modified | structural, bool(structural))
+            
+            # Las secciones generadas localmente se recalculan siempre: no se piden al modelo
+            affected = [heading for heading in affected if not self.is_local_section(heading)]
+            
+            if affected and len(affected) <= len(sections) * self.incremental_max_ratio:
+                documentation = self.regenerate_sections(repository_data, title, previous['markdown'],
+                                                         affected, modified | structural)
+                if documentation:
+                    documentation = self.inject_local_content(documentation, repository_data)
+                    self.save_generated_document(title, documentation, repository_data)
+                    return documentation
+                if title in self.budget_skipped:
+                    return None
+                print("⚠️ Regeneración por secciones fallida, se regenera el documento completo")
+            else:
+                print(f"ℹ️ {len(affected)}/{len(sections)} secciones afectadas: regeneración completa")
+        
+        documentation = self.call_claude_api(repository_data, title)
+        if documentation:
+            documentation = self.inject_local_content(documentation, repository_data)
+            self.save_generated_document(title, documentation, repository_data)
+        return documentation
+
+    def split_markdown_sections(self, markdown: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """Divide el Markdown en preámbulo + secciones (encabezado ##, texto completo), ignorando bloques de código"""
+        preamble_lines = []
+        sections = []
+        in_code = False
+        
+        for line in markdown.splitlines(keepends=True):
+            if line.startswith('```'):
+                in_code = not in_code
+            if not in_code and line.startswith('## '):
+                sections.append([line.strip(), line])
+            elif sections:
+                sections[-1][1] += line
+            else:
+                preamble_lines.append(line)
+        
+        return ''.join(preamble_lines), [(heading, text) for heading, text in sections]
+
+    def get_file_hashes(self, repository_data: Dict) -> Dict[str, str]:
+        """Hash de contenido de cada archivo del documento"""
+        hashes = {}
+        for data in repository_data.values():
+            file_infos = [f for files in data.values() for f in files.values()] if isinstance(data, dict) else data
+            for file_info in file_infos:
+                hashes[file_info['path']] = file_info['hash']
+        return hashes
+
+    def filter_repository_data(self, repository_data: Dict, paths: set) -> Dict:
+        """Subconjunto del modelo del repositorio con solo las rutas indicadas"""
+        filtered = {}
+        for comp_type, data in repository_data.items():
+            if isinstance(data, dict):
+                components = {}
+                for component_name, files in data.items():
+                    kept = {subtype: f for subtype, f in files.items() if f['path'] in paths}
+                    if kept:
+                        components[component_name] = kept
+                if components:
+                    filtered[comp_type] = components
+            else:
+                kept = [file_info for file_info in data if file_info['path'] in paths]
+                if kept:
+                    filtered[comp_type] = kept
+        return filtered
+
+    def get_source_name(self, path: str) -> str:
+        """Nombre con el que un archivo se menciona en la documentación"""
+        parts = Path(path).parts
+        if 'lwc' in parts or 'aura' in parts:
+            # Todos los archivos de un bundle comparten nombre: usar el nombre de archivo completo
+            return Path(path).name
+        return Path(path).name.split('.')[0]
+
+    def map_sections_to_sources(self, markdown: str, repository_data: Dict) -> Dict[str, List[str]]:
+        """Relaciona cada sección con los archivos que la informan (menciones y tipo de componente)"""
+        _, sections = self.split_markdown_sections(markdown)
+        
+        paths_by_type = {}
+        for comp_type, data in repository_data.items():
+            paths_by_type[comp_type] = self.get_unit_paths({comp_type: data})
+        all_paths = set().union(*paths_by_type.values()) if paths_by_type else set()
+        
+        section_sources = {}
+        for heading, text in sections:
+            text = self.strip_local_diagrams(text)
+            sources = {path for path in all_paths if self.get_source_name(path) in text}
+            for keyword, comp_types in SECTION_SOURCE_KEYWORDS.items():
+                if keyword in heading:
+                    for comp_type in comp_types:
+                        sources |= paths_by_type.get(comp_type, set())
+            section_sources[heading] = sorted(sources)
+        return section_sources
+
+    def find_affected_sections(self, sections: List[Tuple[str, str]], section_sources: Dict[str, List[str]],
+                               changed_paths: set, structural_change: bool) -> List[str]:
+        """Secciones cuyo contenido depende de algún archivo cambiado"""
+        affected = []
+        for heading, text in sections:
+            sources = set(section_sources.get(heading, []))
+            text = self.strip_local_diagrams(text)
+            mentions_new_file = any(self.get_source_name(path) in text for path in changed_paths)
+            is_structural = structural_change and any(keyword in heading for keyword in STRUCTURAL_SECTION_KEYWORDS)
+            if sources & changed_paths or mentions_new_file or is_structural:
+                affected.append(heading)
+        return affected
+
+    def regenerate_sections(self, repository_data: Dict, title: str, previous_markdown: str,
+                            affected: List[str], changed_paths: set) -> Optional[str]:
+        """Pide al modelo reescribir solo las secciones afectadas y las reinserta en el documento"""
+        
+        preamble, sections = self.split_markdown_sections(previous_markdown)
+        current_sections = [(heading, text) for heading, text in sections if heading in affected]
+        
+        changed_context = ""
+        for data in repository_data.values():
+            file_infos = [f for files in data.values() for f in files.values()] if isinstance(data, dict) else data
+            for file_info in file_infos:
+                if file_info['path'] in changed_paths:
+                    changed_context += f"\n### ARCHIVO: {file_info['path']} ({file_info['size']} chars, {file_info['lines']} lines)\n"
+                    changed_context += f"```{self.get_file_extension(file_info['path'])}\n{file_info['content']}\n```\n"
+        removed = sorted(path for path in changed_paths if path not in self.get_file_hashes(repository_data))
+        
+        prompt = (
+            f"Eres un Consultor Salesforce Senior. La documentación técnica de '{title}' ya existe. "
+            f"Han cambiado los siguientes archivos:\n{changed_context}\n"
+            + (f"Archivos eliminados: {', '.join(removed)}\n" if removed else "")
+            + "\nReescribe ÚNICAMENTE las secciones siguientes para reflejar los cambios, manteniendo el mismo "
+            "estilo, idioma y formato Markdown. Devuelve cada sección empezando EXACTAMENTE con su encabezado "
+            "original (línea '## ...'), sin texto adicional antes ni después.\n\n"
+            + ''.join(text for _, text in current_sections)
+        )
+        
+        # El tier se elige por la magnitud del cambio (solo los archivos cambiados)
+        priority = self.get_component_priority(repository_data)
+        tier = self.route_model(self.filter_repository_data(repository_data, changed_paths), priority)
+        
+        # La salida escala con el tamaño de las secciones afectadas, no con el documento
+        section_chars = sum(len(text) for _, text in current_sections)
+        max_tokens = min(tier['max_tokens'], max(512, int(section_chars / CHARS_PER_TOKEN * 1.5)))
+        
+        print(f"✂️ Regeneración incremental: {len(current_sections)}/{len(sections)} secciones "
+              f"({len(changed_paths)} archivos cambiados, max_tokens {max_tokens})")
+        self.save_artifact(title, 'prompt.txt', prompt)
+        
+        if self.structured_output:
+            # Solo los campos de las secciones afectadas; cada una se renderiza por separado
+            headings = [heading for heading, _ in current_sections]
+            data = self.request_completion(title, prompt + STRUCTURED_OUTPUT_INSTRUCTIONS, priority, max_tokens, tier,
+                                           tool=build_documentation_tool(headings, with_title=False))
+            if not data:
+                return None
+            replacements = {heading: render_structured_section(heading, data[section_key(heading)])
+                            for heading in headings if isinstance(data.get(section_key(heading)), dict)}
+        else:
+            response = self.request_completion(title, prompt, priority, max_tokens, tier)
+            if not response:
+                return None
+            _, new_sections = self.split_markdown_sections(response)
+            replacements = {heading: text for heading, text in new_sections if heading in affected}
+        if not replacements:
+            return None
+        
+        merged = preamble + ''.join(
+            (replacements[heading].rstrip('\n') + '\n\n') if heading in replacements else text
+            for heading, text in sections
+        )
+        print(f"✅ {len(replacements)} secciones reemplazadas en el documento existente")
+        return merged
+
+    def document_cache_path(self, title: str) -> Path:
+        """Ruta del último documento generado para un título"""
+        slug = re.sub(r'[^\w.-]+', '_', title)
+        return self.cache_dir / 'documents' / f"{slug}.json"
+
+    def load_previous_document(self, title: str) -> Optional[Dict]:
+        """Última documentación generada para el componente (si existe)"""
+        path = self.document_cache_path(title)
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))
+        except Exception as e:
+            print(f"⚠️ Documento previo ilegible ({path}): {e}")
+            return None
+
+    def save_generated_document(self, title: str, markdown: str, repository_data: Dict):
+        """Guarda el Markdown generado con los hashes de archivos y el mapa sección → archivos"""
+        path = self.document_cache_path(title)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps({
+                'title': title,
+                'generated_at': datetime.now().isoformat(),
+                'markdown': markdown,
+                'file_hashes': self.get_file_hashes(repository_data),
+                'section_sources': self.map_sections_to_sources(markdown, repository_data),
+            }, indent=2, ensure_ascii=False), encoding='utf-8')
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar el documento generado: {e}")
+        
+        index = self.get_doc_index()
+        if index:
+            try:
+                index.index_document(title, markdown, extract_document_symbols(repository_data),
+                                     self.commit_key or 'working-tree')
+            except sqlite3.Error as e:
+                print(f"⚠️ No se pudo indexar el documento generado: {e}")
+
+    def get_doc_index(self) -> Optional[DocumentationIndex]:
+        """Índice local de documentos (se abre al primer uso; None si está desactivado o no hay FTS5)"""
+        if not self.doc_index_enabled:
+            return None
+        if self.doc_index is None:
+            try:
+                self.doc_index = DocumentationIndex(self.cache_dir / DOC_INDEX_FILE)
+            except sqlite3.Error as e:
+                print(f"⚠️ Índice local no disponible ({e}); se usará la búsqueda en Confluence")
+                self.doc_index_enabled = False
+                return None
+        return self.doc_index
+
+    def find_indexed_page(self, title: str) -> Optional[str]:
+        """ID de página del índice local para un título (None si no está indexado)"""
+        index = self.get_doc_index()
+        return index.find_page(title, self.confluence_space_key) if index else None
+
+    def inject_local_content(self, markdown: str, repository_data: Dict) -> str:
+        """Añade al documento del modelo las secciones calculadas localmente (inventario, Apex y diagramas)"""
+        markdown = self.inject_local_tables(markdown, repository_data)
+        markdown = self.inject_apex_analysis(markdown, repository_data)
+        return self.inject_local_diagrams(markdown, repository_data)
+
+    def is_local_section(self, heading: str) -> bool:
+        """Sección generada por completo a partir del escaneo (no la escribe el modelo)"""
+        heading = heading.strip()
+        return ((self.local_tables and heading == LOCAL_INVENTORY_HEADING) or
+                (self.apex_analysis and heading == APEX_ANALYSIS_HEADING))
+
+    def get_apex_findings(self, repository_data: Dict) -> Dict[str, List[Dict]]:
+        """Hallazgos del analizador Apex por archivo (solo archivos con hallazgos), cacheados por hash"""
+        
+        if self.apex_analysis_cache is None:
+            cache_path = self.cache_dir / 'apex-analysis.json'
+            try:
+                self.apex_analysis_cache = json.loads(cache_path.read_text(encoding='utf-8')) if cache_path.exists() else {}
+            except Exception:
+                self.apex_analysis_cache = {}
+        
+        findings = {}
+        for comp_type in ('apex_classes', 'apex_triggers'):
+            for file_info in repository_data.get(comp_type, []):
+                key = f"v{APEX_ANALYZER_VERSION}:{file_info['hash']}"
+                if key not in self.apex_analysis_cache:
+                    self.apex_analysis_cache[key] = analyze_apex_source(file_info['content'], comp_type == 'apex_triggers')
+                if self.apex_analysis_cache[key]:
+                    findings[file_info['path']] = self.apex_analysis_cache[key]
+        
+        self.apex_findings.update(findings)
+        return findings
+
+    def save_apex_analysis_cache(self):
+        """Persiste la caché del analizador Apex en .doc-cache"""
+        if not self.apex_analysis_cache:
+            return
+        try:
+            cache_path = self.cache_dir / 'apex-analysis.json'
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps(self.apex_analysis_cache, ensure_ascii=False), encoding='utf-8')
+        except Exception as e:
+            print(f"⚠️ No se pudo guardar la caché del análisis Apex: {e}")
+
+    def render_apex_analysis(self, repository_data: Dict) -> str:
+        """Sección con la tabla de hallazgos del análisis estático de Apex"""
+        
+        findings = self.get_apex_findings(repository_data)
+        analyzed = len(repository_data.get('apex_classes', [])) + len(repository_data.get('apex_triggers', []))
+        rows = sorted(
+            ((APEX_RULES[finding['rule']][0], APEX_RULES[finding['rule']][1], path, finding['line'], finding['detail'])
+             for path, file_findings in findings.items() for finding in file_findings),
+            key=lambda row: (row[0] != '🔴', row[2], row[3])
+        )
+        
+        lines = [APEX_ANALYSIS_HEADING, '',
+                 f"*Análisis estático local de {analyzed} archivo(s) Apex: {len(rows)} hallazgo(s).*", '']
+        if not rows:
+            lines.append('✅ No se detectaron SOQL/DML dentro de bucles, consultas no selectivas ni triggers sin bulkificar.')
+        else:
+            lines += ['| Severidad | Regla | Archivo | Línea | Detalle |',
+                      '|-----------|-------|---------|-------|---------|']
+            lines += [f"| {severity} | {rule} | `{path}` | {line} | {detail.replace('|', '/')} |"
+                      for severity, rule, path, line, detail in rows[:self.inventory_max_rows]]
+            if len(rows) > self.inventory_max_rows:
+                lines.append(f"\n*Mostrando {self.inventory_max_rows} de {len(rows)} hallazgos.*")
+        return '\n'.join(lines) + '\n\n'
+
+    def inject_apex_analysis(self, markdown: str, repository_data: Dict) -> str:
+        """Sustituye (o inserta tras la sección de código Apex) la tabla de hallazgos de governor limits"""
+        
+        if not self.apex_analysis or not (repository_data.get('apex_classes') or repository_data.get('apex_triggers')):
+            return markdown
+        
+        section = self.render_apex_analysis(repository_data)
+        preamble, sections = self.split_markdown_sections(markdown)
+        headings = [heading for heading, _ in sections]
+        if APEX_ANALYSIS_HEADING in headings:
+            sections[headings.index(APEX_ANALYSIS_HEADING)] = (APEX_ANALYSIS_HEADING, section)
+        else:
+            position = next((index + 1 for index, heading in enumerate(headings) if 'Código Apex' in heading), len(sections))
+            if position:
+                previous_heading, previous_text = sections[position - 1]
+                sections[position - 1] = (previous_heading, previous_text.rstrip('\n') + '\n\n')
+            sections.insert(position, (APEX_ANALYSIS_HEADING, section))
+        
+        return preamble + ''.join(text for _, text in sections)
+
+    def report_apex_findings(self):
+        """Resumen de hallazgos Apex de la ejecución (consola y GITHUB_OUTPUT)"""
+        if not self.apex_analysis:
+            return
+        self.save_apex_analysis_cache()
+        
+        counts = {}
+        for file_findings in self.apex_findings.values():
+            for finding in file_findings:
+                counts[finding['rule']] = counts.get(finding['rule'], 0) + 1
+        total = sum(counts.values())
+        if total:
+            detail = ', '.join(f"{count} {APEX_RULES[rule][1]}" for rule, count in sorted(counts.items()))
+            print(f"⚡ Análisis Apex: {total} hallazgo(s) en {len(self.apex_findings)} archivo(s) ({detail})")
+        
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"apex-findings={total}\n")
+                f.write(f"apex-critical-findings={sum(count for rule, count in counts.items() if APEX_RULES[rule][0] == '🔴')}\n")
+
+    def render_local_tables(self, repository_data: Dict) -> str:
+        """Sección de inventario: tabla de componentes, métricas por tipo y tabla de archivos"""
+        
+        graph = self.get_dependency_graph(repository_data)
+        dependencies = {}
+        for source, target, _ in graph['edges']:
+            dependencies.setdefault(source, set()).add(graph['nodes'][target]['name'])
+        
+        components = []
+        files = []
+        for comp_type, data in repository_data.items():
+            type_label = COMPONENT_TYPE_LABELS.get(comp_type, comp_type)
+            if isinstance(data, dict):
+                grouped = {name: list(bundle.values()) for name, bundle in data.items()}
+            else:
+                grouped = {}
+                for file_info in data:
+                    parts = Path(file_info['path']).parts
+                    name = Path(file_info['path']).name.split('.')[0]
+                    if 'objects' in parts and parts.index('objects') + 2 < len(parts) - 1:
+                        # Campos, reglas de validación, etc.: Objeto.Nombre
+                        name = f"{parts[parts.index('objects') + 1]}.{name}"
+                    grouped.setdefault(name, []).append(file_info)
+            
+            for name, file_infos in grouped.items():
+                node_id = GRAPH_NODE_KINDS.get(comp_type, '').lower() + '_' + re.sub(r'\W', '_', name)
+                components.append({
+                    'name': name,
+                    'type': type_label,
+                    'priority': COMPONENT_PRIORITY.get(comp_type, LOW_PRIORITY_THRESHOLD),
+                    'files': len(file_infos),
+                    'lines': sum(f['lines'] for f in file_infos),
+                    'size': sum(f['size'] for f in file_infos),
+                    'dependencies': sorted(dependencies.get(node_id, [])),
+                })
+                files.extend((f['path'], type_label, f['lines'], f['size']) for f in file_infos)
+        
+        components.sort(key=lambda c: (c['priority'], c['type'], c['name']))
+        files.sort()
+        
+        def truncated(rows: List[str], total: int) -> List[str]:
+            if total > self.inventory_max_rows:
+                rows.append(f"\n*Mostrando {self.inventory_max_rows} de {total} filas.*")
+            return rows
+        
+        lines = [LOCAL_INVENTORY_HEADING, '',
+                 '| Componente | Tipo | Criticidad | Archivos | Líneas | Tamaño | Dependencias |',
+                 '|------------|------|-----------|----------|--------|--------|---------------|']
+        lines += truncated([
+            f"| {c['name']} | {c['type']} | {criticality_level(c['priority'])} | {c['files']} | {c['lines']:,} | "
+            f"{c['size']:,} | {', '.join(c['dependencies']) or '-'} |"
+            for c in components[:self.inventory_max_rows]
+        ], len(components))
+        lines += ['',
+                  '**Leyenda:**',
+                  '- 🔴 **Crítico:** Afecta operaciones core del negocio',
+                  '- 🟡 **Importante:** Impacta flujos de trabajo importantes',
+                  '- 🟢 **Informativo:** Mejora experiencia de usuario',
+                  '',
+                  '### 📈 Métricas',
+                  '',
+                  f"- **Componentes:** {len(components):,}",
+                  f"- **Archivos:** {len(files):,}",
+                  f"- **Líneas de código:** {sum(f[2] for f in files):,}",
+                  f"- **Tamaño total:** {sum(f[3] for f in files):,} caracteres",
+                  '',
+                  '| Tipo | Componentes | Archivos | Líneas | Tamaño |',
+                  '|------|-------------|----------|--------|--------|']
+        for type_label in sorted({c['type'] for c in components}):
+            of_type = [c for c in components if c['type'] == type_label]
+            lines.append(f"| {type_label} | {len(of_type)} | {sum(c['files'] for c in of_type)} | "
+                         f"{sum(c['lines'] for c in of_type):,} | {sum(c['size'] for c in of_type):,} |")
+        lines += ['',
+                  '### 📁 Archivos',
+                  '',
+                  '| Archivo | Tipo | Líneas | Tamaño |',
+                  '|---------|------|--------|--------|']
+        lines += truncated([
+            f"| `{path}` | {type_label} | {line_count:,} | {size:,} |"
+            for path, type_label, line_count, size in files[:self.inventory_max_rows]
+        ], len(files))
+        return '\n'.join(lines) + '\n\n'
+
+    def inject_local_tables(self, markdown: str, repository_data: Dict) -> str:
+        """Sustituye (o inserta tras la presentación) la sección de inventario por la calculada localmente"""
+        
+        if not self.local_tables:
+            return markdown
+        
+        inventory = self.render_local_tables(repository_data)
+        preamble, sections = self.split_markdown_sections(markdown)
+        for index, (heading, _) in enumerate(sections):
+            if 'Inventario' in heading:
+                sections[index] = (LOCAL_INVENTORY_HEADING, inventory)
+                break
+        else:
+            sections.insert(min(1, len(sections)), (LOCAL_INVENTORY_HEADING, inventory))
+        
+        return preamble + ''.join(text for _, text in sections)
+
+    def build_dependency_graph(self, repository_data: Dict, max_nodes: Optional[int] = None) -> Dict:
+        """Grafo de dependencias a partir de imports LWC, referencias Apex y enlaces de triggers/flows"""
+        
+        nodes = {}
+        edges = set()
+        
+        def node(kind: str, name: str, declared: bool = False) -> str:
+            node_id = kind.lower() + '_' + re.sub(r'\W', '_', name)
+            if node_id not in nodes:
+                nodes[node_id] = {'kind': kind, 'name': name, 'declared': declared}
+            nodes[node_id]['declared'] |= declared
+            return node_id
+        
+        def strip_comments(code: str) -> str:
+            return re.sub(r'//[^\n]*|/\*.*?\*/', '', code, flags=re.DOTALL)
+        
+        def file_name(file_info: Dict) -> str:
+            return Path(file_info['path']).name.split('.')[0]
+        
+        apex_sources = [(file_name(f), 'Apex', f) for f in repository_data.get('apex_classes', [])]
+        apex_sources += [(file_name(f), 'Trigger', f) for f in repository_data.get('apex_triggers', [])]
+        class_names = {name for name, kind, _ in apex_sources if kind == 'Apex'}
+        lwc_names = set(repository_data.get('lwc_components', {}))
+        
+        for name, files in sorted(repository_data.get('lwc_components', {}).items()):
+            source = node('LWC', name, declared=True)
+            script = files.get('js', {}).get('content', '')
+            for apex_class in re.findall(r"@salesforce/apex/(\w+)\.\w+", script):
+                edges.add((source, node('Apex', apex_class), 'llama'))
+            for child in re.findall(r"from\s+['\"]c/(\w+)['\"]", script):
+                edges.add((source, node('LWC', child), 'importa'))
+            for sobject in re.findall(r"@salesforce/schema/(\w+)", script):
+                edges.add((source, node('Object', sobject), 'usa'))
+            for tag in re.findall(r'<c-([\w-]+)', files.get('html', {}).get('content', '')):
+                first, *rest = tag.split('-')
+                edges.add((source, node('LWC', first + ''.join(part[:1].upper() + part[1:] for part in rest)), 'contiene'))
+        
+        for name, files in sorted(repository_data.get('aura_components', {}).items()):
+            source = node('Aura', name, declared=True)
+            markup = files.get('cmp', {}).get('content', '')
+            for apex_class in re.findall(r'controller="(?:\w+\.)?(\w+)"', markup):
+                edges.add((source, node('Apex', apex_class), 'controller'))
+            for child in re.findall(r'<c:(\w+)', markup):
+                edges.add((source, node('LWC' if child in lwc_names else 'Aura', child), 'contiene'))
+        
+        for file_info in repository_data.get('visualforce', []):
+            source = node('Visualforce', file_name(file_info), declared=True)
+            for attribute in re.findall(r'(?:controller|extensions)="([\w.,\s]+)"', file_info['content']):
+                for apex_class in attribute.split(','):
+                    edges.add((source, node('Apex', apex_class.strip().split('.')[-1]), 'controller'))
+        
+        for name, kind, file_info in apex_sources:
+            source = node(kind, name, declared=True)
+            code = strip_comments(file_info['content'])
+            if kind == 'Trigger':
+                match = re.search(r'\btrigger\s+\w+\s+on\s+(\w+)', code, re.IGNORECASE)
+                if match:
+                    edges.add((node('Object', match.group(1)), source, 'dispara'))
+            for reference in sorted((set(re.findall(r'\b[A-Za-z_]\w*\b', code)) & class_names) - {name}):
+                edges.add((source, node('Apex', reference), 'usa'))
+            for sobject in re.findall(r'\[\s*SELECT\b.*?\bFROM\s+(\w+)', code, re.IGNORECASE | re.DOTALL):
+                edges.add((source, node('Object', sobject), 'SOQL'))
+            for credential in re.findall(r'callout:(\w+)', code):
+                edges.add((source, node('External', credential), 'callout'))
+            for host in re.findall(r"setEndpoint\(\s*'https?://([^/'\s]+)", code):
+                edges.add((source, node('External', host), 'callout'))
+        
+        for file_info in repository_data.get('flows', []):
+            source = node('Flow', file_name(file_info), declared=True)
+            xml = file_info['content']
+            start = re.search(r'<start>.*?<object>(\w+)</object>.*?</start>', xml, re.DOTALL)
+            if start:
+                edges.add((node('Object', start.group(1)), source, 'dispara'))
+            for action in re.findall(r'<actionCalls>(.*?)</actionCalls>', xml, re.DOTALL):
+                apex_action = re.search(r'<actionName>(\w+)</actionName>', action)
+                if apex_action and '<actionType>apex</actionType>' in action:
+                    edges.add((source, node('Apex', apex_action.group(1)), 'acción'))
+            for subflow in re.findall(r'<subflows>.*?<flowName>(\w+)</flowName>', xml, re.DOTALL):
+                edges.add((source, node('Flow', subflow), 'subflow'))
+            for element, sobject in re.findall(
+                    r'<(recordLookups|recordCreates|recordUpdates|recordDeletes)>.*?<object>(\w+)</object>', xml, re.DOTALL):
+                edges.add((source, node('Object', sobject), 'lee' if element == 'recordLookups' else 'escribe'))
+        
+        for file_info in repository_data.get('objects', []):
+            node('Object', file_name(file_info), declared=True)
+        
+        return self.prune_dependency_graph(nodes, edges, max_nodes)
+
+    def prune_dependency_graph(self, nodes: Dict, edges: set, max_nodes: Optional[int] = None) -> Dict:
+        """Grafos grandes: conserva los componentes del documento y los nodos más conectados"""
+        
+        if max_nodes and len(nodes) > max_nodes:
+            degree = {node_id: 0 for node_id in nodes}
+            for source, target, _ in edges:
+                degree[source] += 1
+                degree[target] += 1
+            kept = set(sorted(nodes, key=lambda node_id: (not nodes[node_id]['declared'], -degree[node_id], node_id))
+                       [:max_nodes])
+            omitted = len(nodes) - len(kept)
+            nodes = {node_id: info for node_id, info in nodes.items() if node_id in kept}
+            edges = {edge for edge in edges if edge[0] in kept and edge[1] in kept}
+        else:
+            omitted = 0
+        
+        return {
+            'nodes': {node_id: nodes[node_id] for node_id in sorted(nodes)},
+            'edges': sorted(edges),
+            'omitted': omitted,
+        }
+
+    def get_dependency_graph(self, repository_data: Dict, max_nodes: Optional[int] = None) -> Dict:
+        """Grafo de un documento: su vecindario en el grafo del escaneo completo (incluye relaciones entre componentes)"""
+        
+        if self.dependency_graph is None:
+            return self.build_dependency_graph(repository_data, max_nodes)
+        
+        full = self.dependency_graph
+        own = {node_id for node_id, info in self.build_dependency_graph(repository_data)['nodes'].items()
+               if info['declared'] and node_id in full['nodes']}
+        edges = {tuple(edge) for edge in full['edges'] if edge[0] in own or edge[1] in own}
+        neighbours = own | {node_id for source, target, _ in edges for node_id in (source, target)}
+        # Solo los componentes del documento cuentan como declarados (prioridad al recortar)
+        nodes = {node_id: dict(full['nodes'][node_id], declared=node_id in own) for node_id in neighbours}
+        return self.prune_dependency_graph(nodes, edges, max_nodes)
+
+    def render_local_diagrams(self, graph: Dict) -> str:
+        """Markdown con los diagramas mermaid (arquitectura por capas, dependencias y secuencia de callouts)"""
+        
+        nodes, edges = graph['nodes'], graph['edges']
+        layer_of = {kind: layer_id for layer_id, _, kinds in DIAGRAM_LAYERS for kind in kinds}
+        
+        # Arquitectura: capas con el recuento de componentes y de relaciones entre ellas
+        architecture = ['graph TB', '    user["Usuario"]']
+        for layer_id, label, kinds in DIAGRAM_LAYERS:
+            counts = [(kind, sum(1 for info in nodes.values() if info['kind'] == kind)) for kind in kinds]
+            summary = ', '.join(f"{count} {kind}" for kind, count in counts if count)
+            if summary:
+                architecture.append(f'    {layer_id}["{label} ({summary})"]')
+        present = {layer_id for layer_id, _, kinds in DIAGRAM_LAYERS if any(info['kind'] in kinds for info in nodes.values())}
+        if 'ui' in present:
+            architecture.append('    user -->|interactúa| ui')
+        layer_edges = {}
+        for source, target, _ in edges:
+            key = (layer_of[nodes[source]['kind']], layer_of[nodes[target]['kind']])
+            if key[0] != key[1]:
+                layer_edges[key] = layer_edges.get(key, 0) + 1
+        for (source, target), count in sorted(layer_edges.items()):
+            architecture.append(f"    {source} -->|{count} {'relación' if count == 1 else 'relaciones'}| {target}")
+        
+        # Dependencias: un nodo por componente agrupado por capa
+        dependencies = ['graph LR']
+        for layer_id, label, kinds in DIAGRAM_LAYERS:
+            members = [(node_id, info) for node_id, info in nodes.items() if info['kind'] in kinds]
+            if members:
+                dependencies.append(f'    subgraph {layer_id}["{label}"]')
+                dependencies.extend(f'        {node_id}["{info["kind"]}: {info["name"]}"]' for node_id, info in members)
+                dependencies.append('    end')
+        dependencies.extend(f"    {source} -->|{label}| {target}" for source, target, label in edges)
+        
+        blocks = [
+            f"{LOCAL_DIAGRAM_HEADINGS[0]}\n\n```mermaid\n" + '\n'.join(architecture) + "\n```\n",
+            f"{LOCAL_DIAGRAM_HEADINGS[1]}\n\n```mermaid\n" + '\n'.join(dependencies) + "\n```\n",
+        ]
+        
+        callouts = [(source, target) for source, target, label in edges if label == 'callout']
+        if callouts:
+            sequence = ['sequenceDiagram']
+            for node_id in sorted({node_id for edge in callouts for node_id in edge}):
+                sequence.append(f"    participant {node_id} as {nodes[node_id]['name']}")
+            for source, target in callouts:
+                sequence.append(f"    {source}->>{target}: callout")
+                sequence.append(f"    {target}-->>{source}: respuesta")
+            blocks.append(f"{LOCAL_DIAGRAM_HEADINGS[2]}\n\n```mermaid\n" + '\n'.join(sequence) + "\n```\n")
+        
+        if graph['omitted']:
+            blocks.append(f"*{graph['omitted']} componentes poco conectados omitidos de los diagramas.*\n")
+        return '\n'.join(blocks)
+
+    def get_local_diagrams(self, repository_data: Dict) -> str:
+        """Diagramas del documento, cacheados por hash del grafo (mismo grafo = mismo diagrama)"""
+        
+        graph = self.get_dependency_graph(repository_data, self.diagram_max_nodes)
+        if not graph['nodes']:
+            return ''
+        
+        graph_hash = hashlib.sha256(json.dumps(graph, sort_keys=True).encode('utf-8')).hexdigest()
+        cache_path = self.cache_dir / 'diagrams' / f"{graph_hash}.md"
+        if cache_path.exists():
+            return cache_path.read_text(encoding='utf-8')
+        
+        diagrams = self.render_local_diagrams(graph)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(diagrams, encoding='utf-8')
+        except Exception as e:
+            print(f"⚠️ No se pudo cachear el diagrama: {e}")
+        print(f"🗺️ Diagramas locales: {len(graph['nodes'])} nodos, {len(graph['edges'])} relaciones")
+        return diagrams
+
+    def strip_local_diagrams(self, text: str) -> str:
+        """Quita los diagramas inyectados localmente de un fragmento de Markdown"""
+        headings = '|'.join(re.escape(heading) for heading in LOCAL_DIAGRAM_HEADINGS)
+        return re.sub(rf'^(?:{headings})\n+```mermaid\n.*?\n```\n*', '', text, flags=re.MULTILINE | re.DOTALL)
+
+    def inject_local_diagrams(self, markdown: str, repository_data: Dict) -> str:
+        """Inserta los diagramas locales en la sección de arquitectura (sustituye los del modelo)"""
+        
+        if not self.local_diagrams:
+            return markdown
+        
+        diagrams = self.get_local_diagrams(repository_data)
+        if LOCAL_DIAGRAM_PLACEHOLDER in markdown:
+            return markdown.replace(LOCAL_DIAGRAM_PLACEHOLDER, diagrams.rstrip('\n'), 1)
+        if not diagrams:
+            return markdown
+        
+        preamble, sections = self.split_markdown_sections(markdown)
+        for index, (heading, text) in enumerate(sections):
+            if 'Arquitectura' in heading:
+                header_line, _, body = text.partition('\n')
+                body = self.strip_local_diagrams(body)
+                body = re.sub(r'```mermaid\n.*?\n```\n*', '', body, flags=re.DOTALL)
+                sections[index] = (heading, f"{header_line}\n\n{diagrams}\n{body.lstrip()}")
+                break
+        else:
+            position = min(2, len(sections))
+            sections.insert(position, ('## 🏗️ Arquitectura General', f"## 🏗️ Arquitectura General\n\n{diagrams}\n"))
+        
+        return preamble + ''.join(text for _, text in sections)
+
     def clean_documentation_title(self, documentation: str, fallback_title: str) -> str:
         """Limpia y normaliza el título extraído de la documentación"""
         
         # Buscar primer H1 en la documentación
         match = re.search(r'^# (.+?)$', documentation, re.MULTILINE)
-        if match:
-            title = match.group(1).strip()
-            # Limpiar emojis y caracteres especiales 
-            title = re.sub(r'[🎯🏗️📦💻⚠️🔧📊🚀⚡🔒🔗🎨📊📱🔄🌐🔍]', '', title).strip()
-            # Limpiar corchetes y contenido
-            title = re.sub(r'\[.*?\]', '', title).strip()
-            
-            if title and len(title) > 3:  # Título válido
-                return title
+        return self.sanitize_page_title(match.group(1) if match else '', fallback_title)
+
+    def sanitize_page_title(self, title: str, fallback_title: str) -> str:
+        """Título de página sin emojis ni corchetes y con longitud válida; si no, el título consistente"""
+        
+        title = ' '.join(title.split())
+        # Limpiar emojis y caracteres especiales 
+        title = re.sub(r'[🎯🏗️📦💻⚠️🔧📊🚀⚡🔒🔗🎨📊📱🔄🌐🔍]', '', title).strip()
+        # Limpiar corchetes y contenido
+        title = ' '.join(re.sub(r'\[.*?\]', '', title).split())
+        
+        if 3 < len(title) <= CONFLUENCE_TITLE_MAX_CHARS:  # Título válido
+            return title
         
         # Usar título consistente como fallback
         return fallback_title
@@ -801,7 +4051,7 @@ class SuperSalesforceDocumentationGenerator:
         }
         
         try:
-            response = requests.get(search_url, auth=auth, params=params)
+            response = self.session.get(search_url, auth=auth, params=params)
             
             if response.status_code == 200:
                 results = response.json()
@@ -820,199 +4070,729 @@ class SuperSalesforceDocumentationGenerator:
             print(f"❌ Error en búsqueda Confluence: {e}")
             return None
 
-    def create_confluence_page(self, title: str, content: str) -> bool:
+    def create_confluence_page(self, title: str, content: str,
+                               converted: Optional[Tuple[str, List[Dict]]] = None) -> bool:
         """Crea una nueva página en Confluence"""
         
-        create_url = f"{self.atlassian_base_url}/rest/api/content"
-        auth = (self.atlassian_email, self.atlassian_api_token)
-        
-        confluence_content = self.markdown_to_confluence_storage(content)
-        
-        payload = {
-            'type': 'page',
-            'title': title,
-            'space': {'key': self.confluence_space_key},
-            'body': {
-                'storage': {
-                    'value': confluence_content,
-                    'representation': 'storage'
-                }
-            }
-        }
-        
-        headers = {'Content-Type': 'application/json'}
+        confluence_content, attachments = converted or self.repair_storage(
+            title, prepare_storage_content(content, self.attachment_threshold))
+        content_hash = hashlib.sha256(confluence_content.encode('utf-8')).hexdigest()
         
         try:
-            response = requests.post(create_url, auth=auth, headers=headers, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                page_id = result['id']
-                page_url = f"{self.atlassian_base_url}/pages/viewpage.action?pageId={page_id}"
-                print(f"✅ Nueva página creada: {title}")
-                print(f"🔗 URL: {page_url}")
-                return True
-            else:
-                print(f"❌ Error creando página: {response.status_code}")
-                print(response.text)
+            page = self.publish_storage_page(title, confluence_content, content_hash)
+            if not page:
                 return False
+            
+            page_id = page['id']
+            page_url = f"{self.atlassian_base_url}/pages/viewpage.action?pageId={page_id}"
+            self.page_id_cache[title] = page_id
+            print(f"✅ Nueva página creada: {title}" if page['version']['number'] == 1 else
+                  f"✅ Página publicada (creada en paralelo por otro proceso): {title}")
+            print(f"🔗 URL: {page_url}")
+            return self.sync_attachments(page_id, attachments)
                 
         except Exception as e:
             print(f"❌ Error creando página en Confluence: {e}")
             return False
 
-    def update_confluence_page(self, page_id: str, title: str, content: str) -> bool:
+    def update_confluence_page(self, page_id: str, title: str, content: str,
+                               converted: Optional[Tuple[str, List[Dict]]] = None) -> bool:
         """Actualiza una página existente en Confluence"""
         
-        get_url = f"{self.atlassian_base_url}/rest/api/content/{page_id}"
+        try:
+            version = self.fetch_page_version(page_id)
+            if version is None:
+                index = self.get_doc_index()
+                if index and index.forget_page(page_id):
+                    # El ID venía del índice local y la página ya no existe: se vuelve a crear
+                    print(f"ℹ️ La página indexada {page_id} ya no está disponible, se crea de nuevo")
+                    return self.create_confluence_page(title, content, converted)
+                return False
+            
+            confluence_content, attachments = converted or self.repair_storage(
+                title, prepare_storage_content(content, self.attachment_threshold))
+            content_hash = hashlib.sha256(confluence_content.encode('utf-8')).hexdigest()
+            if version.get('message') == f"sha256:{content_hash}":
+                print(f"♻️ '{title}' ya publicado con este contenido (versión {version['number']})")
+                return self.sync_attachments(page_id, attachments)
+            
+            page = self.publish_storage_page(title, confluence_content, content_hash, page_id, version['number'])
+            if not page:
+                return False
+            
+            page_url = f"{self.atlassian_base_url}/pages/viewpage.action?pageId={page_id}"
+            print(f"✅ Página actualizada: {title}")
+            print(f"🔗 URL: {page_url}")
+            print(f"📊 Versión: {version['number']} → {page['version']['number']}")
+            return self.sync_attachments(page_id, attachments)
+                
+        except Exception as e:
+            print(f"❌ Error actualizando página en Confluence: {e}")
+            return False
+
+    def split_storage_sections(self, storage: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """Divide el storage format en introducción + secciones (título, cuerpo) por cada <h2> de primer nivel"""
+        # Solo cortan los <h2> fuera de CDATA (bloques de código) y de macros o tablas anidadas
+        boundaries = []
+        depth = 0
+        for match in STORAGE_TOKEN_PATTERN.finditer(storage):
+            closing, tag, self_closing = match.group(2), match.group(3), match.group(5)
+            if not tag or self_closing or tag.lower() in STORAGE_VOID_TAGS:
+                continue
+            if closing:
+                depth = max(0, depth - 1)
+                continue
+            if depth == 0 and tag.lower() == 'h2':
+                boundaries.append(match.start())
+            depth += 1
+        
+        parts = [storage[start:end] for start, end in zip([0] + boundaries, boundaries + [len(storage)])]
+        intro = parts[0]
+        sections = []
+        for part in parts[1:]:
+            match = re.match(r'<h2\b[^>]*>(.*?)</h2>', part, re.DOTALL | re.IGNORECASE)
+            heading = re.sub(r'<[^>]+>', '', match.group(1)) if match else ''
+            heading = re.sub(r'^[^\w¿¡]+', '', heading).strip() or f"Sección {len(sections) + 1}"
+            sections.append((heading, part))
+        return intro, sections
+
+    def page_lock(self, title: str) -> threading.Lock:
+        """Lock por título de página: los workers del proceso no compiten por la misma versión"""
+        with self.page_locks_guard:
+            return self.page_locks.setdefault(title, threading.Lock())
+
+    def fetch_page_version(self, page_id: str) -> Optional[Dict]:
+        """Versión actual de una página (número y mensaje con el hash publicado)"""
         auth = (self.atlassian_email, self.atlassian_api_token)
+        response = self.session.get(f"{self.atlassian_base_url}/rest/api/content/{page_id}",
+                                    auth=auth, params={'expand': 'version'})
+        if response.status_code != 200:
+            print(f"❌ Error obteniendo página: {response.status_code}")
+            return None
+        return response.json()['version']
+
+    def publish_storage_page(self, title: str, storage: str, content_hash: str,
+                             page_id: Optional[str] = None, current_version: int = 0,
+                             parent_id: Optional[str] = None) -> Optional[Dict]:
+        """Crea o actualiza una página con storage ya convertido; guarda el hash en el mensaje de versión
+        
+        El hash actúa como clave de idempotencia: si la versión actual ya lo tiene (otro worker, otra rama
+        o un reintento ya lo publicó) no se escribe nada. Ante un 409 o un título ya creado en paralelo se
+        vuelve a leer la versión y se reaplica el contenido, hasta DOC_PUBLISH_CONFLICT_RETRIES veces.
+        """
         
-        params = {'expand': 'version'}
+        auth = (self.atlassian_email, self.atlassian_api_token)
+        headers = {'Content-Type': 'application/json'}
+        idempotency_key = f"sha256:{content_hash}"
+        
+        with self.page_lock(title):
+            for attempt in range(self.publish_conflict_retries + 1):
+                payload = {
+                    'type': 'page',
+                    'title': title,
+                    'body': {'storage': {'value': storage, 'representation': 'storage'}},
+                    'version': {'number': current_version + 1, 'message': idempotency_key}
+                }
+                
+                if page_id:
+                    response = self.session.put(f"{self.atlassian_base_url}/rest/api/content/{page_id}",
+                                                auth=auth, headers=headers, json=payload)
+                else:
+                    payload['space'] = {'key': self.confluence_space_key}
+                    if parent_id:
+                        payload['ancestors'] = [{'id': parent_id}]
+                    response = self.session.post(f"{self.atlassian_base_url}/rest/api/content",
+                                                 auth=auth, headers=headers, json=payload)
+                
+                if response.status_code == 200:
+                    return response.json()
+                
+                created_concurrently = (not page_id and response.status_code in (400, 409) and
+                                        'already exists' in response.text)
+                if response.status_code != 409 and not created_concurrently:
+                    print(f"❌ Error publicando '{title}': {response.status_code}")
+                    print(response.text)
+                    return None
+                
+                # Conflicto: releer la versión (o localizar la página creada por otro) y reaplicar
+                if not page_id:
+                    page_id = self.search_confluence_page(title)
+                    if not page_id:
+                        print(f"❌ Error publicando '{title}': existe pero no se encuentra")
+                        return None
+                version = self.fetch_page_version(page_id)
+                if version is None:
+                    return None
+                if version.get('message') == idempotency_key:
+                    print(f"♻️ '{title}' ya publicado con este contenido (versión {version['number']})")
+                    return {'id': page_id, 'version': version}
+                
+                current_version = version['number']
+                if attempt < self.publish_conflict_retries:
+                    delay = self.publish_conflict_backoff_s * (2 ** attempt) * (0.5 + random.random())
+                    print(f"🔁 Conflicto de versión en '{title}' (v{current_version}), "
+                          f"reintento {attempt + 1}/{self.publish_conflict_retries} en {delay:.2f}s")
+                    time.sleep(delay)
+        
+        print(f"❌ Error publicando '{title}': conflicto de versión tras {self.publish_conflict_retries} reintentos")
+        return None
+
+    def publish_split_document(self, existing_page_id: Optional[str], title: str, documentation: str,
+                               converted: Optional[Tuple[str, List[Dict]]] = None) -> bool:
+        """Publica el documento como página padre (índice) + páginas hijas por sección"""
+        
+        auth = (self.atlassian_email, self.atlassian_api_token)
+        storage, attachments = converted or self.repair_storage(
+            title, prepare_storage_content(documentation, self.attachment_threshold))
+        intro, sections = self.split_storage_sections(storage)
+        
+        child_titles = [f"{title} - {heading}" for heading, _ in sections]
+        index_html = '<h2>📑 Índice</h2><ol>' + ''.join(
+            f'<li><ac:link><ri:page ri:content-title="{html.escape(child_title)}"/></ac:link></li>'
+            for child_title in child_titles
+        ) + '</ol>'
+        parent_storage = intro + index_html
+        parent_hash = hashlib.sha256(parent_storage.encode('utf-8')).hexdigest()
+        intro_attachments = [a for a in attachments if f'ri:filename="{a["filename"]}"' in intro]
         
         try:
-            response = requests.get(get_url, auth=auth, params=params)
-            
-            if response.status_code != 200:
-                print(f"❌ Error obteniendo página: {response.status_code}")
+            # Página padre: solo se actualiza si cambió la introducción o el índice
+            parent_id = existing_page_id
+            version = self.fetch_page_version(parent_id) if parent_id else None
+            if parent_id and version is None:
+                index = self.get_doc_index()
+                if not (index and index.forget_page(parent_id)):
+                    return False
+                # El ID venía del índice local y la página ya no existe: se vuelve a crear
+                print(f"ℹ️ La página indexada {parent_id} ya no está disponible, se crea de nuevo")
+                parent_id = None
+            if parent_id:
+                if version.get('message') != f"sha256:{parent_hash}":
+                    if not self.publish_storage_page(title, parent_storage, parent_hash, parent_id, version['number']):
+                        return False
+                    print(f"🔄 Página padre actualizada: {title}")
+            else:
+                parent_page = self.publish_storage_page(title, parent_storage, parent_hash)
+                if not parent_page:
+                    return False
+                parent_id = parent_page['id']
+                self.page_id_cache[title] = parent_id
+                print(f"🆕 Página padre creada: {title}")
+            # Adjuntos referenciados desde la introducción (p.ej. un diagrama antes del primer <h2>)
+            if not self.sync_attachments(parent_id, intro_attachments):
                 return False
             
-            page_data = response.json()
-            current_version = page_data['version']['number']
+            # Hijas existentes con su hash (una sola petición)
+            response = self.session.get(f"{self.atlassian_base_url}/rest/api/content/{parent_id}/child/page",
+                                        auth=auth, params={'limit': 500, 'expand': 'version'})
+            existing_children = {}
+            if response.status_code == 200:
+                existing_children = {child['title']: child for child in response.json().get('results', [])}
             
-            update_url = f"{self.atlassian_base_url}/rest/api/content/{page_id}"
-            confluence_content = self.markdown_to_confluence_storage(content)
+            def publish_child(child_title: str, section_storage: str) -> Tuple[str, str]:
+                content_hash = hashlib.sha256(section_storage.encode('utf-8')).hexdigest()
+                child = existing_children.get(child_title)
+                if child and child['version'].get('message') == f"sha256:{content_hash}":
+                    return child_title, 'unchanged'
+                page = self.publish_storage_page(
+                    child_title, section_storage, content_hash,
+                    page_id=child['id'] if child else None,
+                    current_version=child['version']['number'] if child else 0,
+                    parent_id=parent_id
+                )
+                if not page:
+                    return child_title, 'failed'
+                page_id = page['id']
+                section_attachments = [a for a in attachments if f'ri:filename="{a["filename"]}"' in section_storage]
+                if not self.sync_attachments(page_id, section_attachments):
+                    return child_title, 'failed'
+                return child_title, 'updated' if child else 'created'
             
-            payload = {
-                'version': {'number': current_version + 1},
-                'title': title,
-                'type': 'page',
-                'body': {
-                    'storage': {
-                        'value': confluence_content,
-                        'representation': 'storage'
-                    }
-                }
-            }
+            with ThreadPoolExecutor(max_workers=max(1, self.publish_concurrency)) as executor:
+                results = list(executor.map(lambda item: publish_child(*item),
+                                            zip(child_titles, [body for _, body in sections])))
             
-            headers = {'Content-Type': 'application/json'}
+            summary = {}
+            for _, status in results:
+                summary[status] = summary.get(status, 0) + 1
+            print(f"📑 Secciones: {len(sections)} → " + ', '.join(f"{count} {status}" for status, count in summary.items()))
             
-            response = requests.put(update_url, auth=auth, headers=headers, json=payload)
+            stale = set(existing_children) - set(child_titles)
+            if stale:
+                print(f"⚠️ Páginas hijas sin sección correspondiente (no se eliminan): {', '.join(sorted(stale))}")
+            
+            page_url = f"{self.atlassian_base_url}/pages/viewpage.action?pageId={parent_id}"
+            print(f"🔗 URL: {page_url}")
+            return 'failed' not in summary
             
-            if response.status_code == 200:
-                page_url = f"{self.atlassian_base_url}/pages/viewpage.action?pageId={page_id}"
-                print(f"✅ Página actualizada: {title}")
-                print(f"🔗 URL: {page_url}")
-                print(f"📊 Versión: {current_version} → {current_version + 1}")
-                return True
-            else:
-                print(f"❌ Error actualizando página: {response.status_code}")
-                print(response.text)
-                return False
-                
         except Exception as e:
-            print(f"❌ Error actualizando página en Confluence: {e}")
+            print(f"❌ Error publicando documento dividido: {e}")
             return False
 
-    def markdown_to_confluence_storage(self, markdown_content: str) -> str:
-        """Convierte markdown a Confluence Storage Format con mejor soporte"""
-        
-        content = markdown_content
+    def convert_documents(self, documents: List[str]) -> List[Tuple[str, List[Dict]]]:
+        """Convierte varios documentos; usa un pool de procesos cuando compensa su arranque"""
         
-        # Headers con mejor manejo
-        content = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', content, flags=re.MULTILINE)
-        content = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', content, flags=re.MULTILINE)
-        content = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', content, flags=re.MULTILINE)
-        content = re.sub(r'^#### (.*?)$', r'<h4>\1</h4>', content, flags=re.MULTILINE)
+        if len(documents) < self.convert_pool_min_docs or self.convert_workers <= 1:
+            return convert_storage_chunk(documents, self.attachment_threshold)
         
-        # Bold and italic
-        content = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', content)
-        content = re.sub(r'\*(.*?)\*', r'<em>\1</em>', content)
+        # Unidades de trabajo agrupadas para amortizar la serialización; map conserva el orden
+        chunk_size = max(1, -(-len(documents) // (self.convert_workers * 4)))
+        chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
         
-        # Tables - mejor conversión
-        content = self.convert_markdown_tables(content)
+        try:
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=self.convert_workers) as executor:
+                converted_chunks = executor.map(convert_storage_chunk, chunks, [self.attachment_threshold] * len(chunks))
+                results = [converted for chunk in converted_chunks for converted in chunk]
+            print(f"⚙️ {len(documents)} documentos convertidos en {self.convert_workers} procesos "
+                  f"({len(chunks)} bloques, {time.perf_counter() - start:.2f}s)")
+            return results
+        except POOL_UNAVAILABLE_ERRORS as e:
+            print(f"⚠️ Pool de conversión no disponible ({e}), convirtiendo en el proceso principal")
+            return convert_storage_chunk(documents, self.attachment_threshold)
+
+    def repair_storage(self, title: str, converted: Tuple[str, List[Dict]]) -> Tuple[str, List[Dict]]:
+        """Valida el storage de un documento y repara lo que Confluence rechazaría antes de subirlo"""
         
-        # Code blocks con mejor manejo de lenguajes
-        content = re.sub(
-            r'```(\w+)?\n(.*?)\n```', 
-            lambda m: f'<ac:structured-macro ac:name="code"><ac:parameter ac:name="language">{m.group(1) or "text"}</ac:parameter><ac:plain-text-body><![CDATA[{m.group(2)}]]></ac:plain-text-body></ac:structured-macro>', 
-            content, 
-            flags=re.DOTALL
-        )
+        if not self.validate_storage:
+            return converted
         
-        # Inline code
-        content = re.sub(r'`(.*?)`', r'<code>\1</code>', content)
+        start = time.perf_counter()
+        storage, issues = repair_storage_format(converted[0])
+        self.storage_repairs['elapsed_s'] += time.perf_counter() - start
+        self.storage_repairs['documents'] += 1
+        if not issues:
+            return converted
         
-        # Lists con mejor estructura
-        content = self.convert_markdown_lists(content)
+        if 'not_well_formed' in issues:
+            # La reparación no bastó: Confluence rechazará la página, no cuenta como evitada
+            self.storage_repairs['invalid'] += 1
+            print(f"❌ Storage de '{title}' sigue mal formado tras la reparación: "
+                  f"{storage_parse_error(storage)}")
+        elif any(STORAGE_ISSUES[kind][1] for kind in issues) or storage_parse_error(converted[0]):
+            self.storage_repairs['prevented'] += 1
+        self.storage_repairs['repaired'] += 1
+        for kind, count in issues.items():
+            self.storage_repairs['issues'][kind] = self.storage_repairs['issues'].get(kind, 0) + count
+        print(f"🩺 Storage reparado en '{title}': " +
+              ', '.join(f"{count} {STORAGE_ISSUES[kind][0]}" for kind, count in sorted(issues.items())))
+        return storage, converted[1]
+
+    def report_storage_repairs(self):
+        """Resumen de la validación del storage (consola y GITHUB_OUTPUT)"""
+        stats = self.storage_repairs
+        if not stats['documents']:
+            return
         
-        # Mermaid diagrams
-        content = re.sub(
-            r'```mermaid\n(.*?)\n```',
-            r'<ac:structured-macro ac:name="mermaid"><ac:plain-text-body><![CDATA[\1]]></ac:plain-text-body></ac:structured-macro>',
-            content,
-            flags=re.DOTALL
-        )
+        print(f"🩺 Validación de storage: {stats['documents']} documento(s) en {stats['elapsed_s'] * 1000:.0f} ms, "
+              f"{stats['repaired']} reparado(s), {stats['prevented']} publicación(es) rechazada(s) evitada(s)"
+              + (f", {stats['invalid']} aún mal formado(s)" if stats['invalid'] else ''))
         
-        # Links
-        content = re.sub(r'\[([^\]]+)\]\(([^\)]+)\)', r'<a href="\2">\1</a>', content)
+        github_output = os.getenv('GITHUB_OUTPUT')
+        if github_output:
+            with open(github_output, 'a', encoding='utf-8') as f:
+                f.write(f"storage-repairs={stats['repaired']}\n")
+                f.write(f"storage-round-trips-prevented={stats['prevented']}\n")
+                f.write(f"storage-still-invalid={stats['invalid']}\n")
+
+    def sync_attachments(self, page_id: str, attachments: List[Dict]) -> bool:
+        """Sube solo los adjuntos nuevos o cuyo hash de contenido cambió"""
         
-        # Line breaks
-        content = content.replace('\n', '<br/>')
+        if not attachments:
+            return True
         
-        return content
-
-    def convert_markdown_tables(self, content: str) -> str:
-        """Convierte tablas markdown a formato Confluence"""
+        attachment_url = f"{self.atlassian_base_url}/rest/api/content/{page_id}/child/attachment"
+        auth = (self.atlassian_email, self.atlassian_api_token)
+        headers = {'X-Atlassian-Token': 'no-check'}
         
-        def table_replacer(match):
-            lines = match.group(0).strip().split('\n')
-            if len(lines) < 2:
-                return match.group(0)
+        try:
+            response = self.session.get(attachment_url, auth=auth, params={'limit': 500, 'expand': 'metadata'})
+            existing = {}
+            if response.status_code == 200:
+                for item in response.json().get('results', []):
+                    existing[item['title']] = item
             
-            # Header
-            headers = [cell.strip() for cell in lines[0].split('|')[1:-1]]
+            uploaded = skipped = 0
+            for attachment in attachments:
+                comment = f"sha256:{attachment['hash']}"
+                current = existing.get(attachment['filename'])
+                
+                if current and current.get('metadata', {}).get('comment') == comment:
+                    skipped += 1
+                    continue
+                
+                upload_url = f"{attachment_url}/{current['id']}/data" if current else attachment_url
+                response = self.session.post(
+                    upload_url, auth=auth, headers=headers,
+                    files={'file': (attachment['filename'], attachment['content'].encode('utf-8'), 'text/plain')},
+                    data={'comment': comment, 'minorEdit': 'true'}
+                )
+                if response.status_code != 200:
+                    print(f"❌ Error subiendo adjunto {attachment['filename']}: {response.status_code}")
+                    print(response.text)
+                    return False
+                uploaded += 1
             
-            # Skip separator line
-            data_lines = lines[2:]
+            print(f"📎 Adjuntos: {uploaded} subidos, {skipped} sin cambios")
+            return True
             
-            table_html = '<table><thead><tr>'
-            for header in headers:
-                table_html += f'<th>{header}</th>'
-            table_html += '</tr></thead><tbody>'
+        except Exception as e:
+            print(f"❌ Error sincronizando adjuntos: {e}")
+            return False
+
+class DocumentationDaemon:
+    """Daemon de documentación: cola de trabajos por commit servida por un pool de workers"""
+    
+    def __init__(self, workers: int = 2):
+        # Conexiones y cachés calientes compartidas entre trabajos
+        self.session = create_http_session()
+        self.generators = {}
+        self.jobs = {}
+        self.pending = []
+        self.running_repos = set()
+        self.condition = threading.Condition()
+        self.job_counter = 0
+        self.worker_count = workers
+    
+    def merge_commit_ranges(self, queued_range: str, new_range: str) -> str:
+        """Fusiona 'A..B' + 'B..C' en 'A..C' (base del trabajo encolado, head del nuevo)
+        
+        Un rango vacío es una regeneración completa y absorbe al otro; si alguno no tiene la forma 'A..B'
+        (un solo commit, 'A...B') no se puede unir con precisión y también se regenera todo.
+        """
+        def endpoints(commit_range: str) -> Optional[List[str]]:
+            parts = commit_range.split('..') if commit_range and '...' not in commit_range else []
+            return parts if len(parts) == 2 and all(parts) else None
+        
+        queued, new = endpoints(queued_range), endpoints(new_range)
+        if not (queued and new):
+            return ''
+        return f"{queued[0]}..{new[1]}"
+    
+    def submit(self, repo: str, commit_range: str, branch: str) -> Tuple[Dict, bool]:
+        """Encola un trabajo; si ya hay uno pendiente para la misma rama, se fusiona con él"""
+        repo = str(Path(repo).resolve())
+        
+        with self.condition:
+            for job_id in self.pending:
+                job = self.jobs[job_id]
+                if job['repo'] == repo and job['branch'] == branch:
+                    job['commit_range'] = self.merge_commit_ranges(job['commit_range'], commit_range)
+                    job['coalesced'] += 1
+                    return job, True
             
-            for line in data_lines:
-                if line.strip():
-                    cells = [cell.strip() for cell in line.split('|')[1:-1]]
-                    table_html += '<tr>'
-                    for cell in cells:
-                        table_html += f'<td>{cell}</td>'
-                    table_html += '</tr>'
+            self.job_counter += 1
+            job = {
+                'id': str(self.job_counter),
+                'repo': repo,
+                'branch': branch,
+                'commit_range': commit_range,
+                'status': 'queued',
+                'coalesced': 0,
+                'submitted_at': datetime.now().isoformat(),
+            }
+            self.jobs[job['id']] = job
+            self.pending.append(job['id'])
+            self.trim_job_history()
+            self.condition.notify()
+            return job, False
+    
+    def trim_job_history(self, limit: int = 1000):
+        """Descarta los trabajos terminados más antiguos"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+        for job_id in finished[:max(0, len(self.jobs) - limit)]:
+            del self.jobs[job_id]
+    
+    def next_job(self) -> Dict:
+        """Bloquea hasta que haya un trabajo de un repositorio que no se esté procesando"""
+        with self.condition:
+            while True:
+                for job_id in self.pending:
+                    job = self.jobs[job_id]
+                    if job['repo'] not in self.running_repos:
+                        self.pending.remove(job_id)
+                        self.running_repos.add(job['repo'])
+                        job['status'] = 'running'
+                        job['started_at'] = datetime.now().isoformat()
+                        return job
+                self.condition.wait()
+    
+    def worker_loop(self):
+        while True:
+            job = self.next_job()
+            try:
+                self.process_job(job)
+            except (Exception, SystemExit) as e:
+                print(f"❌ Trabajo {job['id']} falló: {e}")
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            finally:
+                job['finished_at'] = datetime.now().isoformat()
+                with self.condition:
+                    self.running_repos.discard(job['repo'])
+                    self.condition.notify_all()
+    
+    def process_job(self, job: Dict):
+        """Ejecuta el generador sobre el repositorio del trabajo reutilizando su instancia"""
+        print(f"\n📥 Trabajo {job['id']}: {job['repo']} [{job['branch']}] {job['commit_range'] or '(completo)'}")
+        
+        generator = self.generators.get(job['repo'])
+        if generator is None:
+            generator = SuperSalesforceDocumentationGenerator(repo_root=job['repo'], session=self.session)
+            self.generators[job['repo']] = generator
+        
+        generator.changed_files = None
+        generator.changed_lines = {}
+        if job['commit_range']:
+            generator.changed_files = generator.load_changed_files(job['commit_range'])
+            if generator.changed_files is None:
+                # Sin diff no se documenta el repositorio completo: el trabajo falla
+                raise ValueError(f"no se pudo obtener el diff de '{job['commit_range']}'")
+        success = generator.run()
+        
+        job['status'] = 'done' if success else 'failed'
+        job['success'] = bool(success)
+        job['cost_usd'] = round(generator.run_cost_usd, 6)
+        job['skipped_components'] = list(generator.budget_skipped)
+        job['deferred_components'] = [unit['title'] for unit in generator.deferred_units]
+    
+    def status(self) -> Dict:
+        with self.condition:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {
+                'workers': self.worker_count,
+                'queued': len(self.pending),
+                'running_repos': sorted(self.running_repos),
+                'jobs': counts,
+                'warm_repos': sorted(self.generators),
+            }
+    
+    def serve(self, listen: str) -> bool:
+        """Arranca los workers y el endpoint HTTP (host:puerto o unix:/ruta/socket)"""
+        for index in range(self.worker_count):
+            threading.Thread(target=self.worker_loop, name=f"doc-worker-{index}", daemon=True).start()
+        
+        handler = make_daemon_handler(self)
+        if listen.startswith('unix:'):
+            socket_path = listen[len('unix:'):]
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
             
-            table_html += '</tbody></table>'
-            return table_html
+            class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+                daemon_threads = True
+            
+            server = ThreadingUnixHTTPServer(socket_path, handler)
+        else:
+            host, _, port = listen.rpartition(':')
+            server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), handler)
+            server.daemon_threads = True
         
-        # Pattern para detectar tablas markdown
-        table_pattern = r'\|.*?\|\n\|[-\s|:]+\|\n(?:\|.*?\|\n)+'
-        content = re.sub(table_pattern, table_replacer, content, flags=re.MULTILINE)
+        print(f"🛰️ Daemon de documentación escuchando en {listen} ({self.worker_count} workers)")
+        print("   POST /jobs {\"repo\": \"/ruta\", \"commit_range\": \"A..B\", \"branch\": \"main\"}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Deteniendo daemon")
+        finally:
+            server.server_close()
+        return True
+
+class DocumentationWatcher:
+    """Modo watch: sondea el repositorio con stat y regenera solo los componentes cambiados como vista previa local"""
+    
+    def __init__(self, generator: SuperSalesforceDocumentationGenerator, interval: float = 1.0):
+        self.generator = generator
+        self.interval = interval
+        # Caché de listados por directorio: (mtime, subdirectorios, archivos); solo se relistan los que cambian
+        self.directories = {}
+        self.snapshot = {}
+
+    def scan_directory(self, directory: str, snapshot: Dict[str, Tuple[int, int]]):
+        """Añade al snapshot (mtime, tamaño) de los archivos vigilados bajo un directorio"""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self.directories.pop(directory, None)
+            return
         
-        return content
+        cached = self.directories.get(directory)
+        if not cached or cached[0] != mtime:
+            subdirectories, files = [], []
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in WATCH_IGNORED_DIRS and not entry.name.startswith('.'):
+                            subdirectories.append(entry.path)
+                    elif entry.name.endswith(WATCH_EXTENSIONS):
+                        files.append(entry.path)
+            cached = (mtime, sorted(subdirectories), sorted(files))
+            self.directories[directory] = cached
+        
+        for file_path in cached[2]:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            snapshot[os.path.relpath(file_path, self.generator.repo_root)] = (stat.st_mtime_ns, stat.st_size)
+        for subdirectory in cached[1]:
+            self.scan_directory(subdirectory, snapshot)
+
+    def take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Estado actual de los archivos vigilados (sin leer su contenido)"""
+        snapshot = {}
+        self.scan_directory(str(self.generator.repo_root), snapshot)
+        return snapshot
 
-    def convert_markdown_lists(self, content: str) -> str:
-        """Convierte listas markdown a formato Confluence"""
+    def detect_changes(self) -> set:
+        """Rutas añadidas, eliminadas o modificadas desde el último sondeo"""
+        current = self.take_snapshot()
+        changed = {path for path in current.keys() | self.snapshot.keys() if current.get(path) != self.snapshot.get(path)}
+        self.snapshot = current
+        return changed
+
+    def watch(self) -> bool:
+        """Bucle de sondeo: cada cambio regenera los componentes afectados y su vista previa"""
+        generator = self.generator
+        self.snapshot = self.take_snapshot()
+        print(f"👀 Modo watch: {len(self.snapshot)} archivos vigilados en {generator.repo_root.resolve()} "
+              f"(cada {self.interval}s)")
+        print(f"🖥️ Vista previa en {generator.preview_dir.resolve()} (Ctrl+C para salir)")
         
-        # Listas con bullets
-        content = re.sub(r'^- (.*?)$', r'<ul><li>\1</li></ul>', content, flags=re.MULTILINE)
+        try:
+            while True:
+                time.sleep(self.interval)
+                changed = self.detect_changes()
+                if not changed:
+                    continue
+                
+                # Los editores suelen escribir en varias fases: agrupar los cambios inmediatos
+                time.sleep(min(0.2, self.interval))
+                changed |= self.detect_changes()
+                
+                print(f"\n✏️ Cambios detectados: {', '.join(sorted(changed))}")
+                start = time.perf_counter()
+                generator.changed_files = changed
+                generator.run()
+                print(f"⏱️ Vista previa actualizada en {time.perf_counter() - start:.2f}s")
+        except KeyboardInterrupt:
+            print("\n👋 Modo watch finalizado")
+            return True
+
+def make_daemon_handler(daemon: DocumentationDaemon):
+    """Crea el handler HTTP del daemon"""
+    
+    class DaemonHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
         
-        # Listas numeradas  
-        content = re.sub(r'^\d+\. (.*?)$', r'<ol><li>\1</li></ol>', content, flags=re.MULTILINE)
+        def send_json(self, status: int, body: Dict):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
         
-        # Consolidar listas consecutivas
-        content = re.sub(r'</ul><br/><ul>', '', content)
-        content = re.sub(r'</ol><br/><ol>', '', content)
+        def do_GET(self):
+            if self.path.rstrip('/') == '/status':
+                return self.send_json(200, daemon.status())
+            match = re.fullmatch(r'/jobs/(\d+)', self.path.rstrip('/'))
+            if match and match.group(1) in daemon.jobs:
+                return self.send_json(200, daemon.jobs[match.group(1)])
+            self.send_json(404, {'error': 'not found'})
         
-        return content
+        def do_POST(self):
+            if self.path.rstrip('/') != '/jobs':
+                return self.send_json(404, {'error': 'not found'})
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length).decode('utf-8') or '{}')
+            except ValueError:
+                return self.send_json(400, {'error': 'invalid JSON'})
+            
+            repo = body.get('repo')
+            if not repo or not Path(repo).is_dir():
+                return self.send_json(400, {'error': 'repo must be an existing directory'})
+            
+            job, coalesced = daemon.submit(repo, body.get('commit_range', ''), body.get('branch', 'main'))
+            self.send_json(202, {'job': job, 'coalesced': coalesced})
+    
+    return DaemonHandler
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de documentación Salesforce con Claude API')
+    parser.add_argument('--repo', default='.', help='Ruta del repositorio a documentar')
+    parser.add_argument('--commit-range', help='Documentar solo los componentes cambiados (p.ej. abc123..def456)')
+    parser.add_argument('--daemon', action='store_true', help='Modo daemon con cola de trabajos')
+    parser.add_argument('--listen', default=os.getenv('DOC_DAEMON_LISTEN', '127.0.0.1:8787'),
+                        help='Endpoint del daemon: host:puerto o unix:/ruta/socket')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('DOC_DAEMON_WORKERS', '2')),
+                        help='Workers del daemon')
+    parser.add_argument('--watch', action='store_true',
+                        help='Vigila el repositorio y regenera los componentes cambiados como vista previa HTML local')
+    parser.add_argument('--watch-interval', type=float, default=1.0, help='Segundos entre sondeos en modo watch')
+    parser.add_argument('--preview-dir', help='Escribe vistas previas HTML en este directorio en lugar de publicar '
+                        '(con --watch, por defecto .doc-cache/preview)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Reanuda desde los artefactos del commit actual (omite etapas ya completadas)')
+    parser.add_argument('--publish-only', action='store_true',
+                        help='Publica en bloque los documentos guardados del commit sin generar nada')
+    parser.add_argument('--artifact-commit', help='Commit de los artefactos a usar (por defecto HEAD)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='Perfil de memoria por fase (tracemalloc + RSS) en .doc-cache/memory-profile.json')
+    parser.add_argument('--memory-budget-mb', default=os.getenv('DOC_MEMORY_BUDGET_MB', ''),
+                        help='Pico de memoria máximo por fase: MB o JSON {"scan": 512, ...}; se aborta al superarlo')
+    parser.add_argument('--search', help='Consulta el índice local de documentación (sin credenciales ni red)')
+    parser.add_argument('--search-kind', default='any', choices=DOC_INDEX_KINDS,
+                        help='Tipo de búsqueda: componente, método, campo o texto libre')
+    parser.add_argument('--search-limit', type=int, default=20, help='Máximo de resultados por tipo')
+    args = parser.parse_args()
+    
+    if args.search:
+        return search_documentation_index(Path(args.repo) / os.getenv('DOC_CACHE_DIR', '.doc-cache'),
+                                          args.search, args.search_kind, args.search_limit)
+    
+    if args.daemon:
+        return DocumentationDaemon(workers=args.workers).serve(args.listen)
+    
+    if args.profile_memory:
+        try:
+            memory_budget = parse_memory_budget(args.memory_budget_mb)
+        except ValueError as e:
+            print(f"❌ ERROR: --memory-budget-mb inválido: {e}")
+            return False
+    
+    preview = bool(args.watch or args.preview_dir) and not args.publish_only
+    generator = SuperSalesforceDocumentationGenerator(repo_root=args.repo, require_confluence=not preview)
+    if preview:
+        generator.preview_dir = Path(args.preview_dir) if args.preview_dir else generator.cache_dir / 'preview'
+    if args.watch:
+        # Un documento por componente, sin Confluence ni traducciones
+        generator.doc_scope = 'component'
+        generator.translate_languages = []
+        generator.artifacts = False
+        return DocumentationWatcher(generator, args.watch_interval).watch()
+    
+    generator.artifact_commit = args.artifact_commit
+    generator.resume = args.resume
+    if args.profile_memory:
+        generator.enable_memory_profiling(*memory_budget)
+    if args.publish_only:
+        return generator.publish_stored_artifacts()
+    
+    if args.commit_range:
+        generator.changed_files = generator.load_changed_files(args.commit_range)
+        if generator.changed_files is None:
+            print("❌ Sin commit range válido no se documenta el repositorio completo")
+            return False
+    try:
+        return generator.run()
+    except MemoryBudgetExceeded as e:
+        print(f"\n❌ Presupuesto de memoria superado: {e}")
+        return False
 
 if __name__ == "__main__":
-    generator = SuperSalesforceDocumentationGenerator()
-    success = generator.run()
+    success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
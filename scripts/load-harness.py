@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Harness de carga end-to-end del generador de documentación
+Repositorios SFDX sintéticos + servidores simulados → tiempo, peticiones y throughput
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def load_script(name: str, file_name: str):
+    """Carga un script del directorio scripts/ (los nombres con guiones no son importables)"""
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    # Registrado antes de ejecutarlo: pickle (pools de procesos) localiza las funciones por nombre de módulo
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def generate_synthetic_repo(root: Path, components: int, seed: int = 42):
+    """Crea un repositorio SFDX sintético con una mezcla realista de componentes"""
+
+    rng = random.Random(seed)
+    base = root / 'force-app' / 'main' / 'default'
+
+    for index in range(components):
+        kind = rng.random()
+        if kind < 0.45:
+            name = f"SyntheticService{index}"
+            path = base / 'classes' / f"{name}.cls"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            methods = '\n'.join(
+                f"    public static List<Account> method{m}(Set<Id> ids) {{\n"
+                f"        return [SELECT Id, Name FROM Account WHERE Id IN :ids];\n    }}"
+                for m in range(rng.randint(1, 8))
+            )
+            path.write_text(f"public with sharing class {name} {{\n{methods}\n}}\n", encoding='utf-8')
+        elif kind < 0.75:
+            name = f"syntheticCmp{index}"
+            folder = base / 'lwc' / name
+            folder.mkdir(parents=True, exist_ok=True)
+            (folder / f"{name}.html").write_text(
+                "<template>\n    <lightning-card title=\"Synthetic\"></lightning-card>\n</template>\n", encoding='utf-8')
+            (folder / f"{name}.js").write_text(
+                "import { LightningElement, api } from 'lwc';\n"
+                f"export default class {name[0].upper() + name[1:]} extends LightningElement {{\n"
+                "    @api recordId;\n}\n", encoding='utf-8')
+            (folder / f"{name}.js-meta.xml").write_text(
+                '<?xml version="1.0" encoding="UTF-8"?>\n<LightningComponentBundle xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+                '    <apiVersion>59.0</apiVersion>\n    <isExposed>true</isExposed>\n</LightningComponentBundle>\n',
+                encoding='utf-8')
+        elif kind < 0.85:
+            name = f"SyntheticTrigger{index}"
+            path = base / 'triggers' / f"{name}.trigger"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"trigger {name} on Account (before insert, before update) {{\n"
+                            "    for (Account acc : Trigger.new) { acc.Description = 'x'; }\n}\n", encoding='utf-8')
+        else:
+            name = f"Synthetic{index}__c"
+            folder = base / 'objects' / name
+            (folder / 'fields').mkdir(parents=True, exist_ok=True)
+            (folder / f"{name}.object-meta.xml").write_text(
+                '<?xml version="1.0" encoding="UTF-8"?>\n<CustomObject xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+                f"    <label>{name}</label>\n</CustomObject>\n", encoding='utf-8')
+            for field in range(rng.randint(1, 5)):
+                (folder / 'fields' / f"Field{field}__c.field-meta.xml").write_text(
+                    '<?xml version="1.0" encoding="UTF-8"?>\n<CustomField xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+                    f"    <fullName>Field{field}__c</fullName>\n    <type>Text</type>\n</CustomField>\n", encoding='utf-8')
+
+
+def run_generator(generator_module, repo_root: Path, env: Dict[str, str]) -> Dict:
+    """Ejecuta el generador completo dentro del repositorio sintético"""
+
+    previous_env = {key: os.environ.get(key) for key in env}
+    previous_cwd = os.getcwd()
+    os.environ.update(env)
+    os.chdir(repo_root)
+    log = io.StringIO()
+
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(log):
+            generator = generator_module.SuperSalesforceDocumentationGenerator()
+            success = generator.run()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(previous_cwd)
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    return {'success': bool(success), 'wall_time_s': elapsed, 'log_tail': log.getvalue()[-2000:]}
+
+
+def run_scenario(generator_module, base_url: str, components: int, scope: str, keep: bool) -> Dict:
+    """Genera un repo de N componentes, ejecuta el generador y recoge estadísticas"""
+
+    work_dir = Path(tempfile.mkdtemp(prefix=f"sfdx-load-{components}-"))
+    try:
+        generate_synthetic_repo(work_dir, components)
+        requests.post(f"{base_url}/__reset", timeout=10)
+
+        env = {
+            'ANTHROPIC_API_KEY': 'sk-ant-mock',
+            'ANTHROPIC_BASE_URL': base_url,
+            'ATLASSIAN_EMAIL': 'load@example.com',
+            'ATLASSIAN_API_TOKEN': 'mock-token',
+            'ATLASSIAN_BASE_URL': base_url,
+            'CONFLUENCE_SPACE_KEY': 'LOAD',
+            'DOC_SCOPE': scope,
+            'DOC_CACHE_DIR': str(work_dir / '.doc-cache'),
+        }
+        result = run_generator(generator_module, work_dir, env)
+        stats = requests.get(f"{base_url}/__stats", timeout=10).json()
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    endpoints = {name: data for name, data in stats['endpoints'].items() if not name.startswith('__')}
+    total_requests = sum(data['requests'] for data in endpoints.values())
+    wall = result['wall_time_s']
+
+    return {
+        'components': components,
+        'scope': scope,
+        'success': result['success'],
+        'wall_time_s': round(wall, 3),
+        'requests': total_requests,
+        'requests_by_endpoint': endpoints,
+        'pages': stats['pages'],
+        'components_per_s': round(components / wall, 2) if wall else None,
+        'requests_per_s': round(total_requests / wall, 2) if wall else None,
+        'log_tail': None if result['success'] else result['log_tail'],
+    }
+
+
+def print_report(results: List[Dict]):
+    """Imprime una tabla resumen de los escenarios"""
+    print("\n📊 RESULTADOS DE CARGA")
+    print("=" * 80)
+    print(f"{'Componentes':>12} {'Alcance':>11} {'OK':>4} {'Tiempo (s)':>11} {'Peticiones':>11} {'Comp/s':>8} {'Req/s':>8}")
+    for result in results:
+        print(f"{result['components']:>12} {result['scope']:>11} {'✅' if result['success'] else '❌':>3} "
+              f"{result['wall_time_s']:>11.2f} {result['requests']:>11} "
+              f"{result['components_per_s'] or 0:>8.2f} {result['requests_per_s'] or 0:>8.2f}")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Harness de carga del generador contra servidores simulados')
+    parser.add_argument('--sizes', default='10,100,1000,5000', help='Número de componentes por escenario')
+    parser.add_argument('--scope', default='component', choices=['component', 'repository'])
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--output-tokens', type=int, default=1500)
+    parser.add_argument('--json', dest='json_path', help='Guardar resultados en JSON')
+    parser.add_argument('--keep', action='store_true', help='Conservar los repositorios sintéticos')
+    args = parser.parse_args()
+
+    mock = load_script('mock_servers', 'mock-servers.py')
+    generator_module = load_script('generate_documentation', 'generate-documentation.py')
+
+    server, _ = mock.start_mock_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, output_tokens=args.output_tokens, seed=42
+    )
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 Servidores simulados en {base_url}")
+
+    results = []
+    try:
+        for size in [int(value) for value in args.sizes.split(',') if value.strip()]:
+            print(f"🚀 Escenario: {size} componentes (alcance '{args.scope}')...")
+            result = run_scenario(generator_module, base_url, size, args.scope, args.keep)
+            results.append(result)
+            print(f"   {'✅' if result['success'] else '❌'} {result['wall_time_s']:.2f}s, {result['requests']} peticiones")
+    finally:
+        server.shutdown()
+
+    print_report(results)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 Resultados guardados en {args.json_path}")
+
+    return all(result['success'] for result in results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
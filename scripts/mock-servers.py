@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Servidores simulados de Anthropic y Confluence para pruebas locales
+Cubre /v1/messages (incluido streaming) y /rest/api/content, search, space y adjuntos
+Latencia, errores y respuestas 429 configurables - sin credenciales reales
+"""
+
+import argparse
+import email.parser
+import email.policy
+import json
+import random
+import re
+import sys
+import threading
+import time
+import xml.parsers.expat
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+class MockState:
+    """Estado compartido: páginas en memoria, configuración de fallos y contadores"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, output_tokens: int = 1500, seed: Optional[int] = None,
+                 validate_storage: bool = True):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.output_tokens = output_tokens
+        self.validate_storage = validate_storage
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.attachments = {}
+        self.next_page_id = 100000
+        self.stats = {}
+
+    def count(self, endpoint: str, status: int):
+        """Registra una petición por endpoint y código de estado"""
+        with self.lock:
+            entry = self.stats.setdefault(endpoint, {'requests': 0, 'throttled': 0, 'errors': 0})
+            entry['requests'] += 1
+            if status == 429:
+                entry['throttled'] += 1
+            elif status >= 400:
+                entry['errors'] += 1
+
+    def inject_fault(self) -> Optional[int]:
+        """Aplica latencia y decide si la petición falla (429 o error de servidor)"""
+        with self.lock:
+            delay = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+            roll = self.random.random()
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def storage_error(self, body: Dict) -> Optional[str]:
+        """Igual que Confluence: el storage debe ser XHTML bien formado (None si es válido)"""
+        if not self.validate_storage:
+            return None
+        storage = body.get('body', {}).get('storage', {}).get('value', '')
+        parser = xml.parsers.expat.ParserCreate()
+        parser.UseForeignDTD(True)  # Entidades HTML (&nbsp;...) permitidas, como en Confluence
+        try:
+            parser.Parse(f'<root xmlns:ac="ac" xmlns:ri="ri">{storage}</root>', True)
+            return None
+        except xml.parsers.expat.ExpatError as e:
+            return f"Error parsing xhtml: {e}"
+
+    def reset(self):
+        """Limpia páginas y contadores"""
+        with self.lock:
+            self.pages = {}
+            self.attachments = {}
+            self.stats = {}
+
+
+def build_mock_tool_input(prompt: str, tool: Dict, output_tokens: int) -> Dict:
+    """Entrada de herramienta con un valor por propiedad del esquema (salida estructurada)"""
+
+    match = re.search(r'COMPONENTE PRINCIPAL: (.+)', prompt)
+    component = match.group(1).strip() if match else 'Componente Simulado'
+    properties = tool.get('input_schema', {}).get('properties', {})
+    sections = [name for name in properties if name != 'title']
+    filler = "Contenido simulado para pruebas de carga. " * max(1, output_tokens * 4 // 42 // max(1, len(sections)))
+
+    data = {'title': component} if 'title' in properties else {}
+    for index, name in enumerate(sections):
+        data[name] = {'text': f"Sección {properties[name].get('description', name)} de {component}. {filler.strip()}"}
+        if index == 0:
+            data[name]['tables'] = [{'title': 'Inventario', 'columns': ['Componente', 'Tipo', 'Notas'],
+                                     'rows': [[component, 'Simulado', 'a|b']]}]
+            data[name]['diagrams'] = [{'mermaid': f"graph TD\n    A[{component}] --> B[Salesforce]"}]
+    return data
+
+
+def build_mock_documentation(prompt: str, output_tokens: int) -> str:
+    """Genera un Markdown con la estructura del super prompt y tamaño aproximado"""
+
+    # Regeneración incremental: devolver solo las secciones solicitadas
+    if 'Reescribe ÚNICAMENTE las secciones' in prompt:
+        requested = prompt.split('Reescribe ÚNICAMENTE las secciones', 1)[1]
+        headings = re.findall(r'^## .+$', requested, re.MULTILINE)
+        return ''.join(f"{heading}\nSección regenerada por el servidor simulado.\n\n" for heading in headings)
+
+    # Traducción: devolver la sección recibida
+    if '\nSECCIÓN:\n' in prompt:
+        return prompt.split('\nSECCIÓN:\n', 1)[1]
+
+    match = re.search(r'COMPONENTE PRINCIPAL: (.+)', prompt)
+    component = match.group(1).strip() if match else 'Componente Simulado'
+
+    sections = [
+        f"# {component}",
+        "",
+        "## 🎯 Presentación Ejecutiva",
+        f"**¿Qué hace?** Documentación simulada para {component}.",
+        "**Criticidad:** 🟡 Importante",
+        "",
+        "## 📊 Inventario de Componentes",
+        "",
+        "| Componente | Tipo | Criticidad | Propósito | Dependencias |",
+        "|------------|------|-----------|-----------|---------------|",
+        f"| {component} | Simulado | 🟡 | Pruebas de carga | Ninguna |",
+        "",
+        "## 🏗️ Arquitectura General",
+        "",
+        "```mermaid",
+        "graph TB",
+        f"    A[Usuario] -->|Interactúa| B[{component}]",
+        "```",
+        "",
+        "## 📦 Análisis Detallado de Componentes",
+        "",
+    ]
+    text = '\n'.join(sections)
+
+    # Rellenar hasta el tamaño solicitado (~4 caracteres por token)
+    filler = "- Línea de análisis simulada para medir throughput del generador.\n"
+    missing = max(0, output_tokens * 4 - len(text))
+    text += filler * (missing // len(filler) + 1)
+    return text
+
+
+def make_handler(state: MockState):
+    """Crea la clase handler ligada al estado compartido"""
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Keep-alive sin la espera Nagle/ACK retardado: cabeceras y cuerpo salen en un único write
+        # (wfile con búfer, vaciado por handle_one_request) y con TCP_NODELAY
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            # Silenciar el log por petición; las estadísticas están en /__stats
+            pass
+
+        def read_multipart(self) -> Dict:
+            """Parsea un cuerpo multipart/form-data (subida de adjuntos)"""
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length)
+            header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8')
+            message = email.parser.BytesParser(policy=email.policy.default).parsebytes(header + raw)
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                fields[name] = {'filename': part.get_filename(), 'data': part.get_payload(decode=True)}
+            return fields
+
+        def read_json(self) -> Dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length).decode('utf-8'))
+            except ValueError:
+                return {}
+
+        def send_json(self, endpoint: str, status: int, body: Dict, extra_headers: Optional[Dict] = None):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (extra_headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+            state.count(endpoint, status)
+
+        def send_fault(self, endpoint: str, status: int):
+            if status == 429:
+                body = {'type': 'error', 'error': {'type': 'rate_limit_error', 'message': 'Simulated rate limit'}}
+                self.send_json(endpoint, 429, body, {'retry-after': '1'})
+            else:
+                body = {'type': 'error', 'error': {'type': 'api_error', 'message': 'Simulated server error'}}
+                self.send_json(endpoint, status, body)
+
+        def route(self) -> Tuple[str, str, Dict]:
+            parsed = urlparse(self.path)
+            return parsed.path.rstrip('/'), parsed.query, parse_qs(parsed.query)
+
+        # ---------- GET ----------
+        def do_GET(self):
+            path, _, query = self.route()
+
+            if path == '/__stats':
+                with state.lock:
+                    body = {'endpoints': state.stats, 'pages': len(state.pages)}
+                return self.send_json('__stats', 200, body)
+
+            if path == '/rest/api/content/search':
+                return self.confluence_search(query)
+
+            match = re.fullmatch(r'/rest/api/space/([^/]+)', path)
+            if match:
+                fault = state.inject_fault()
+                if fault:
+                    return self.send_fault('space', fault)
+                return self.send_json('space', 200, {'key': match.group(1), 'name': f"Mock {match.group(1)}"})
+
+            match = re.fullmatch(r'/rest/api/content/(\d+)/child/attachment', path)
+            if match:
+                fault = state.inject_fault()
+                if fault:
+                    return self.send_fault('attachment.list', fault)
+                with state.lock:
+                    results = list(state.attachments.get(match.group(1), {}).values())
+                return self.send_json('attachment.list', 200, {'results': results, 'size': len(results)})
+
+            match = re.fullmatch(r'/rest/api/content/(\d+)/child/page', path)
+            if match:
+                fault = state.inject_fault()
+                if fault:
+                    return self.send_fault('content.children', fault)
+                with state.lock:
+                    results = [page for page in state.pages.values()
+                               if page['ancestors'] and page['ancestors'][-1].get('id') == match.group(1)]
+                return self.send_json('content.children', 200, {'results': results, 'size': len(results)})
+
+            match = re.fullmatch(r'/rest/api/content/(\d+)', path)
+            if match:
+                fault = state.inject_fault()
+                if fault:
+                    return self.send_fault('content.get', fault)
+                with state.lock:
+                    page = state.pages.get(match.group(1))
+                if not page:
+                    return self.send_json('content.get', 404, {'message': 'Page not found'})
+                return self.send_json('content.get', 200, page)
+
+            if path == '/rest/api/content':
+                fault = state.inject_fault()
+                if fault:
+                    return self.send_fault('content.list', fault)
+                title = query.get('title', [None])[0]
+                with state.lock:
+                    results = [page for page in state.pages.values() if title is None or page['title'] == title]
+                return self.send_json('content.list', 200, {'results': results, 'size': len(results)})
+
+            self.send_json('unknown', 404, {'message': f"Unknown endpoint {path}"})
+
+        def confluence_search(self, query: Dict):
+            fault = state.inject_fault()
+            if fault:
+                return self.send_fault('content.search', fault)
+            cql = query.get('cql', [''])[0]
+            match = re.search(r'title\s*~\s*"([^"]*)"', cql)
+            needle = match.group(1).lower() if match else ''
+            limit = int(query.get('limit', ['25'])[0])
+            with state.lock:
+                results = [
+                    {'id': page['id'], 'type': 'page', 'title': page['title']}
+                    for page in state.pages.values()
+                    if needle in page['title'].lower()
+                ][:limit]
+            self.send_json('content.search', 200, {'results': results, 'size': len(results)})
+
+        # ---------- POST ----------
+        def do_POST(self):
+            path, _, _ = self.route()
+
+            match = re.fullmatch(r'/rest/api/content/(\d+)/child/attachment(?:/([^/]+)/data)?', path)
+            if match:
+                return self.upload_attachment(match.group(1), match.group(2))
+
+            body = self.read_json()
+
+            if path == '/__reset':
+                state.reset()
+                return self.send_json('__reset', 200, {'reset': True})
+
+            if path == '/v1/messages':
+                return self.anthropic_messages(body)
+
+            if path == '/rest/api/content':
+                fault = state.inject_fault()
+                if fault:
+                    return self.send_fault('content.create', fault)
+                error = state.storage_error(body)
+                if error:
+                    return self.send_json('content.create', 400, {'message': error})
+                with state.lock:
+                    if any(page['title'] == body.get('title') for page in state.pages.values()):
+                        conflict = True
+                    else:
+                        conflict = False
+                        page_id = str(state.next_page_id)
+                        state.next_page_id += 1
+                        page = {
+                            'id': page_id,
+                            'type': body.get('type', 'page'),
+                            'title': body.get('title'),
+                            'space': body.get('space', {}),
+                            'ancestors': body.get('ancestors', []),
+                            'version': {'number': 1, 'message': body.get('version', {}).get('message', '')},
+                            'body': body.get('body', {}),
+                        }
+                        state.pages[page_id] = page
+                if conflict:
+                    return self.send_json('content.create', 400, {'message': 'A page with this title already exists'})
+                return self.send_json('content.create', 200, page)
+
+            self.send_json('unknown', 404, {'message': f"Unknown endpoint {path}"})
+
+        def upload_attachment(self, page_id: str, attachment_id: Optional[str]):
+            """Crea un adjunto o añade una versión nueva (…/child/attachment/{id}/data)"""
+            fields = self.read_multipart()
+            fault = state.inject_fault()
+            if fault:
+                return self.send_fault('attachment.upload', fault)
+            if self.headers.get('X-Atlassian-Token') != 'no-check':
+                return self.send_json('attachment.upload', 403, {'message': 'XSRF check failed'})
+
+            upload = fields.get('file') or {}
+            comment = (fields.get('comment') or {}).get('data', b'').decode('utf-8')
+            with state.lock:
+                if page_id not in state.pages:
+                    status, response = 404, {'message': 'Page not found'}
+                else:
+                    page_attachments = state.attachments.setdefault(page_id, {})
+                    current = page_attachments.get(upload.get('filename'))
+                    if attachment_id and (not current or current['id'] != attachment_id):
+                        status, response = 404, {'message': 'Attachment not found'}
+                    elif current and not attachment_id:
+                        status, response = 400, {'message': 'Attachment already exists'}
+                    else:
+                        if not current:
+                            current = {'id': f"att{state.next_page_id}", 'type': 'attachment',
+                                       'title': upload.get('filename'), 'version': {'number': 0}}
+                            state.next_page_id += 1
+                            page_attachments[current['title']] = current
+                        current['version'] = {'number': current['version']['number'] + 1}
+                        current['metadata'] = {'comment': comment}
+                        current['extensions'] = {'fileSize': len(upload.get('data') or b'')}
+                        status, response = 200, {'results': [current]} if not attachment_id else current
+            self.send_json('attachment.upload', status, response)
+
+        def anthropic_messages(self, body: Dict):
+            if not self.headers.get('x-api-key'):
+                return self.send_json('messages', 401, {'type': 'error', 'error': {'type': 'authentication_error'}})
+            fault = state.inject_fault()
+            if fault:
+                return self.send_fault('messages', 529 if fault == 500 else fault)
+
+            prompt = ''.join(
+                message['content'] if isinstance(message.get('content'), str)
+                else ''.join(block.get('text', '') for block in message.get('content', []))
+                for message in body.get('messages', [])
+            )
+            output_tokens = min(body.get('max_tokens', state.output_tokens), state.output_tokens)
+            model = body.get('model', 'mock-model')
+
+            # Herramienta forzada: un bloque tool_use con la entrada generada a partir del esquema
+            if body.get('tools'):
+                tool_input = build_mock_tool_input(prompt, body['tools'][0], output_tokens)
+                return self.send_json('messages', 200, {
+                    'id': f"msg_mock_{int(time.time() * 1000)}",
+                    'type': 'message',
+                    'role': 'assistant',
+                    'model': model,
+                    'content': [{'type': 'tool_use', 'id': f"toolu_mock_{int(time.time() * 1000)}",
+                                 'name': body['tools'][0]['name'], 'input': tool_input}],
+                    'stop_reason': 'tool_use',
+                    'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(json.dumps(tool_input)) // 4,
+                              'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0},
+                })
+
+            text = build_mock_documentation(prompt, output_tokens)
+            usage = {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4,
+                     'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+
+            if body.get('stream'):
+                return self.stream_messages(model, text, usage)
+
+            self.send_json('messages', 200, {
+                'id': f"msg_mock_{int(time.time() * 1000)}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': model,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'usage': usage,
+            })
+
+        def stream_messages(self, model: str, text: str, usage: Dict):
+            """Respuesta SSE con la misma secuencia de eventos que la API real"""
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+
+            def event(name: str, data: Dict):
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+
+            event('message_start', {'type': 'message_start', 'message': {
+                'id': f"msg_mock_{int(time.time() * 1000)}", 'type': 'message', 'role': 'assistant',
+                'model': model, 'content': [], 'usage': {'input_tokens': usage['input_tokens'], 'output_tokens': 1}}})
+            event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                          'content_block': {'type': 'text', 'text': ''}})
+            for start in range(0, len(text), 400):
+                event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                              'delta': {'type': 'text_delta', 'text': text[start:start + 400]}})
+            event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                                    'usage': {'output_tokens': usage['output_tokens']}})
+            event('message_stop', {'type': 'message_stop'})
+            state.count('messages.stream', 200)
+
+        # ---------- PUT ----------
+        def do_PUT(self):
+            path, _, _ = self.route()
+            body = self.read_json()
+
+            match = re.fullmatch(r'/rest/api/content/(\d+)', path)
+            if not match:
+                return self.send_json('unknown', 404, {'message': f"Unknown endpoint {path}"})
+
+            fault = state.inject_fault()
+            if fault:
+                return self.send_fault('content.update', fault)
+            error = state.storage_error(body)
+            if error:
+                return self.send_json('content.update', 400, {'message': error})
+
+            with state.lock:
+                page = state.pages.get(match.group(1))
+                if page is None:
+                    status, response = 404, {'message': 'Page not found'}
+                elif body.get('version', {}).get('number') != page['version']['number'] + 1:
+                    # Igual que Confluence: la versión debe ser exactamente la actual + 1
+                    status, response = 409, {'message': 'Version conflict'}
+                else:
+                    page['title'] = body.get('title', page['title'])
+                    page['version'] = {'number': page['version']['number'] + 1,
+                                       'message': body.get('version', {}).get('message', '')}
+                    page['body'] = body.get('body', page['body'])
+                    status, response = 200, page
+            self.send_json('content.update', status, response)
+
+        # ---------- DELETE ----------
+        def do_DELETE(self):
+            path, _, _ = self.route()
+
+            match = re.fullmatch(r'/rest/api/content/(\d+)', path)
+            if not match:
+                return self.send_json('unknown', 404, {'message': f"Unknown endpoint {path}"})
+
+            fault = state.inject_fault()
+            if fault:
+                return self.send_fault('content.delete', fault)
+
+            with state.lock:
+                page = state.pages.pop(match.group(1), None)
+                state.attachments.pop(match.group(1), None)
+            if page is None:
+                return self.send_json('content.delete', 404, {'message': 'Page not found'})
+            # Igual que Confluence: 204 sin cuerpo
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            state.count('content.delete', 204)
+
+    return MockHandler
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0, **config) -> Tuple[ThreadingHTTPServer, MockState]:
+    """Arranca el servidor en un hilo en segundo plano (port=0 elige un puerto libre)"""
+    state = MockState(**config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidores simulados de Anthropic y Confluence')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Latencia fija por petición')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Latencia aleatoria adicional (0..N ms)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de error 5xx (0-1)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Probabilidad de 429 (0-1)')
+    parser.add_argument('--output-tokens', type=int, default=1500, help='Tamaño aproximado de cada respuesta')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-validate-storage', action='store_true',
+                        help='Aceptar storage format mal formado (Confluence responde 400)')
+    args = parser.parse_args()
+
+    server, state = start_mock_server(
+        args.host, args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, output_tokens=args.output_tokens, seed=args.seed,
+        validate_storage=not args.no_validate_storage
+    )
+    base_url = f"http://{args.host}:{server.server_address[1]}"
+    print("🧪 Servidores simulados en ejecución")
+    print(f"   ANTHROPIC_BASE_URL={base_url}")
+    print(f"   ATLASSIAN_BASE_URL={base_url}")
+    print(f"   📊 Estadísticas: {base_url}/__stats")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n👋 Deteniendo servidores simulados")
+        server.shutdown()
+        return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
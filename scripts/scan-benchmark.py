@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Benchmark del escáner de repositorios (analyze_salesforce_repository)
+Árboles SFDX sintéticos de 100 a 100k archivos → tiempo, archivos/s, memoria pico y recorridos de glob
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = SCRIPTS_DIR / 'scan-benchmark-baseline.json'
+
+# Reparto de archivos por tipo cuando el escenario se define solo por su tamaño total
+FILE_MIX = {
+    'lwc': 0.25,      # 4 archivos por bundle (html, js, css, js-meta.xml)
+    'apex': 0.25,     # 2 archivos por clase (cls, cls-meta.xml)
+    'objects': 0.20,  # 1 object-meta.xml + N field-meta.xml
+    'profiles': 0.05,
+}
+FILES_PER_LWC = 4
+FILES_PER_APEX = 2
+DEFAULT_FIELDS_PER_OBJECT = 5
+
+# Métricas comparadas con la línea base: (clave, mayor es mejor, con tolerancia)
+COMPARED_METRICS = [
+    ('scan_time_s', False, True),
+    ('files_per_s', True, True),
+    ('peak_mb', False, True),
+    ('glob_calls', False, False),
+    ('dirs_walked', False, False),
+]
+
+
+def load_script(name: str, file_name: str):
+    """Carga un script del directorio scripts/ (los nombres con guiones no son importables)"""
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    # Registrado antes de ejecutarlo: pickle (pools de procesos) localiza las funciones por nombre de módulo
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def counts_for_size(total_files: int, fields_per_object: int = DEFAULT_FIELDS_PER_OBJECT) -> Dict[str, int]:
+    """Número de componentes de cada tipo para un árbol de ~total_files archivos (el resto es ruido)"""
+    counts = {
+        'lwc': int(total_files * FILE_MIX['lwc'] / FILES_PER_LWC),
+        'apex': int(total_files * FILE_MIX['apex'] / FILES_PER_APEX),
+        'objects': int(total_files * FILE_MIX['objects'] / (1 + fields_per_object)),
+        'fields_per_object': fields_per_object,
+        'profiles': int(total_files * FILE_MIX['profiles']),
+    }
+    counts['noise'] = max(0, total_files - count_files(counts))
+    return counts
+
+
+def count_files(counts: Dict[str, int]) -> int:
+    """Archivos que genera un escenario"""
+    return (counts['lwc'] * FILES_PER_LWC + counts['apex'] * FILES_PER_APEX +
+            counts['objects'] * (1 + counts['fields_per_object']) + counts['profiles'] + counts.get('noise', 0))
+
+
+def generate_sfdx_tree(root: Path, counts: Dict[str, int], seed: int = 42):
+    """Crea un árbol SFDX sintético: LWC, Apex, objetos/campos, perfiles y ruido en node_modules"""
+
+    rng = random.Random(seed)
+    base = root / 'force-app' / 'main' / 'default'
+    meta_xml = '<?xml version="1.0" encoding="UTF-8"?>\n<{tag} xmlns="http://soap.sforce.com/2006/04/metadata">\n{body}</{tag}>\n'
+
+    lwc_dir = base / 'lwc'
+    for index in range(counts['lwc']):
+        name = f"benchCmp{index}"
+        folder = lwc_dir / name
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"{name}.html").write_text(
+            "<template>\n    <lightning-card title=\"Bench\">\n" +
+            ''.join(f"        <p>{{label{i}}}</p>\n" for i in range(rng.randint(1, 20))) +
+            "    </lightning-card>\n</template>\n", encoding='utf-8')
+        (folder / f"{name}.js").write_text(
+            "import { LightningElement, api } from 'lwc';\n"
+            f"export default class {name[0].upper() + name[1:]} extends LightningElement {{\n"
+            "    @api recordId;\n" +
+            ''.join(f"    handle{i}(event) {{\n        this.value{i} = event.detail;\n    }}\n"
+                    for i in range(rng.randint(1, 10))) +
+            "}\n", encoding='utf-8')
+        (folder / f"{name}.css").write_text(":host {\n    display: block;\n}\n", encoding='utf-8')
+        (folder / f"{name}.js-meta.xml").write_text(meta_xml.format(
+            tag='LightningComponentBundle', body='    <apiVersion>59.0</apiVersion>\n    <isExposed>true</isExposed>\n'),
+            encoding='utf-8')
+
+    classes_dir = base / 'classes'
+    classes_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(counts['apex']):
+        name = f"BenchService{index}"
+        methods = '\n'.join(
+            f"    public static List<Account> method{m}(Set<Id> ids) {{\n"
+            f"        return [SELECT Id, Name FROM Account WHERE Id IN :ids];\n    }}"
+            for m in range(rng.randint(1, 12))
+        )
+        (classes_dir / f"{name}.cls").write_text(f"public with sharing class {name} {{\n{methods}\n}}\n",
+                                                 encoding='utf-8')
+        (classes_dir / f"{name}.cls-meta.xml").write_text(meta_xml.format(
+            tag='ApexClass', body='    <apiVersion>59.0</apiVersion>\n    <status>Active</status>\n'), encoding='utf-8')
+
+    for index in range(counts['objects']):
+        name = f"Bench{index}__c"
+        folder = base / 'objects' / name
+        (folder / 'fields').mkdir(parents=True, exist_ok=True)
+        (folder / f"{name}.object-meta.xml").write_text(meta_xml.format(
+            tag='CustomObject', body=f"    <label>{name}</label>\n"), encoding='utf-8')
+        for field in range(counts['fields_per_object']):
+            (folder / 'fields' / f"Field{field}__c.field-meta.xml").write_text(meta_xml.format(
+                tag='CustomField', body=f"    <fullName>Field{field}__c</fullName>\n    <type>Text</type>\n"),
+                encoding='utf-8')
+
+    profiles_dir = base / 'profiles'
+    profiles_dir.mkdir(parents=True, exist_ok=True)
+    for index in range(counts['profiles']):
+        (profiles_dir / f"Bench Profile {index}.profile-meta.xml").write_text(meta_xml.format(
+            tag='Profile', body=''.join(
+                f"    <fieldPermissions>\n        <field>Bench{i}__c.Field0__c</field>\n"
+                f"        <readable>true</readable>\n    </fieldPermissions>\n" for i in range(rng.randint(1, 30))
+            )), encoding='utf-8')
+
+    # Ruido: dependencias npm anidadas que el escáner recorre pero no debe documentar
+    noise_dir = root / 'node_modules'
+    remaining = counts.get('noise', 0)
+    package = 0
+    while remaining > 0:
+        package_dir = noise_dir / f"bench-pkg-{package}"
+        files = [package_dir / 'package.json', package_dir / 'README.md']
+        files += [package_dir / 'lib' / f"module{i}.js" for i in range(rng.randint(4, 20))]
+        files += [package_dir / 'dist' / 'esm' / f"chunk{i}.js" for i in range(rng.randint(2, 10))]
+        for file_path in files[:remaining]:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            file_path.write_text(f"// {file_path.name}\nmodule.exports = {{}};\n", encoding='utf-8')
+        remaining -= min(remaining, len(files))
+        package += 1
+
+
+@contextlib.contextmanager
+def count_directory_walks(stats: Dict[str, int]):
+    """Cuenta llamadas a Path.glob y directorios listados con os.scandir durante el bloque"""
+
+    original_glob = Path.glob
+    original_scandir = os.scandir
+
+    def counting_glob(self, pattern, *args, **kwargs):
+        stats['glob_calls'] += 1
+        return original_glob(self, pattern, *args, **kwargs)
+
+    def counting_scandir(path='.'):
+        stats['dirs_walked'] += 1
+        return original_scandir(path)
+
+    Path.glob = counting_glob
+    os.scandir = counting_scandir
+    try:
+        yield stats
+    finally:
+        Path.glob = original_glob
+        os.scandir = original_scandir
+
+
+def benchmark_scan(generator_module, repo_root: Path, repeat: int) -> Dict:
+    """Mide el escaneo en frío (repeat veces), en caliente (caché de archivos) y con tracemalloc"""
+
+    env = {
+        'ANTHROPIC_API_KEY': 'sk-ant-benchmark',
+        'ATLASSIAN_EMAIL': 'bench@example.com',
+        'ATLASSIAN_API_TOKEN': 'benchmark',
+        'ATLASSIAN_BASE_URL': 'http://127.0.0.1:9',
+        'CONFLUENCE_SPACE_KEY': 'BENCH',
+    }
+    for key, value in env.items():
+        os.environ.setdefault(key, value)
+
+    def new_generator():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generator_module.SuperSalesforceDocumentationGenerator(repo_root=str(repo_root))
+
+    def scanned_files(repository_data: Dict) -> int:
+        return sum(sum(len(bundle) for bundle in data.values()) if isinstance(data, dict) else len(data)
+                   for data in repository_data.values())
+
+    cold_times = []
+    walk_stats = {'glob_calls': 0, 'dirs_walked': 0}
+    for attempt in range(repeat):
+        generator = new_generator()
+        stats = {'glob_calls': 0, 'dirs_walked': 0}
+        with count_directory_walks(stats), contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            repository_data = generator.analyze_salesforce_repository()
+            cold_times.append(time.perf_counter() - start)
+        walk_stats = stats
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        generator.analyze_salesforce_repository()
+        warm_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        new_generator().analyze_salesforce_repository()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss = generator_module.read_rss_bytes()
+    scan_time = statistics.median(cold_times)
+    files = scanned_files(repository_data)
+    return {
+        'files_scanned': files,
+        'scan_time_s': round(scan_time, 4),
+        'scan_time_min_s': round(min(cold_times), 4),
+        'warm_scan_time_s': round(warm_time, 4),
+        'files_per_s': round(files / scan_time, 1) if scan_time else None,
+        'peak_mb': round(peak / 1024 / 1024, 2),
+        'rss_mb': round(rss / 1024 / 1024, 1) if rss else None,
+        **walk_stats,
+    }
+
+
+def run_scenario(generator_module, name: str, counts: Dict[str, int], repeat: int,
+                 work_dir: Optional[Path]) -> Dict:
+    """Genera el árbol (o reutiliza uno idéntico en --work-dir) y lo mide"""
+
+    root = (work_dir / name) if work_dir else Path(tempfile.mkdtemp(prefix=f"sfdx-scan-{name}-"))
+    marker = root / '.benchmark-tree.json'
+    try:
+        if not (marker.exists() and json.loads(marker.read_text(encoding='utf-8')) == counts):
+            shutil.rmtree(root, ignore_errors=True)
+            start = time.perf_counter()
+            generate_sfdx_tree(root, counts)
+            marker.write_text(json.dumps(counts), encoding='utf-8')
+            print(f"   🏗️ Árbol generado en {time.perf_counter() - start:.1f}s")
+        result = benchmark_scan(generator_module, root, repeat)
+    finally:
+        if not work_dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {'scenario': name, 'files_on_disk': count_files(counts), 'counts': counts, **result}
+
+
+def compare_with_baseline(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Regresiones frente a la línea base: tiempos/memoria fuera de tolerancia o más recorridos de glob"""
+
+    regressions = []
+    scenarios = baseline.get('scenarios', {})
+    for result in results:
+        reference = scenarios.get(result['scenario'])
+        if not reference:
+            continue
+        for key, higher_is_better, tolerant in COMPARED_METRICS:
+            current, expected = result.get(key), reference.get(key)
+            if current is None or expected is None:
+                continue
+            margin = tolerance if tolerant else 0.0
+            if higher_is_better:
+                regressed = current < expected * (1 - margin)
+            else:
+                regressed = current > expected * (1 + margin)
+            if regressed:
+                regressions.append(f"{result['scenario']}: {key} {current} vs línea base {expected}")
+    return regressions
+
+
+def print_report(results: List[Dict], baseline: Dict):
+    """Imprime una tabla resumen de los escenarios (Δ% respecto a la línea base)"""
+
+    scenarios = baseline.get('scenarios', {})
+
+    def delta(result: Dict, key: str) -> str:
+        expected = scenarios.get(result['scenario'], {}).get(key)
+        if not expected or result.get(key) is None:
+            return ''
+        return f"({(result[key] - expected) / expected * 100:+.0f}%)"
+
+    print("\n📊 RESULTADOS DEL ESCÁNER")
+    print("=" * 112)
+    print(f"{'Escenario':>10} {'Archivos':>9} {'Escaneados':>10} {'Tiempo (s)':>18} {'Archivos/s':>18} "
+          f"{'Pico (MB)':>16} {'Globs':>6} {'Dirs':>14}")
+    for result in results:
+        print(f"{result['scenario']:>10} {result['files_on_disk']:>9} {result['files_scanned']:>10} "
+              f"{result['scan_time_s']:>10.3f} {delta(result, 'scan_time_s'):>7} "
+              f"{result['files_per_s'] or 0:>10.0f} {delta(result, 'files_per_s'):>7} "
+              f"{result['peak_mb']:>8.1f} {delta(result, 'peak_mb'):>7} {result['glob_calls']:>6} "
+              f"{result['dirs_walked']:>7} {delta(result, 'dirs_walked'):>6}")
+    print("=" * 112)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de analyze_salesforce_repository sobre árboles SFDX sintéticos')
+    parser.add_argument('--sizes', default='100,1000,10000,100000', help='Archivos totales por escenario')
+    parser.add_argument('--lwc', type=int, help='Bundles LWC (escenario personalizado único)')
+    parser.add_argument('--apex', type=int, help='Clases Apex (escenario personalizado único)')
+    parser.add_argument('--objects', type=int, help='Objetos (escenario personalizado único)')
+    parser.add_argument('--fields-per-object', type=int, default=DEFAULT_FIELDS_PER_OBJECT)
+    parser.add_argument('--profiles', type=int, help='Perfiles (escenario personalizado único)')
+    parser.add_argument('--noise', type=int, help='Archivos de ruido en node_modules (escenario personalizado único)')
+    parser.add_argument('--repeat', type=int, default=3, help='Escaneos en frío por escenario (se usa la mediana)')
+    parser.add_argument('--work-dir', help='Conservar y reutilizar los árboles generados en este directorio')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Línea base JSON con la que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='Margen relativo para tiempo, archivos/s y memoria (los recorridos de glob son exactos)')
+    parser.add_argument('--update-baseline', action='store_true', help='Sobrescribir la línea base con estos resultados')
+    parser.add_argument('--json', dest='json_path', help='Guardar resultados en JSON')
+    args = parser.parse_args()
+
+    custom = [args.lwc, args.apex, args.objects, args.profiles, args.noise]
+    if any(value is not None for value in custom):
+        scenarios = {'custom': {
+            'lwc': args.lwc or 0, 'apex': args.apex or 0, 'objects': args.objects or 0,
+            'fields_per_object': args.fields_per_object, 'profiles': args.profiles or 0, 'noise': args.noise or 0,
+        }}
+    else:
+        scenarios = {str(int(size)): counts_for_size(int(size), args.fields_per_object)
+                     for size in args.sizes.split(',') if size.strip()}
+
+    generator_module = load_script('generate_documentation', 'generate-documentation.py')
+    work_dir = Path(args.work_dir) if args.work_dir else None
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+
+    results = []
+    for name, counts in scenarios.items():
+        print(f"🚀 Escenario {name}: {count_files(counts)} archivos "
+              f"({counts['lwc']} LWC, {counts['apex']} Apex, {counts['objects']} objetos, "
+              f"{counts['profiles']} perfiles, {counts['noise']} de ruido)...")
+        result = run_scenario(generator_module, name, counts, args.repeat, work_dir)
+        results.append(result)
+        print(f"   ✅ {result['scan_time_s']:.3f}s, {result['files_per_s'] or 0:.0f} archivos/s, "
+              f"pico {result['peak_mb']:.1f} MB, {result['dirs_walked']} directorios recorridos")
+
+    print_report(results, baseline)
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"💾 Resultados guardados en {args.json_path}")
+
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps({
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'scenarios': {result['scenario']: {key: result[key] for key, _, _ in COMPARED_METRICS}
+                          for result in results},
+        }, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f"📌 Línea base actualizada: {baseline_path}")
+        return True
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regresiones frente a la línea base:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return False
+    if baseline:
+        print(f"\n✅ Sin regresiones frente a la línea base (tolerancia {args.tolerance:.0%})")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -7,7 +7,18 @@ import os
 import sys
 import requests
 import json
+import math
+import argparse
+import base64
+import http.client
+import socket
+import ssl
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse, urlencode
 
 def test_anthropic_api():
     """Testa conexión con Anthropic API"""
@@ -36,7 +47,7 @@ def test_anthropic_api():
     
     try:
         response = requests.post(
-            'https://api.anthropic.com/v1/messages',
+            f"{os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com').rstrip('/')}/v1/messages",
             headers=headers,
             json=payload,
             timeout=10
@@ -234,6 +245,237 @@ def create_sample_confluence_page():
         print(f"❌ Error creando página de prueba: {e}")
         return False
 
+def timed_request(method, url, headers=None, body=None, timeout=30):
+    """Petición HTTP en conexión nueva midiendo DNS, TCP, TLS, time-to-first-byte y total"""
+    
+    parsed = urlparse(url)
+    host = parsed.hostname
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    path = parsed.path or '/'
+    if parsed.query:
+        path += f"?{parsed.query}"
+    
+    sample = {'status': None, 'error': None, 'retry_after': None}
+    start = time.perf_counter()
+    
+    try:
+        address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4]
+        t_dns = time.perf_counter()
+        sock = socket.create_connection(address[:2], timeout=timeout)
+        t_tcp = time.perf_counter()
+        
+        if parsed.scheme == 'https':
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+        t_tls = time.perf_counter()
+        
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        connection.sock = sock
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        t_first_byte = time.perf_counter()
+        response.read()
+        t_end = time.perf_counter()
+        connection.close()
+        
+        sample.update({
+            'status': response.status,
+            'retry_after': response.getheader('retry-after'),
+            'dns_ms': (t_dns - start) * 1000,
+            'tcp_ms': (t_tcp - t_dns) * 1000,
+            'tls_ms': (t_tls - t_tcp) * 1000,
+            'ttfb_ms': (t_first_byte - t_tls) * 1000,
+            'total_ms': (t_end - start) * 1000,
+        })
+    except Exception as e:
+        sample['error'] = str(e)
+        sample['total_ms'] = (time.perf_counter() - start) * 1000
+    
+    return sample
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return round(ordered[index], 2)
+
+def summarize_samples(samples):
+    """Resume las muestras de un endpoint: percentiles, estados y throttling"""
+    
+    ok = [sample for sample in samples if sample['status'] and sample['status'] < 400]
+    throttled = [sample for sample in samples if sample['status'] in (429, 503, 529)]
+    status_counts = {}
+    for sample in samples:
+        key = str(sample['status'] or 'connection_error')
+        status_counts[key] = status_counts.get(key, 0) + 1
+    
+    summary = {
+        'samples': len(samples),
+        'ok': len(ok),
+        'throttled': len(throttled),
+        'errors': len(samples) - len(ok) - len(throttled),
+        'status_counts': status_counts,
+        'retry_after_values': sorted({sample['retry_after'] for sample in throttled if sample['retry_after']}),
+    }
+    
+    # Percentiles solo de las respuestas correctas: las rechazadas por throttling o error vuelven antes y los sesgan
+    for metric in ('total_ms', 'ttfb_ms', 'tls_ms', 'tcp_ms', 'dns_ms'):
+        values = [sample[metric] for sample in ok if sample.get(metric) is not None]
+        summary[metric] = {
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': round(max(values), 2) if values else None,
+        }
+    
+    throttled_values = [sample['total_ms'] for sample in throttled if sample.get('total_ms') is not None]
+    summary['throttled_total_ms'] = {
+        'p50': percentile(throttled_values, 50),
+        'max': round(max(throttled_values), 2) if throttled_values else None,
+    }
+    
+    # Timeout sugerido: el doble del p99 total, mínimo 5 segundos
+    p99 = summary['total_ms']['p99']
+    summary['suggested_timeout_s'] = max(5, round(p99 * 2 / 1000, 1)) if p99 else None
+    return summary
+
+def build_probe_requests(include_writes, created_titles=None):
+    """Define las peticiones a muestrear para cada endpoint configurado (created_titles: páginas de prueba creadas)"""
+    
+    probes = {}
+    
+    api_key = os.getenv('ANTHROPIC_API_KEY')
+    if api_key:
+        anthropic_url = os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com').rstrip('/')
+        body = json.dumps({
+            'model': 'claude-3-5-haiku-20241022',
+            'max_tokens': 1,
+            'messages': [{'role': 'user', 'content': 'Hi'}]
+        })
+        probes['anthropic.messages'] = lambda: ('POST', f"{anthropic_url}/v1/messages", {
+            'Content-Type': 'application/json',
+            'x-api-key': api_key,
+            'anthropic-version': '2023-06-01'
+        }, body)
+    
+    email = os.getenv('ATLASSIAN_EMAIL')
+    token = os.getenv('ATLASSIAN_API_TOKEN')
+    base_url = (os.getenv('ATLASSIAN_BASE_URL') or '').rstrip('/')
+    space_key = os.getenv('CONFLUENCE_SPACE_KEY')
+    
+    if all([email, token, base_url, space_key]):
+        auth_header = 'Basic ' + base64.b64encode(f"{email}:{token}".encode()).decode()
+        confluence_headers = {'Authorization': auth_header, 'Accept': 'application/json'}
+        
+        probes['confluence.space'] = lambda: ('GET', f"{base_url}/rest/api/space/{space_key}", confluence_headers, None)
+        
+        search_query = urlencode({'cql': f'space = "{space_key}" AND type = "page" AND title ~ "Test"', 'limit': 5})
+        probes['confluence.search'] = lambda: ('GET', f"{base_url}/rest/api/content/search?{search_query}", confluence_headers, None)
+        
+        if include_writes:
+            def create_probe():
+                title = f"🧪 Probe - Auto Documentation {uuid.uuid4().hex[:8]}"
+                if created_titles is not None:
+                    created_titles.append(title)
+                payload = json.dumps({
+                    'type': 'page',
+                    'title': title,
+                    'space': {'key': space_key},
+                    'body': {'storage': {'value': '<p>Probe</p>', 'representation': 'storage'}}
+                })
+                return ('POST', f"{base_url}/rest/api/content",
+                        dict(confluence_headers, **{'Content-Type': 'application/json'}), payload)
+            probes['confluence.create'] = create_probe
+    
+    return probes
+
+def delete_probe_pages(titles):
+    """Elimina las páginas creadas por el probe de escritura (se buscan por título: la respuesta pudo perderse)"""
+    
+    if not titles:
+        return
+    
+    auth = (os.getenv('ATLASSIAN_EMAIL'), os.getenv('ATLASSIAN_API_TOKEN'))
+    base_url = os.getenv('ATLASSIAN_BASE_URL').rstrip('/')
+    space_key = os.getenv('CONFLUENCE_SPACE_KEY')
+    
+    deleted = 0
+    for title in titles:
+        try:
+            response = requests.get(f"{base_url}/rest/api/content", auth=auth, timeout=15,
+                                    params={'spaceKey': space_key, 'title': title})
+            pages = response.json().get('results', []) if response.status_code == 200 else []
+            for page in pages:
+                response = requests.delete(f"{base_url}/rest/api/content/{page['id']}", auth=auth, timeout=15)
+                if response.status_code in (200, 204):
+                    deleted += 1
+                else:
+                    print(f"⚠️ No se pudo eliminar la página de prueba '{title}': {response.status_code}")
+        except Exception as e:
+            print(f"⚠️ No se pudo eliminar la página de prueba '{title}': {e}")
+    
+    print(f"🧹 Páginas de prueba eliminadas: {deleted}/{len(titles)}")
+
+def run_latency_probe(samples, concurrency, output_path, include_writes):
+    """Ejecuta los checks concurrentemente, muestreando cada endpoint N veces"""
+    
+    created_titles = []
+    probes = build_probe_requests(include_writes, created_titles)
+    if not probes:
+        print("❌ No hay endpoints configurados para el probe (revisar variables de entorno)")
+        return False
+    
+    try:
+        return sample_endpoints(probes, samples, concurrency, output_path)
+    finally:
+        delete_probe_pages(created_titles)
+
+def sample_endpoints(probes, samples, concurrency, output_path):
+    """Muestrea cada endpoint N veces, imprime el resumen y guarda el JSON de resultados"""
+    
+    print(f"🛰️ PROBE DE CONECTIVIDAD Y LATENCIA ({samples} muestras, concurrencia {concurrency})")
+    print("=" * 60)
+    
+    # Intercalar endpoints para que todos se muestreen bajo la misma carga
+    jobs = [name for _ in range(samples) for name in probes]
+    
+    def execute(name):
+        method, url, headers, body = probes[name]()
+        return name, timed_request(method, url, headers, body)
+    
+    results = {name: [] for name in probes}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for name, sample in executor.map(execute, jobs):
+            results[name].append(sample)
+    elapsed = time.perf_counter() - start
+    
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'samples_per_endpoint': samples,
+        'concurrency': concurrency,
+        'wall_time_s': round(elapsed, 3),
+        'endpoints': {name: summarize_samples(endpoint_samples) for name, endpoint_samples in results.items()},
+    }
+    
+    for name, summary in report['endpoints'].items():
+        total = summary['total_ms']
+        print(f"\n📡 {name}: {summary['ok']}/{summary['samples']} OK, "
+              f"{summary['throttled']} throttled, {summary['errors']} errores")
+        print(f"   ⏱️ total p50/p95/p99: {total['p50']} / {total['p95']} / {total['p99']} ms")
+        print(f"   🔐 TLS p50: {summary['tls_ms']['p50']} ms | ⚡ TTFB p50: {summary['ttfb_ms']['p50']} ms")
+        if summary['throttled']:
+            print(f"   🚦 throttled p50/máx: {summary['throttled_total_ms']['p50']} / "
+                  f"{summary['throttled_total_ms']['max']} ms")
+        if summary['suggested_timeout_s']:
+            print(f"   💡 Timeout sugerido: {summary['suggested_timeout_s']}s")
+    
+    Path(output_path).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\n💾 Resultados guardados en {output_path}")
+    
+    return all(summary['ok'] > 0 for summary in report['endpoints'].values())
+
 def main():
     """Ejecuta todas las pruebas"""
     
@@ -293,5 +535,16 @@ def main():
         return False
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description='Verificación del sistema de documentación automática')
+    parser.add_argument('--probe', action='store_true', help='Probe concurrente de latencia de los endpoints')
+    parser.add_argument('--samples', type=int, default=20, help='Muestras por endpoint')
+    parser.add_argument('--concurrency', type=int, default=4, help='Peticiones simultáneas')
+    parser.add_argument('--output', default='probe-results.json', help='Archivo JSON de resultados')
+    parser.add_argument('--include-writes', action='store_true', help='Muestrear también la creación de páginas (crea páginas de prueba)')
+    args = parser.parse_args()
+    
+    if args.probe:
+        success = run_latency_probe(args.samples, args.concurrency, args.output, args.include_writes)
+    else:
+        success = main()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,47 @@
+"""
+Fixtures compartidas: el generador se carga desde scripts/ (nombre con guiones, no importable)
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+
+
+def load_script(name: str, filename: str):
+    """Importa un script de scripts/ como módulo (registrado en sys.modules antes de ejecutarlo)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='session')
+def docgen():
+    """Módulo scripts/generate-documentation.py"""
+    return load_script('generate_documentation', 'generate-documentation.py')
+
+
+@pytest.fixture
+def generator(docgen, tmp_path, monkeypatch):
+    """Generador sobre un repositorio vacío en tmp_path, sin presupuestos ni perfil de memoria"""
+    for name, value in {
+        'ANTHROPIC_API_KEY': 'sk-ant-test',
+        'ATLASSIAN_EMAIL': 'docs@example.com',
+        'ATLASSIAN_API_TOKEN': 'token',
+        'ATLASSIAN_BASE_URL': 'http://127.0.0.1:9',
+        'CONFLUENCE_SPACE_KEY': 'DOC',
+    }.items():
+        monkeypatch.setenv(name, value)
+    for name in ('DOC_BUDGET_RUN_USD', 'DOC_BUDGET_COMPONENT_USD', 'DOC_MODEL', 'DOC_CHEAP_MODEL', 'DOC_CACHE_DIR'):
+        monkeypatch.delenv(name, raising=False)
+
+    generator = docgen.SuperSalesforceDocumentationGenerator(str(tmp_path))
+    generator.reset_run_state()
+    return generator
@@ -0,0 +1,61 @@
+"""
+analyze_apex_source: reglas del analizador léxico de Apex
+"""
+
+APEX_CLASS = '''public class AccountService {
+    public void run(List<Account> accounts) {
+        for (Account a : [SELECT Id FROM Account WHERE Name = 'x']) {
+            update a;
+            Contact c = [SELECT Id FROM Contact WHERE AccountId = :a.Id];
+            for (Integer i = 0; i < 3; i++) { }
+        }
+        // for (Account b : accounts) { insert b; }
+        String s = 'for (a) { delete b; }';
+        List<Lead> leads = [SELECT Id FROM Lead];
+        do { Database.insert(accounts); } while (false);
+    }
+}'''
+
+
+def rules(findings):
+    return [(finding['rule'], finding['line']) for finding in findings]
+
+
+def test_analyze_apex_source_finds_loop_problems(docgen):
+    assert rules(docgen.analyze_apex_source(APEX_CLASS)) == [
+        ('dml_in_loop', 4),
+        ('soql_in_loop', 5),
+        ('nested_loop', 6),
+        ('non_selective_query', 10),
+        ('dml_in_loop', 11),
+    ]
+
+
+def test_analyze_apex_source_loop_header_query_is_not_in_loop(docgen):
+    code = 'for (Account a : [SELECT Id FROM Account LIMIT 10]) {\n    System.debug(a);\n}'
+    assert docgen.analyze_apex_source(code) == []
+
+
+def test_analyze_apex_source_braceless_loop_ends_at_semicolon(docgen):
+    code = 'for (Account a : accounts)\n    a.Name = \'x\';\nupdate accounts;'
+    assert docgen.analyze_apex_source(code) == []
+    code = 'for (Account a : accounts)\n    update a;'
+    assert rules(docgen.analyze_apex_source(code)) == [('dml_in_loop', 2)]
+
+
+def test_analyze_apex_source_query_selectivity(docgen):
+    findings = docgen.analyze_apex_source(
+        "List<Account> a = [SELECT Id FROM Account WHERE Name LIKE '%x'];\n"
+        "List<Account> b = [SELECT Id FROM Account WHERE Name != null];\n"
+        "List<Account> c = [SELECT Id FROM Account WHERE Id IN :ids];"
+    )
+    assert [(finding['line'], finding['detail']) for finding in findings] == [
+        (1, 'LIKE con comodín inicial'),
+        (2, 'solo filtros negativos o nulos'),
+    ]
+
+
+def test_analyze_apex_source_trigger_bulkification(docgen):
+    code = 'trigger AccountTrigger on Account (before insert) {\n    Account a = Trigger.new[0];\n}'
+    assert rules(docgen.analyze_apex_source(code, is_trigger=True)) == [('trigger_not_bulkified', 2)]
+    assert docgen.analyze_apex_source(code) == []
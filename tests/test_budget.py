@@ -0,0 +1,95 @@
+"""
+choose_budget_plan / plan_generation_budget: presupuesto por ejecución y por componente (DOC_BUDGET_*_USD)
+"""
+
+import pytest
+
+INPUT_TOKENS = 1000
+
+
+@pytest.fixture
+def costs(docgen, generator):
+    """Coste del peor caso (max_tokens por defecto) con el modelo principal y el económico"""
+    return {
+        'full': generator.estimate_cost(generator.model, INPUT_TOKENS, generator.max_tokens),
+        'cheap': generator.estimate_cost(generator.cheap_model, INPUT_TOKENS, min(
+            generator.max_tokens, docgen.MODEL_MAX_OUTPUT_TOKENS.get(generator.cheap_model, generator.max_tokens))),
+    }
+
+
+def plan(generator, component, priority=1):
+    return generator.choose_budget_plan(component, priority, generator.model, generator.max_tokens, INPUT_TOKENS)
+
+
+def reserve(generator, component, priority=1):
+    """Como plan_generation_budget, con los tokens de entrada fijados"""
+    result = plan(generator, component, priority)
+    if result:
+        key = generator.budget_component_key(component)
+        generator.reserved_cost_usd += result[2]
+        generator.component_reserved_usd[key] = generator.component_reserved_usd.get(key, 0.0) + result[2]
+    return result
+
+
+def test_without_budget_uses_main_model(generator, costs):
+    assert plan(generator, 'Clase A', priority=5) == (generator.model, generator.max_tokens, costs['full'])
+
+
+def test_max_tokens_limited_to_model_output(docgen, generator):
+    model, max_tokens, _ = generator.choose_budget_plan('Clase A', 1, generator.cheap_model, 100_000, INPUT_TOKENS)
+    assert max_tokens == docgen.MODEL_MAX_OUTPUT_TOKENS[generator.cheap_model]
+
+
+def test_component_budget_counts_every_request_of_the_component(generator, costs):
+    generator.budget_component_usd = costs['full'] + costs['cheap'] / 2
+
+    # Primera petición: cabe el modelo principal
+    assert reserve(generator, 'Clase A')[0] == generator.model
+    # La traducción se imputa al mismo componente: solo queda para el modo económico... y después nada
+    assert generator.budget_component_key('Clase A [EN]') == 'Clase A'
+    assert reserve(generator, 'Clase A [EN]') is None
+    assert generator.budget_skipped == ['Clase A [EN]']
+    # Otro componente tiene su propio presupuesto
+    assert reserve(generator, 'Clase B')[0] == generator.model
+
+
+def test_component_budget_falls_back_to_cheap_model(generator, costs):
+    generator.budget_component_usd = costs['full'] + costs['cheap'] * 1.5
+    assert reserve(generator, 'Clase A')[0] == generator.model
+    assert reserve(generator, 'Clase A [PT-BR]')[0] == generator.cheap_model
+
+
+def test_component_budget_includes_recorded_spend(generator, costs):
+    generator.budget_component_usd = costs['full'] * 2
+    generator.record_usage('Clase A', generator.model, {'input_tokens': INPUT_TOKENS,
+                                                          'output_tokens': generator.max_tokens * 2})
+    assert generator.component_cost_usd['Clase A'] > costs['full']
+
+    # Lo ya gastado (no solo la petición actual) cuenta contra el presupuesto del componente
+    assert plan(generator, 'Clase A') is None
+    assert plan(generator, 'Clase B')[0] == generator.model
+
+
+def test_low_priority_component_is_skipped_instead_of_downgraded(generator, costs):
+    generator.budget_component_usd = costs['full'] / 2
+    assert plan(generator, 'Reporte R', priority=5) is None
+    assert plan(generator, 'Clase A', priority=1)[0] == generator.cheap_model
+    assert generator.budget_skipped == ['Reporte R']
+
+
+def test_run_budget_includes_reservations(generator, costs):
+    generator.budget_run_usd = costs['full'] * 1.5
+    assert reserve(generator, 'Clase A')[0] == generator.model
+    assert reserve(generator, 'Clase B')[0] == generator.cheap_model
+    assert generator.reserved_cost_usd == pytest.approx(costs['full'] + costs['cheap'])
+
+
+def test_plan_generation_budget_reserves_per_component(generator, costs):
+    generator.budget_component_usd = costs['full'] * 10
+    prompt = 'x' * 4000
+
+    model, max_tokens, reserved = generator.plan_generation_budget('Clase A [EN]', prompt, 1)
+
+    assert model == generator.model
+    assert generator.component_reserved_usd == {'Clase A': reserved}
+    assert generator.reserved_cost_usd == reserved
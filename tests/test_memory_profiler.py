@@ -0,0 +1,77 @@
+"""
+MemoryProfiler: el corte por presupuesto es siempre MemoryBudgetExceeded (nunca un KeyboardInterrupt)
+"""
+
+import time
+import tracemalloc
+
+import pytest
+
+
+@pytest.fixture
+def profiler(docgen):
+    # 1 MB: cualquier proceso Python lo supera, así que todas las fases se cortan
+    profiler = docgen.MemoryProfiler({}, default_budget_mb=1, top=1, interval=0.001)
+    yield profiler
+    tracemalloc.stop()
+
+
+def test_phase_over_budget_always_raises_budget_exceeded(docgen, profiler):
+    for index in range(200):
+        with pytest.raises(docgen.MemoryBudgetExceeded):
+            with profiler.phase('generate'):
+                # Fases de duración variable: el muestreo marca el exceso antes, durante o después del trabajo
+                deadline = time.perf_counter() + (index % 5) * 0.001
+                while time.perf_counter() < deadline:
+                    profiler.check()
+        assert profiler.active is None
+
+    assert len(profiler.phases) == 200
+    assert all(record['budget_mb'] == 1 for record in profiler.phases)
+
+
+def test_check_interrupts_phase_between_units(docgen, profiler):
+    processed = 0
+    with pytest.raises(docgen.MemoryBudgetExceeded, match="Fase 'convert'"):
+        with profiler.phase('convert'):
+            while processed < 10_000:
+                profiler.check()
+                processed += 1
+                time.sleep(0.001)
+
+    assert processed < 10_000
+    assert profiler.phases[-1]['interrupted'] is True
+
+
+def test_phase_without_budget_does_not_raise(docgen):
+    profiler = docgen.MemoryProfiler({'publish': 1}, interval=0.001)
+    try:
+        with profiler.phase('scan'):
+            time.sleep(0.01)
+            profiler.check()
+    finally:
+        tracemalloc.stop()
+    assert profiler.phases[0]['budget_mb'] is None
+    assert profiler.phases[0]['interrupted'] is False
+
+
+def test_other_exceptions_propagate(profiler):
+    with pytest.raises(ValueError):
+        with profiler.phase('plan'):
+            raise ValueError('fallo de la fase')
+    assert profiler.active is None
+
+
+@pytest.mark.parametrize('budget, parsed', [
+    ('', ({}, 0.0)),
+    ('512', ({}, 512.0)),
+    ('{"scan": 256, "publish": 128.5}', ({'scan': 256.0, 'publish': 128.5}, 0.0)),
+])
+def test_parse_memory_budget(docgen, budget, parsed):
+    assert docgen.parse_memory_budget(budget) == parsed
+
+
+@pytest.mark.parametrize('budget', ['512MB', '-1', '[1]', '{"render": 10}', '{"scan": "10"}', '{"scan": true}'])
+def test_parse_memory_budget_rejects_invalid(docgen, budget):
+    with pytest.raises(ValueError):
+        docgen.parse_memory_budget(budget)
@@ -0,0 +1,112 @@
+"""
+schedule_work_units (tamaño del cambio según git diff --numstat) y merge_commit_ranges del daemon
+"""
+
+import math
+import subprocess
+
+import pytest
+
+
+def git(repo, *args):
+    subprocess.run(['git', '-C', str(repo), '-c', 'user.name=Docs', '-c', 'user.email=docs@example.com', *args],
+                   check=True, capture_output=True)
+
+
+def work_unit(title, priority, *files):
+    return {'title': title, 'priority': priority,
+            'data': {'apex_classes': [{'path': path, 'lines': lines} for path, lines in files]}}
+
+
+def change_score(docgen, lines):
+    return docgen.SCHEDULER_WEIGHTS['change'] * min(
+        1.0, math.log10(1 + lines) / math.log10(1 + docgen.SCHEDULER_CHANGE_LINES))
+
+
+def test_load_changed_files_counts_diffed_lines(generator, tmp_path):
+    classes = tmp_path / 'force-app' / 'classes'
+    classes.mkdir(parents=True)
+    (classes / 'Big.cls').write_text(''.join(f"// {i}\n" for i in range(5000)))
+    (classes / 'Small.cls').write_text('a\n')
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'add', '.')
+    git(tmp_path, 'commit', '-q', '-m', 'base')
+    (classes / 'Big.cls').write_text(''.join(f"// {i}\n" for i in range(4999)) + '// cambio\n')
+    (classes / 'Small.cls').write_text(''.join(f"{i}\n" for i in range(300)))
+    (classes / 'New.cls').write_text('x\ny\n')
+    git(tmp_path, 'add', '.')
+    git(tmp_path, 'commit', '-q', '-m', 'change')
+
+    assert generator.load_changed_files('HEAD~1..HEAD') == {
+        'force-app/classes/Big.cls', 'force-app/classes/Small.cls', 'force-app/classes/New.cls'}
+    assert generator.changed_lines == {
+        'force-app/classes/Big.cls': 2, 'force-app/classes/Small.cls': 301, 'force-app/classes/New.cls': 2}
+
+    assert generator.load_changed_files('no-existe..HEAD') is None
+    assert generator.changed_lines == {}
+
+
+def test_schedule_work_units_scores_change_size_from_diff(docgen, generator):
+    generator.changed_files = {'Big.cls', 'Small.cls'}
+    generator.changed_lines = {'Big.cls': 1, 'Small.cls': 300}
+    big = work_unit('Clase Big', 1, ('Big.cls', 5000))
+    small = work_unit('Clase Small', 1, ('Small.cls', 300), ('Other.cls', 900))
+
+    ordered = generator.schedule_work_units([big, small])
+
+    assert [unit['title'] for unit in ordered] == ['Clase Small', 'Clase Big']
+    # Criticidad 🔴 + nunca generado + líneas cambiadas (los archivos fuera del diff no cuentan)
+    assert big['score'] == round(0.5 + 0.2 + change_score(docgen, 1), 4)
+    assert small['score'] == round(0.5 + 0.2 + change_score(docgen, 300), 4)
+
+
+def test_schedule_work_units_without_diff_counts_whole_files(docgen, generator):
+    generator.changed_files = None
+    generator.changed_lines = {}
+    units = [work_unit('Clase A', 5, ('A.cls', 10)), work_unit('Clase B', 5, ('B.cls', 5000))]
+
+    ordered = generator.schedule_work_units(units)
+
+    assert [unit['title'] for unit in ordered] == ['Clase B', 'Clase A']
+    assert ordered[0]['score'] == round(0.2 + change_score(docgen, 5000), 4)
+
+
+def test_schedule_work_units_backlog_and_criticality_first(generator):
+    generator.changed_files = None
+    generator.backlog = {'Clase Aplazada': {'title': 'Clase Aplazada'}}
+    units = [work_unit('Clase Baja', 5, ('C.cls', 10)),
+             work_unit('Clase Crítica', 1, ('A.cls', 10)),
+             work_unit('Clase Aplazada', 5, ('B.cls', 10))]
+
+    ordered = generator.schedule_work_units(units)
+
+    assert [unit['title'] for unit in ordered] == ['Clase Aplazada', 'Clase Crítica', 'Clase Baja']
+
+
+@pytest.fixture
+def daemon(docgen):
+    return docgen.DocumentationDaemon(workers=1)
+
+
+@pytest.mark.parametrize('queued, new, merged', [
+    ('A..B', 'B..C', 'A..C'),
+    ('v1.2..v1.3', 'v1.3..HEAD', 'v1.2..HEAD'),
+    # Un rango vacío es una regeneración completa, esté en la cola o llegue después
+    ('', 'B..C', ''),
+    ('A..B', '', ''),
+    ('', '', ''),
+    # Formas que no se pueden unir con precisión
+    ('A...B', 'B..C', ''),
+    ('A..B', 'C', ''),
+    ('A..', 'B..C', ''),
+])
+def test_merge_commit_ranges(daemon, queued, new, merged):
+    assert daemon.merge_commit_ranges(queued, new) == merged
+
+
+def test_submit_keeps_full_repository_job_full(daemon, tmp_path):
+    first, _ = daemon.submit(str(tmp_path), '', 'main')
+    second, merged = daemon.submit(str(tmp_path), 'A..B', 'main')
+
+    assert merged and second is first
+    assert first['commit_range'] == ''
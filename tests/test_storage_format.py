@@ -0,0 +1,67 @@
+"""
+repair_storage_format, storage_parse_error y split_storage_sections
+"""
+
+import pytest
+
+
+@pytest.mark.parametrize('storage, repaired, issues', [
+    ('<p>List<Account> a & b</p>', '<p>List&lt;Account> a &amp; b</p>', {'unknown_tag': 1, 'unescaped_text': 1}),
+    ('<p><strong>x</p>', '<p><strong>x</strong></p>', {'unclosed': 1}),
+    ('<P>x</P>', '<p>x</p>', {'tag_case': 2}),
+    ('<p>x</p></div>', '<p>x</p>', {'stray_close': 1}),
+    ('<ul><li>x', '<ul><li>x</li></ul>', {'unclosed': 2}),
+    ('<p>a\x01b</p>', '<p>ab</p>', {'invalid_char': 1}),
+    ('<code>Map<String, List<B>></code>', '<code>Map&lt;String, List&lt;B>></code>',
+     {'code_markup': 1, 'unescaped_text': 1}),
+])
+def test_repair_storage_format_fixes_issues(docgen, storage, repaired, issues):
+    result, found = docgen.repair_storage_format(storage)
+    assert result == repaired
+    assert found == issues
+    assert docgen.storage_parse_error(result) is None
+
+
+def test_repair_storage_format_keeps_valid_storage(docgen):
+    storage = '<h2>Título</h2><p>ok &amp; &nbsp;<br/></p><ac:structured-macro ac:name="info"/>'
+    assert docgen.repair_storage_format(storage) == (storage, {})
+
+
+def test_repair_storage_format_splits_cdata_terminator(docgen):
+    storage = ('<ac:structured-macro ac:name="code"><ac:plain-text-body>a ]]> b'
+               '</ac:plain-text-body></ac:structured-macro>')
+    result, found = docgen.repair_storage_format(storage)
+    assert '<![CDATA[a ]]]]><![CDATA[> b]]>' in result
+    assert found == {'macro_schema': 1}
+    assert docgen.storage_parse_error(result) is None
+
+
+def test_repair_storage_format_drops_unnamed_macro(docgen):
+    result, found = docgen.repair_storage_format('<ac:structured-macro><p>x</p></ac:structured-macro>')
+    assert result == '<p>x</p>'
+    assert found == {'macro_schema': 1}
+
+
+def test_storage_parse_error(docgen):
+    assert docgen.storage_parse_error('<p>a &nbsp; <ac:link><ri:page ri:content-title="X"/></ac:link></p>') is None
+    assert 'mismatched tag' in docgen.storage_parse_error('<p>x')
+
+
+def test_split_storage_sections(generator):
+    storage = ('<p>Intro</p>'
+               '<h2>🎯 Presentación</h2><p>uno</p>'
+               '<table><tbody><tr><td><h2>Anidado</h2></td></tr></tbody></table>'
+               '<ac:structured-macro ac:name="code"><ac:plain-text-body><![CDATA[<h2>código</h2>]]>'
+               '</ac:plain-text-body></ac:structured-macro>'
+               '<h2><strong>Arquitectura</strong></h2><p>dos</p>'
+               '<h2>🔧</h2>')
+    intro, sections = generator.split_storage_sections(storage)
+
+    assert intro == '<p>Intro</p>'
+    assert [heading for heading, _ in sections] == ['Presentación', 'Arquitectura', 'Sección 3']
+    assert '<h2>Anidado</h2>' in sections[0][1] and '<h2>código</h2>' in sections[0][1]
+    assert intro + ''.join(body for _, body in sections) == storage
+
+
+def test_split_storage_sections_without_headings(generator):
+    assert generator.split_storage_sections('<p>solo</p>') == ('<p>solo</p>', [])
@@ -0,0 +1,57 @@
+"""
+render_structured_section / render_structured_document: Markdown determinista de la salida estructurada
+"""
+
+HEADING = '## 🎯 Presentación Ejecutiva'
+
+
+def test_render_structured_section_text_only(docgen):
+    assert docgen.render_structured_section(HEADING, {'text': '  Resumen.  '}) == f"{HEADING}\n\nResumen.\n\n"
+
+
+def test_render_structured_section_strips_repeated_heading_and_demotes_h2(docgen):
+    section = {'text': f"{HEADING}\nUno\n## Interno\nDos"}
+    assert docgen.render_structured_section(HEADING, section) == f"{HEADING}\n\nUno\n### Interno\nDos\n\n"
+
+
+def test_render_structured_section_empty_text(docgen):
+    assert docgen.render_structured_section(HEADING, {'text': None}) == f"{HEADING}\n\n"
+
+
+def test_render_structured_section_tables(docgen):
+    section = {'text': '', 'tables': [
+        {'title': 'Campos', 'columns': ['Campo', 'Tipo'],
+         'rows': [['Name', 'Text | 80'], ['Amount\n', 'Currency', 'extra'], ['Solo']]},
+        {'columns': [], 'rows': [['ignorada']]},
+    ]}
+    assert docgen.render_structured_section(HEADING, section) == '\n'.join([
+        HEADING,
+        '',
+        '**Campos**',
+        '',
+        '| Campo | Tipo |',
+        '|---|---|',
+        '| Name | Text \\| 80 |',
+        '| Amount | Currency |',
+        '| Solo |  |',
+    ]) + '\n\n'
+
+
+def test_render_structured_section_diagrams_and_code(docgen):
+    section = {
+        'text': 'Flujo',
+        'diagrams': [{'title': 'Secuencia', 'mermaid': '```\ngraph TD\n A-->B\n```'}],
+        'code': [{'language': 'apex; rm', 'code': 'System.debug(1);\n```'}, {'code': 'x'}],
+    }
+    rendered = docgen.render_structured_section(HEADING, section)
+    assert '**Secuencia**\n\n```mermaid\n\ngraph TD\n A-->B\n\n```' in rendered
+    assert '```apexrm\nSystem.debug(1);\n\n```' in rendered
+    assert '```text\nx\n```' in rendered
+    # Solo las vallas propias: el contenido no puede cerrar el bloque
+    assert rendered.count('```') == 6
+
+
+def test_render_structured_document_follows_prompt_order(docgen):
+    headings = ['## Uno', '## Dos', '## Tres']
+    data = {'dos': {'text': 'b'}, 'uno': {'text': 'a'}, 'tres': 'no es una sección'}
+    assert docgen.render_structured_document('Clase X', headings, data) == '# Clase X\n\n## Uno\n\na\n\n## Dos\n\nb\n\n'